@@ -0,0 +1,101 @@
+import asyncio
+import contextvars
+import functools
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from .bases.storage_base import StorageBase
+
+DEFAULT_ASYNC = {
+    'VIEWS': False,
+    'MAX_WORKERS': 16,
+}
+
+_executor: Optional[ThreadPoolExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_async_config() -> Dict[str, Any]:
+    """settings.PLANNER_ASYNC over DEFAULT_ASYNC."""
+    from django.conf import settings
+
+    if settings.configured:
+        return {**DEFAULT_ASYNC, **getattr(settings, 'PLANNER_ASYNC', {})}
+    return DEFAULT_ASYNC
+
+
+def get_executor() -> ThreadPoolExecutor:
+    """Process-wide pool for blocking storage calls, sized by settings.PLANNER_ASYNC."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            config = get_async_config()
+            _executor = ThreadPoolExecutor(max_workers=config['MAX_WORKERS'], thread_name_prefix='planner-storage')
+        return _executor
+
+
+class AsyncStorage:
+    """
+    Awaitable facade over a StorageBase.
+
+    Every call runs on the bounded executor, so blocking file I/O never runs
+    on the event loop and at most MAX_WORKERS storage calls are in flight,
+    however many requests are waiting. Independent calls can be awaited
+    together with asyncio.gather.
+
+    Backends tie transactions to the calling thread, so a transaction has to
+    run as a whole inside run().
+    """
+
+    def __init__(self, storage: StorageBase, executor: Optional[ThreadPoolExecutor] = None):
+        self.storage = storage
+        self.executor = executor
+
+    async def run(self, func: Callable, *args, **kwargs) -> Any:
+        """Run a blocking callable on the executor, in the caller's context."""
+        loop = asyncio.get_running_loop()
+        context = contextvars.copy_context()
+        call = functools.partial(context.run, func, *args, **kwargs)
+        return await loop.run_in_executor(self.executor or get_executor(), call)
+
+    async def create(self, entity_type: str, data: Dict[str, Any]) -> str:
+        return await self.run(self.storage.create, entity_type, data)
+
+    async def get(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
+        return await self.run(self.storage.get, entity_type, entity_id)
+
+    async def get_many(self, entity_type: str, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        return await self.run(self.storage.get_many, entity_type, entity_ids)
+
+    async def get_all(self, entity_type: str) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.get_all, entity_type)
+
+    async def update(self, entity_type: str, entity_id: str, data: Dict[str, Any]) -> bool:
+        return await self.run(self.storage.update, entity_type, entity_id, data)
+
+    async def delete(self, entity_type: str, entity_id: str) -> bool:
+        return await self.run(self.storage.delete, entity_type, entity_id)
+
+    async def filter_by(self, entity_type: str, **filters) -> List[Dict[str, Any]]:
+        return await self.run(self.storage.filter_by, entity_type, **filters)
+
+    async def count(self, entity_type: str, **filters) -> int:
+        return await self.run(self.storage.count, entity_type, **filters)
+
+    async def page(self, entity_type: str, limit: int, after: Optional[Tuple[str, str]] = None,
+                   **filters) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        return await self.run(self.storage.page, entity_type, limit, after, **filters)
+
+    async def version(self, entity_type: str, **scope) -> Optional[str]:
+        return await self.run(self.storage.version, entity_type, **scope)
+
+    async def iterate(self, chunks):
+        """Async iterator over a blocking iterator, one next() per executor hop."""
+        iterator = iter(chunks)
+        done = object()
+        while True:
+            chunk = await self.run(next, iterator, done)
+            if chunk is done:
+                break
+            yield chunk
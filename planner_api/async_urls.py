@@ -0,0 +1,44 @@
+from django.urls import path
+from .async_views import (
+    AsyncUserCreateView, AsyncUserListView, AsyncUserDetailView, AsyncUserUpdateView, AsyncUserTeamsView,
+    AsyncTeamCreateView, AsyncTeamListView, AsyncTeamDetailView, AsyncTeamUpdateView, AsyncTeamAddUsersView,
+    AsyncTeamRemoveUsersView, AsyncTeamUsersView,
+    AsyncBoardCreateView, AsyncBoardCloseView, AsyncTaskCreateView, AsyncTaskUpdateView, AsyncBoardListView,
+    AsyncBoardExportView, AsyncTaskBulkCreateView, AsyncTaskBulkUpdateView, AsyncResponseCacheStatsView,
+    AsyncMetricsView, AsyncBoardProgressView,
+)
+
+# Same routes as urls.py, served by the async views.
+urlpatterns = [
+    # Users
+    path('users/create', AsyncUserCreateView.as_view()),
+    path('users', AsyncUserListView.as_view()),
+    path('users/describe', AsyncUserDetailView.as_view()),
+    path('users/update', AsyncUserUpdateView.as_view()),
+    path('users/teams', AsyncUserTeamsView.as_view()),
+
+    # Teams
+    path('teams/create', AsyncTeamCreateView.as_view()),
+    path('teams', AsyncTeamListView.as_view()),
+    path('teams/describe', AsyncTeamDetailView.as_view()),
+    path('teams/update', AsyncTeamUpdateView.as_view()),
+    path('teams/add-users', AsyncTeamAddUsersView.as_view()),
+    path('teams/remove-users', AsyncTeamRemoveUsersView.as_view()),
+    path('teams/users', AsyncTeamUsersView.as_view()),
+
+    # Boards / Tasks
+    path('boards/create', AsyncBoardCreateView.as_view()),
+    path('boards/close', AsyncBoardCloseView.as_view()),
+    path('boards/list', AsyncBoardListView.as_view()),
+    path('boards/export', AsyncBoardExportView.as_view()),
+    path('boards/progress', AsyncBoardProgressView.as_view()),
+
+    path('tasks/create', AsyncTaskCreateView.as_view()),
+    path('tasks/update', AsyncTaskUpdateView.as_view()),
+    path('tasks/bulk-create', AsyncTaskBulkCreateView.as_view()),
+    path('tasks/bulk-update', AsyncTaskBulkUpdateView.as_view()),
+
+    # Diagnostics
+    path('_cache', AsyncResponseCacheStatsView.as_view()),
+    path('_metrics', AsyncMetricsView.as_view()),
+]
@@ -0,0 +1,268 @@
+import functools
+
+from django.http import HttpResponse, JsonResponse, StreamingHttpResponse
+from django.views import View
+
+from . import metrics
+from .async_storage import AsyncStorage
+from .board import ProjectBoard
+from .cache import get_response_cache
+from .storage import get_storage
+from .team import Team
+from .user import User
+from .utils import parse_request
+from .views import EXPORT_CONTENT_TYPES, _etag, _read_through
+
+
+def _body(request) -> dict:
+    # Same contract as the DRF views: an empty body is an empty object.
+    if not request.body:
+        return {}
+    return parse_request(request.body.decode('utf-8'))
+
+
+class AsyncPlannerView(View):
+    """
+    Async counterpart of the DRF views in views.py, for ASGI servers.
+
+    Subclasses name the implementation class and its *_dict method. The call
+    runs on the storage executor (see AsyncStorage), so a request waiting on
+    file I/O holds no thread of its own. Read endpoints also list the storage
+    scopes they depend on and get the same ETag / response cache handling as
+    the sync views.
+    """
+
+    impl = None
+    method = None
+    success_status = 200
+    # GET endpoints read their parameters from the query string.
+    from_query = False
+
+    @classmethod
+    def as_view(cls, **initkwargs):
+        view = super().as_view(**initkwargs)
+        # Like DRF's APIView: the API does not use session auth.
+        view.csrf_exempt = True
+        return view
+
+    def dependencies(self, data: dict):
+        """(entity type, scope) pairs a read endpoint is built from; None for writes."""
+        return None
+
+    def status_for(self, result) -> int:
+        """Status of a write endpoint's response."""
+        return self.success_status
+
+    async def call(self, impl, data: dict):
+        return await AsyncStorage(impl.storage).run(getattr(impl, self.method), data)
+
+    async def handle(self, request):
+        try:
+            data = request.GET.dict() if self.from_query else _body(request)
+            impl = self.impl()
+            dependencies = self.dependencies(data)
+            if dependencies is None:
+                result = await self.call(impl, data)
+                return JsonResponse(result, status=self.status_for(result), safe=False)
+
+            read = functools.partial(getattr(impl, self.method), request.GET if self.from_query else data)
+
+            def conditional_read():
+                etag = _etag(impl.storage, data, *dependencies)
+                if_none_match = request.headers.get('If-None-Match', '')
+                return etag, _read_through(request.path, if_none_match, data, etag, read)
+
+            etag, (code, result) = await AsyncStorage(impl.storage).run(conditional_read)
+            if code == 304:
+                response = HttpResponse(status=code)
+            else:
+                response = JsonResponse(result, status=code, safe=False)
+            if etag:
+                response['ETag'] = etag
+            return response
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+    async def get(self, request):
+        return await self.handle(request)
+
+    async def post(self, request):
+        return await self.handle(request)
+
+    async def put(self, request):
+        return await self.handle(request)
+
+
+class AsyncUserCreateView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = User
+    method = 'create_user_dict'
+    success_status = 201
+
+class AsyncUserListView(AsyncPlannerView):
+    http_method_names = ['get']
+    impl = User
+    method = 'list_users_dict'
+    from_query = True
+
+    def dependencies(self, data):
+        return [('users', {})]
+
+class AsyncUserDetailView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = User
+    method = 'describe_user_dict'
+
+    def dependencies(self, data):
+        return [('users', {})]
+
+class AsyncUserUpdateView(AsyncPlannerView):
+    http_method_names = ['put']
+    impl = User
+    method = 'update_user_dict'
+
+class AsyncUserTeamsView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = User
+    method = 'get_user_teams_dict'
+
+    def dependencies(self, data):
+        return [('user_teams', {'user_id': data.get('id')}), ('teams', {})]
+
+class AsyncTeamCreateView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = Team
+    method = 'create_team_dict'
+    success_status = 201
+
+class AsyncTeamListView(AsyncPlannerView):
+    http_method_names = ['get']
+    impl = Team
+    method = 'list_teams_dict'
+    from_query = True
+
+    def dependencies(self, data):
+        return [('teams', {})]
+
+class AsyncTeamDetailView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = Team
+    method = 'describe_team_dict'
+
+    def dependencies(self, data):
+        return [('teams', {})]
+
+class AsyncTeamUpdateView(AsyncPlannerView):
+    http_method_names = ['put']
+    impl = Team
+    method = 'update_team_dict'
+
+class AsyncTeamAddUsersView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = Team
+    method = 'add_users_to_team_dict'
+
+class AsyncTeamRemoveUsersView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = Team
+    method = 'remove_users_from_team_dict'
+
+class AsyncTeamUsersView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = Team
+    method = 'list_team_users_dict'
+
+    def dependencies(self, data):
+        return [('user_teams', {'team_id': data.get('id')}), ('users', {})]
+
+class AsyncBoardCreateView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = ProjectBoard
+    method = 'create_board_dict'
+    success_status = 201
+
+class AsyncBoardCloseView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = ProjectBoard
+    method = 'close_board_dict'
+
+class AsyncBoardListView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = ProjectBoard
+    method = 'list_boards_dict'
+
+    def dependencies(self, data):
+        return [('boards', {'team_id': data.get('id')})]
+
+class AsyncBoardProgressView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = ProjectBoard
+    method = 'board_progress_dict'
+
+    def dependencies(self, data):
+        if data.get('team_id') and not data.get('id'):
+            return [('boards', {'team_id': data['team_id']}), ('board_counters', {'team_id': data['team_id']})]
+        return [('boards', {}), ('board_counters', {'board_id': data.get('id')})]
+
+class AsyncTaskCreateView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = ProjectBoard
+    success_status = 201
+
+    async def call(self, impl, data):
+        return await impl.add_task_async(data)
+
+class AsyncTaskUpdateView(AsyncPlannerView):
+    http_method_names = ['put']
+    impl = ProjectBoard
+    method = 'update_task_status_dict'
+
+class AsyncTaskBulkCreateView(AsyncPlannerView):
+    http_method_names = ['post']
+    impl = ProjectBoard
+    method = 'bulk_create_tasks_dict'
+    success_status = 201
+
+    def status_for(self, result) -> int:
+        # Per-task errors are in the results; 400 when none of them was added.
+        return self.success_status if result['created'] else 400
+
+class AsyncTaskBulkUpdateView(AsyncPlannerView):
+    http_method_names = ['put']
+    impl = ProjectBoard
+    method = 'bulk_update_tasks_dict'
+
+class AsyncBoardExportView(AsyncPlannerView):
+    http_method_names = ['post']
+
+    async def handle(self, request):
+        try:
+            data = _body(request)
+            board_impl = ProjectBoard()
+            storage = AsyncStorage(board_impl.storage)
+            if not data.get('download'):
+                return JsonResponse(await storage.run(board_impl.export_board_dict, data))
+
+            filename, chunks = await storage.run(board_impl.export_board_stream, data)
+            response = StreamingHttpResponse(
+                storage.iterate(chunks), content_type=EXPORT_CONTENT_TYPES[filename.rsplit('.', 1)[1]]
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
+        except ValueError as e:
+            return JsonResponse({"error": str(e)}, status=400)
+
+class AsyncResponseCacheStatsView(AsyncPlannerView):
+    http_method_names = ['get']
+
+    async def handle(self, request):
+        return JsonResponse(get_response_cache().stats())
+
+class AsyncMetricsView(AsyncPlannerView):
+    http_method_names = ['get']
+
+    async def handle(self, request):
+        storage = get_storage()
+        # Rendering stats the files under db/, so it runs on the executor too.
+        body = await AsyncStorage(storage).run(metrics.get_metrics().render, storage, get_response_cache())
+        return HttpResponse(body, content_type=metrics.CONTENT_TYPE)
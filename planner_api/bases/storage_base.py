@@ -0,0 +1,138 @@
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class StorageBase:
+    """
+    Base interface for the persistence backends used by the API implementations.
+    Records are plain dicts; every record carries the "id" and "creation_time"
+    assigned by create().
+    """
+
+    # create a record
+    def create(self, entity_type: str, data: Dict[str, Any]) -> str:
+        """
+        :param entity_type: Name of the collection, e.g. "users"
+        :param data: Record fields. "id" and "creation_time" are set on it.
+        :return: The id of the new record
+        """
+        pass
+
+    # fetch a record
+    def get(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
+        """
+        :return: The record, or None when it does not exist
+        """
+        pass
+
+    # fetch several records by id
+    def get_many(self, entity_type: str, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        """
+        :return: id -> record for the ids that exist; missing ids are left out
+        """
+        records = {}
+        for entity_id in entity_ids:
+            record = self.get(entity_type, entity_id)
+            if record is not None:
+                records[entity_id] = record
+        return records
+
+    # fetch every record of a collection
+    def get_all(self, entity_type: str) -> List[Dict[str, Any]]:
+        """
+        :return: All records, in creation order
+        """
+        pass
+
+    # merge fields into a record
+    def update(self, entity_type: str, entity_id: str, data: Dict[str, Any]) -> bool:
+        """
+        :return: False when the record does not exist
+        """
+        pass
+
+    # delete a record
+    def delete(self, entity_type: str, entity_id: str) -> bool:
+        """
+        :return: False when the record does not exist
+        """
+        pass
+
+    # find records by exact field values
+    def filter_by(self, entity_type: str, **filters) -> List[Dict[str, Any]]:
+        """
+        :param filters: field=value pairs; a record matches when it has every
+            field and each value is equal
+        :return: Matching records
+        """
+        pass
+
+    # count records by exact field values
+    def count(self, entity_type: str, **filters) -> int:
+        """
+        :return: Number of records filter_by would return
+        """
+        return len(self.filter_by(entity_type, **filters))
+
+    # stream records by exact field values
+    def iter_filter(self, entity_type: str, **filters) -> Iterator[Dict[str, Any]]:
+        """
+        Like filter_by, but yields the records lazily so callers can stream
+        large result sets.
+        """
+        yield from self.filter_by(entity_type, **filters)
+
+    # fetch one page of records in (creation_time, id) order
+    def page(self, entity_type: str, limit: int, after: Optional[Tuple[str, str]] = None,
+             **filters) -> Tuple[List[Dict[str, Any]], Optional[Tuple[str, str]]]:
+        """
+        :param limit: Maximum number of records to return
+        :param after: (creation_time, id) of the last record of the previous page
+        :param filters: Same as filter_by
+        :return: The records, and the key to pass as `after` for the next page
+            (None on the last page)
+
+        This fallback sorts every matching record; backends should override it.
+        """
+        records = self.filter_by(entity_type, **filters) if filters else self.get_all(entity_type)
+        keyed = sorted(((r.get('creation_time', ''), r['id']), r) for r in records)
+        if after:
+            keyed = [item for item in keyed if item[0] > tuple(after)]
+        chunk = keyed[:limit + 1]
+        next_key = chunk[limit - 1][0] if len(chunk) > limit else None
+        return [record for _, record in chunk[:limit]], next_key
+
+    # current version of a collection, or of one scope of it
+    def version(self, entity_type: str, **scope) -> Optional[str]:
+        """
+        :param scope: At most one field=value pair narrowing the version to the
+            records holding that value, e.g. board_id="<board id>". Fields the
+            backend does not track fall back to the whole collection.
+        :return: An opaque token that changes whenever a matching record is
+            created, updated or deleted, or None when the backend cannot tell
+
+        Reading it must not load the records themselves, so callers can use it
+        to skip work (e.g. answer a conditional request) when nothing changed.
+        """
+        return None
+
+    # group several operations
+    @contextmanager
+    def transaction(self):
+        """
+        Context manager grouping the operations run inside it so they are
+        committed together at exit, or not at all if the block raises.
+        Nested blocks join the outer one. Backends without transactional
+        support may apply each operation immediately.
+        """
+        yield self
+
+    # load collections ahead of the first request
+    def warm_up(self, entity_types: List[str]):
+        """
+        Read `entity_types` once so the requests that follow find them, and
+        their indexes, in memory. Backends without a cache of their own still
+        get the files into the OS page cache.
+        """
+        for entity_type in entity_types:
+            self.count(entity_type)
@@ -1,217 +1,651 @@
+import asyncio
+import csv
 import json
-import os
 from datetime import datetime
+from .async_storage import AsyncStorage
 from .bases.project_board_base import ProjectBoardBase
-from .storage import FileStorage
+from .export_cache import ExportCache
+from .storage import get_storage
+from .utils import page_request, page_response, parse_request
+
+MAX_BULK_TASKS = 1000
+TASK_STATUSES = ['OPEN', 'IN_PROGRESS', 'COMPLETE']
+EXPORT_FORMATS = ['txt', 'csv', 'jsonl']
 
 class ProjectBoard(ProjectBoardBase):
-    def __init__(self):
-        self.storage = FileStorage()
+    def __init__(self, storage=None):
+        self.storage = storage if storage is not None else get_storage()
+        self.export_cache = ExportCache.from_settings()
+    
+    def _validate_task(self, data: dict):
+        for field in ('title', 'description', 'user_id', 'board_id'):
+            if data.get(field) is not None and not isinstance(data[field], str):
+                raise ValueError(f"Task {field} must be a string")
+        title = (data.get('title') or '').strip()
+        description = (data.get('description') or '').strip()
+        user_id = data.get('user_id')
+        board_id = data.get('board_id')
+        
+        if not title or len(title) > 64:
+            raise ValueError("Title is required and must be max 64 characters")
+        if len(description) > 128:
+            raise ValueError("Description must be max 128 characters")
+        if not user_id:
+            raise ValueError("User ID is required")
+        if not board_id:
+            raise ValueError("Board ID is required")
+        return title, description, user_id, board_id
+    
+    def _counters(self, board_id: str):
+        # The board's 'board_counters' record, or None for boards from before them.
+        counters = self.storage.filter_by('board_counters', board_id=board_id)
+        return counters[0] if counters else None
+    
+    def _count_tasks(self, board_id: str) -> dict:
+        counts = _empty_counts()
+        for task in self.storage.filter_by('tasks', board_id=board_id):
+            _shift(counts, None, task.get('status', 'OPEN'))
+        return counts
+    
+    def _task_counts(self, board_id: str) -> dict:
+        """
+        The board's task counters per status plus 'total'. They are kept in
+        a 'board_counters' record of their own by every task write, so task
+        writes leave the board record (and the board list versions) alone;
+        boards created before that have them counted from their tasks until
+        their next task write saves them. Call it before writing the board's
+        tasks in a transaction.
+        """
+        counters = self._counters(board_id)
+        if counters is not None:
+            return dict(counters['task_counts'])
+        return self._count_tasks(board_id)
+    
+    def _save_task_counts(self, board: dict, counts: dict):
+        # Counter changes are task changes, so they bump the export version too.
+        counters = self._counters(board['id'])
+        if counters is None:
+            self.storage.create('board_counters', {
+                'board_id': board['id'],
+                'team_id': board['team_id'],
+                'task_counts': counts,
+                'version': 1
+            })
+        else:
+            self.storage.update('board_counters', counters['id'], {
+                'task_counts': counts,
+                'version': counters['version'] + 1
+            })
     
     def create_board(self, request: str):
-        try:
-            data = json.loads(request)
-            name = data.get('name', '').strip()
-            description = data.get('description', '').strip()
-            team_id = data.get('team_id')
-            
-            if not name or len(name) > 64:
-                raise ValueError("Name is required and must be max 64 characters")
-            if len(description) > 128:
-                raise ValueError("Description must be max 128 characters")
-            if not team_id:
-                raise ValueError("Team ID is required")
-            
-            team = self.storage.get('teams', team_id)
-            if not team:
-                raise ValueError("Team not found")
-            
-            existing_boards = self.storage.filter_by('boards', team_id=team_id, name=name)
-            if existing_boards:
-                raise ValueError("Board name must be unique for a team")
-            
+        return json.dumps(self.create_board_dict(parse_request(request)))
+    
+    def create_board_dict(self, data: dict) -> dict:
+        name = data.get('name', '').strip()
+        description = data.get('description', '').strip()
+        team_id = data.get('team_id')
+        
+        if not name or len(name) > 64:
+            raise ValueError("Name is required and must be max 64 characters")
+        if len(description) > 128:
+            raise ValueError("Description must be max 128 characters")
+        if not team_id:
+            raise ValueError("Team ID is required")
+        
+        team = self.storage.get('teams', team_id)
+        if not team:
+            raise ValueError("Team not found")
+        
+        existing_boards = self.storage.filter_by('boards', team_id=team_id, name=name)
+        if existing_boards:
+            raise ValueError("Board name must be unique for a team")
+        
+        with self.storage.transaction():
             board_id = self.storage.create('boards', {
                 'name': name,
                 'description': description,
                 'team_id': team_id,
-                'status': 'OPEN'
+                'status': 'OPEN',
+                'version': 0
             })
-            
-            return json.dumps({"id": board_id})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+            self.storage.create('board_counters', {
+                'board_id': board_id,
+                'team_id': team_id,
+                'task_counts': _empty_counts(),
+                'version': 0
+            })
+        
+        return {"id": board_id}
     
     def close_board(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            board_id = data.get('id')
-            
-            if not board_id:
-                raise ValueError("Board ID is required")
-            
+        return json.dumps(self.close_board_dict(parse_request(request)))
+    
+    def close_board_dict(self, data: dict) -> dict:
+        board_id = data.get('id')
+        
+        if not board_id:
+            raise ValueError("Board ID is required")
+        
+        with self.storage.transaction():
             board = self.storage.get('boards', board_id)
             if not board:
                 raise ValueError("Board not found")
             
-            tasks = self.storage.filter_by('tasks', board_id=board_id)
-            for task in tasks:
-                if task.get('status') != 'COMPLETE':
-                    raise ValueError("Cannot close board with incomplete tasks")
+            counts = self._task_counts(board_id)
+            if counts['COMPLETE'] != counts['total']:
+                raise ValueError("Cannot close board with incomplete tasks")
             
             self.storage.update('boards', board_id, {
                 'status': 'CLOSED',
-                'end_time': datetime.now().isoformat()
+                'end_time': datetime.now().isoformat(),
+                'version': board.get('version', 0) + 1
             })
-            
-            return json.dumps({"status": "success"})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        
+        return {"status": "success"}
     
     def add_task(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            title = data.get('title', '').strip()
-            description = data.get('description', '').strip()
-            user_id = data.get('user_id')
-            board_id = data.get('board_id')
-            
-            if not title or len(title) > 64:
-                raise ValueError("Title is required and must be max 64 characters")
-            if len(description) > 128:
-                raise ValueError("Description must be max 128 characters")
-            if not user_id:
-                raise ValueError("User ID is required")
-            if not board_id:
-                raise ValueError("Board ID is required")
-            
+        return json.dumps(self.add_task_dict(parse_request(request)))
+    
+    def add_task_dict(self, data: dict) -> dict:
+        title, description, user_id, board_id = self._validate_task(data)
+        
+        with self.storage.transaction():
             board = self.storage.get('boards', board_id)
-            if not board:
-                raise ValueError("Board not found")
-            if board.get('status') != 'OPEN':
-                raise ValueError("Can only add tasks to open boards")
-            
             user = self.storage.get('users', user_id)
-            if not user:
-                raise ValueError("User not found")
-            
-            existing_tasks = self.storage.filter_by('tasks', board_id=board_id, title=title)
+            self._check_task_targets(board, user)
+            task_id = self._create_task(title, description, user_id, board)
+        
+        return {"id": task_id}
+    
+    async def add_task_async(self, data: dict) -> dict:
+        """
+        add_task_dict for async views. The board and user lookups are awaited
+        together, so bad requests are turned away without taking the write
+        lock; the records read are then passed to _create_task, which only
+        checks the title and writes, in one transaction on the storage executor.
+        """
+        title, description, user_id, board_id = self._validate_task(data)
+        storage = AsyncStorage(self.storage)
+        
+        board, user = await asyncio.gather(
+            storage.get('boards', board_id),
+            storage.get('users', user_id),
+        )
+        self._check_task_targets(board, user)
+        
+        return {"id": await storage.run(self._create_task, title, description, user_id, board)}
+    
+    @staticmethod
+    def _check_task_targets(board: dict, user: dict):
+        if not board:
+            raise ValueError("Board not found")
+        if board.get('status') != 'OPEN':
+            raise ValueError("Can only add tasks to open boards")
+        if not user:
+            raise ValueError("User not found")
+    
+    def _create_task(self, title: str, description: str, user_id: str, board: dict) -> str:
+        # The board and user are already checked; the title check, the task and
+        # its board's counters share one transaction.
+        with self.storage.transaction():
+            existing_tasks = self.storage.filter_by('tasks', board_id=board['id'], title=title)
             if existing_tasks:
                 raise ValueError("Task title must be unique for a board")
             
+            counts = self._task_counts(board['id'])
             task_id = self.storage.create('tasks', {
                 'title': title,
                 'description': description,
                 'user_id': user_id,
-                'board_id': board_id,
+                'board_id': board['id'],
                 'status': 'OPEN'
             })
-            
-            return json.dumps({"id": task_id})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+            _shift(counts, None, 'OPEN')
+            self._save_task_counts(board, counts)
+        return task_id
     
     def update_task_status(self, request: str):
-        try:
-            data = json.loads(request)
-            task_id = data.get('id')
-            status = data.get('status')
-            
-            if not task_id:
-                raise ValueError("Task ID is required")
-            if status not in ['OPEN', 'IN_PROGRESS', 'COMPLETE']:
-                raise ValueError("Status must be OPEN, IN_PROGRESS, or COMPLETE")
-            
+        return json.dumps(self.update_task_status_dict(parse_request(request)))
+    
+    def update_task_status_dict(self, data: dict) -> dict:
+        task_id = data.get('id')
+        status = data.get('status')
+        
+        if not task_id:
+            raise ValueError("Task ID is required")
+        if not isinstance(task_id, str):
+            raise ValueError("Task ID must be a string")
+        if status not in TASK_STATUSES:
+            raise ValueError("Status must be OPEN, IN_PROGRESS, or COMPLETE")
+        
+        with self.storage.transaction():
             task = self.storage.get('tasks', task_id)
             if not task:
                 raise ValueError("Task not found")
+            board = self.storage.get('boards', task['board_id'])
+            if not board:
+                raise ValueError("Board not found")
+            counts = self._task_counts(board['id'])
             
             self.storage.update('tasks', task_id, {'status': status})
-            return json.dumps({"status": "success"})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+            _shift(counts, task.get('status', 'OPEN'), status)
+            self._save_task_counts(board, counts)
+        return {"status": "success"}
+    
+    def bulk_create_tasks(self, request: str) -> str:
+        """
+        :param request: A json string with the tasks to add. A "board_id" on a task
+        overrides the top level one.
+        {
+          "board_id" : "<board id>",
+          "tasks" : [
+            {
+              "title" : "<title>",
+              "description" : "<description>",
+              "user_id" : "<user id>"
+            }
+          ]
+        }
+        :return: A json string with one result per task, in request order
+        {
+          "created" : <number of tasks added>,
+          "results" : [{"id" : "<task_id>"} or {"error" : "<reason>"}]
+        }
+        
+        Constraint:
+         * every task follows the add_task constraints; invalid tasks are reported and skipped
+         * the view answers 400 (with the same body) when no task was added
+         * at most 1000 tasks per request
+         * all valid tasks are written in a single storage commit
+        """
+        return json.dumps(self.bulk_create_tasks_dict(parse_request(request)))
+    
+    def bulk_create_tasks_dict(self, data: dict) -> dict:
+        tasks = data.get('tasks')
+        default_board_id = data.get('board_id')
+        
+        if not isinstance(tasks, list) or not tasks:
+            raise ValueError("Tasks list is required")
+        if len(tasks) > MAX_BULK_TASKS:
+            raise ValueError(f"Cannot add more than {MAX_BULK_TASKS} tasks per request")
+        
+        results = []
+        created = 0
+        with self.storage.transaction():
+            # Looked up once per distinct board / user in the batch.
+            boards = {}
+            counts = {}
+            known_users = {}
+            titles = {}
+            changed_boards = set()
+            for item in tasks:
+                try:
+                    if not isinstance(item, dict):
+                        raise ValueError("Task must be an object")
+                    item = dict(item)
+                    item.setdefault('board_id', default_board_id)
+                    title, description, user_id, board_id = self._validate_task(item)
+                    
+                    if board_id not in boards:
+                        boards[board_id] = self.storage.get('boards', board_id)
+                    board = boards[board_id]
+                    if not board:
+                        raise ValueError("Board not found")
+                    if board.get('status') != 'OPEN':
+                        raise ValueError("Can only add tasks to open boards")
+                    if board_id not in counts:
+                        counts[board_id] = self._task_counts(board_id)
+                    
+                    if user_id not in known_users:
+                        known_users[user_id] = self.storage.get('users', user_id) is not None
+                    if not known_users[user_id]:
+                        raise ValueError("User not found")
+                    
+                    if board_id not in titles:
+                        titles[board_id] = {
+                            task['title'] for task in self.storage.filter_by('tasks', board_id=board_id)
+                        }
+                    if title in titles[board_id]:
+                        raise ValueError("Task title must be unique for a board")
+                    
+                    task_id = self.storage.create('tasks', {
+                        'title': title,
+                        'description': description,
+                        'user_id': user_id,
+                        'board_id': board_id,
+                        'status': 'OPEN'
+                    })
+                    titles[board_id].add(title)
+                    _shift(counts[board_id], None, 'OPEN')
+                    changed_boards.add(board_id)
+                    results.append({"id": task_id})
+                    created += 1
+                except ValueError as e:
+                    results.append({"error": str(e)})
+            
+            for board_id in changed_boards:
+                self._save_task_counts(boards[board_id], counts[board_id])
+        
+        return {"created": created, "results": results}
+    
+    def bulk_update_tasks(self, request: str) -> str:
+        """
+        :param request: A json string with the status changes
+        {
+          "tasks" : [
+            {
+              "id" : "<task_id>",
+              "status" : "OPEN | IN_PROGRESS | COMPLETE"
+            }
+          ]
+        }
+        :return: A json string with one result per task, in request order
+        {
+          "updated" : <number of tasks updated>,
+          "results" : [{"id" : "<task_id>", "status" : "success"} or {"id" : "<task_id>", "error" : "<reason>"}]
+        }
+        
+        Constraint:
+         * at most 1000 tasks per request
+         * all valid updates are written in a single storage commit
+        """
+        return json.dumps(self.bulk_update_tasks_dict(parse_request(request)))
+    
+    def bulk_update_tasks_dict(self, data: dict) -> dict:
+        tasks = data.get('tasks')
+        
+        if not isinstance(tasks, list) or not tasks:
+            raise ValueError("Tasks list is required")
+        if len(tasks) > MAX_BULK_TASKS:
+            raise ValueError(f"Cannot update more than {MAX_BULK_TASKS} tasks per request")
+        
+        results = []
+        updated = 0
+        with self.storage.transaction():
+            boards = {}
+            counts = {}
+            for item in tasks:
+                task_id = item.get('id') if isinstance(item, dict) else None
+                try:
+                    if not task_id:
+                        raise ValueError("Task ID is required")
+                    if not isinstance(task_id, str):
+                        raise ValueError("Task ID must be a string")
+                    if item.get('status') not in TASK_STATUSES:
+                        raise ValueError("Status must be OPEN, IN_PROGRESS, or COMPLETE")
+                    task = self.storage.get('tasks', task_id)
+                    if not task:
+                        raise ValueError("Task not found")
+                    board_id = task['board_id']
+                    if board_id not in boards:
+                        boards[board_id] = self.storage.get('boards', board_id)
+                    if not boards[board_id]:
+                        raise ValueError("Board not found")
+                    if board_id not in counts:
+                        counts[board_id] = self._task_counts(board_id)
+                    self.storage.update('tasks', task_id, {'status': item['status']})
+                    _shift(counts[board_id], task.get('status', 'OPEN'), item['status'])
+                    results.append({"id": task_id, "status": "success"})
+                    updated += 1
+                except ValueError as e:
+                    results.append({"id": task_id, "error": str(e)})
+            
+            for board_id in counts:
+                self._save_task_counts(boards[board_id], counts[board_id])
+        
+        return {"updated": updated, "results": results}
     
     def list_boards(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            team_id = data.get('id')
-            
-            if not team_id:
-                raise ValueError("Team ID is required")
-            
-            team = self.storage.get('teams', team_id)
-            if not team:
-                raise ValueError("Team not found")
-            
+        return json.dumps(self.list_boards_dict(parse_request(request)))
+    
+    def list_boards_dict(self, data: dict) -> list:
+        team_id = data.get('id')
+        
+        if not team_id:
+            raise ValueError("Team ID is required")
+        
+        team = self.storage.get('teams', team_id)
+        if not team:
+            raise ValueError("Team not found")
+        
+        paging = page_request(data)
+        if paging:
+            boards, next_key = self.storage.page('boards', *paging, team_id=team_id, status='OPEN')
+        else:
             boards = self.storage.filter_by('boards', team_id=team_id, status='OPEN')
-            result = []
-            
-            for board in boards:
-                result.append({
-                    'id': board['id'],
-                    'name': board['name']
-                })
-            
-            return json.dumps(result)
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        result = []
+        
+        for board in boards:
+            result.append({
+                'id': board['id'],
+                'name': board['name']
+            })
+        
+        return page_response(result, next_key) if paging else result
     
-    def export_board(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            board_id = data.get('id')
-            
-            if not board_id:
-                raise ValueError("Board ID is required")
-            
+    def board_progress(self, request: str) -> str:
+        """
+        :param request: A json string with one board, or the team whose boards to report
+        {
+          "id" : "<board_id>"
+        }
+        or
+        {
+          "team_id" : "<team_id>"
+        }
+        :return: A json string with the task counts of the board, or a list of them
+        for every board of the team (open and closed, paginated like list_boards)
+        {
+          "id" : "<board_id>",
+          "name" : "<board_name>",
+          "status" : "OPEN | CLOSED",
+          "task_counts" : {"OPEN" : <n>, "IN_PROGRESS" : <n>, "COMPLETE" : <n>, "total" : <n>}
+        }
+        
+        Constraint:
+         * reads the counters kept for the boards, not the tasks
+        """
+        return json.dumps(self.board_progress_dict(parse_request(request)))
+    
+    def board_progress_dict(self, data: dict):
+        board_id = data.get('id')
+        team_id = data.get('team_id')
+        
+        if not board_id and not team_id:
+            raise ValueError("Board ID or Team ID is required")
+        
+        if board_id:
             board = self.storage.get('boards', board_id)
             if not board:
                 raise ValueError("Board not found")
-            
-            tasks = self.storage.filter_by('tasks', board_id=board_id)
-            
-            os.makedirs('out', exist_ok=True)
-            filename = f"board_{board_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.txt"
-            filepath = os.path.join('out', filename)
-            
-            with open(filepath, 'w') as f:
-                f.write(f"BOARD EXPORT REPORT\n")
-                f.write(f"==================\n\n")
-                f.write(f"Board: {board['name']}\n")
-                f.write(f"Description: {board['description']}\n")
-                f.write(f"Status: {board['status']}\n")
-                f.write(f"Created: {board['creation_time']}\n")
-                if board.get('end_time'):
-                    f.write(f"Closed: {board['end_time']}\n")
-                f.write(f"\nTASKS ({len(tasks)} total)\n")
-                f.write(f"{'='*50}\n\n")
-                
-                status_counts = {'OPEN': 0, 'IN_PROGRESS': 0, 'COMPLETE': 0}
-                
-                for i, task in enumerate(tasks, 1):
-                    user = self.storage.get('users', task['user_id'])
-                    user_name = user['name'] if user else 'Unknown User'
-                    status = task.get('status', 'OPEN')
-                    status_counts[status] += 1
-                    
-                    f.write(f"{i}. {task['title']} [{status}]\n")
-                    f.write(f"   Assigned to: {user_name}\n")
-                    f.write(f"   Description: {task['description']}\n")
-                    f.write(f"   Created: {task['creation_time']}\n")
-                    f.write(f"\n")
-                
-                f.write(f"\nSUMMARY\n")
-                f.write(f"-------\n")
-                f.write(f"Open: {status_counts['OPEN']}\n")
-                f.write(f"In Progress: {status_counts['IN_PROGRESS']}\n")
-                f.write(f"Complete: {status_counts['COMPLETE']}\n")
-                f.write(f"Total: {sum(status_counts.values())}\n")
-            
-            return json.dumps({"out_file": filename})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+            return self._progress(board, self._task_counts(board_id))
+        
+        team = self.storage.get('teams', team_id)
+        if not team:
+            raise ValueError("Team not found")
+        
+        paging = page_request(data)
+        if paging:
+            boards, next_key = self.storage.page('boards', *paging, team_id=team_id)
+        else:
+            boards = self.storage.filter_by('boards', team_id=team_id)
+        counters = {
+            counter['board_id']: counter['task_counts']
+            for counter in self.storage.filter_by('board_counters', team_id=team_id)
+        }
+        result = [
+            self._progress(board, counters.get(board['id']) or self._count_tasks(board['id']))
+            for board in boards
+        ]
+        
+        return page_response(result, next_key) if paging else result
+    
+    @staticmethod
+    def _progress(board: dict, counts: dict) -> dict:
+        return {
+            'id': board['id'],
+            'name': board['name'],
+            'status': board['status'],
+            'task_counts': counts
+        }
+    
+    def export_board(self, request: str) -> str:
+        return json.dumps(self.export_board_dict(parse_request(request)))
+    
+    def export_board_dict(self, data: dict) -> dict:
+        board, export_format, filename = self._export_request(data)
+        
+        if not self.export_cache.lookup(filename):
+            for _ in self.export_cache.store(filename, self._render(board, export_format)):
+                pass
+        
+        return {"out_file": filename}
+    
+    def export_board_stream(self, data: dict):
+        """
+        Validate an export request ({"id", "format": "txt | csv | jsonl"}) and
+        return (filename, chunks). `chunks` lazily yields the report, either
+        from the cached artifact of the board's current version or while the
+        board's tasks are read (filling the cache as it goes), so it can be
+        streamed in constant memory.
+        """
+        board, export_format, filename = self._export_request(data)
+        
+        if self.export_cache.lookup(filename):
+            return filename, self.export_cache.read(filename)
+        return filename, self.export_cache.store(filename, self._render(board, export_format))
+    
+    def _export_request(self, data: dict):
+        board_id = data.get('id')
+        export_format = data.get('format') or 'txt'
+        
+        if not board_id:
+            raise ValueError("Board ID is required")
+        if export_format not in EXPORT_FORMATS:
+            raise ValueError("Format must be txt, csv, or jsonl")
+        
+        board = self.storage.get('boards', board_id)
+        if not board:
+            raise ValueError("Board not found")
+        
+        # Board changes bump the board's version and task changes its counters'.
+        counters = self._counters(board_id)
+        version = f"{board.get('version', 0)}.{counters['version'] if counters else 0}"
+        filename = self.export_cache.filename(board_id, version, export_format)
+        return board, export_format, filename
+    
+    def _render(self, board: dict, export_format: str):
+        writer = getattr(self, f'_export_{export_format}')
+        return _buffered(writer(board))
+    
+    def _export_tasks(self, board: dict, chunk_size: int = 500):
+        # Assignees are resolved with one get_many per chunk of tasks.
+        chunk = []
+        for task in self.storage.iter_filter('tasks', board_id=board['id']):
+            chunk.append(task)
+            if len(chunk) == chunk_size:
+                yield from self._with_user_names(chunk)
+                chunk = []
+        yield from self._with_user_names(chunk)
+    
+    def _with_user_names(self, tasks: list):
+        users = self.storage.get_many('users', [task['user_id'] for task in tasks])
+        for task in tasks:
+            user = users.get(task['user_id'])
+            yield task, (user['name'] if user else 'Unknown User')
+    
+    def _export_txt(self, board: dict):
+        yield f"BOARD EXPORT REPORT\n"
+        yield f"==================\n\n"
+        yield f"Board: {board['name']}\n"
+        yield f"Description: {board['description']}\n"
+        yield f"Status: {board['status']}\n"
+        yield f"Created: {board['creation_time']}\n"
+        if board.get('end_time'):
+            yield f"Closed: {board['end_time']}\n"
+        counts = self._task_counts(board['id'])
+        yield f"\nTASKS ({counts['total']} total)\n"
+        yield f"{'='*50}\n\n"
+        
+        for i, (task, user_name) in enumerate(self._export_tasks(board), 1):
+            status = task.get('status', 'OPEN')
+            
+            yield (
+                f"{i}. {task['title']} [{status}]\n"
+                f"   Assigned to: {user_name}\n"
+                f"   Description: {task['description']}\n"
+                f"   Created: {task['creation_time']}\n"
+                f"\n"
+            )
+        
+        yield f"\nSUMMARY\n"
+        yield f"-------\n"
+        yield f"Open: {counts['OPEN']}\n"
+        yield f"In Progress: {counts['IN_PROGRESS']}\n"
+        yield f"Complete: {counts['COMPLETE']}\n"
+        yield f"Total: {counts['total']}\n"
+    
+    def _export_csv(self, board: dict):
+        row = _CsvRow()
+        yield row.format(['title', 'status', 'assigned_to', 'description', 'creation_time'])
+        for task, user_name in self._export_tasks(board):
+            yield row.format([
+                task['title'], task.get('status', 'OPEN'), user_name,
+                task['description'], task['creation_time']
+            ])
+    
+    def _export_jsonl(self, board: dict):
+        for task, user_name in self._export_tasks(board):
+            yield json.dumps({
+                'id': task['id'],
+                'title': task['title'],
+                'status': task.get('status', 'OPEN'),
+                'assigned_to': user_name,
+                'description': task['description'],
+                'creation_time': task['creation_time']
+            }) + '\n'
+
+
+class _CsvRow:
+    """Formats one CSV row at a time instead of writing to a file."""
+    
+    def __init__(self):
+        self._writer = csv.writer(self)
+        self._line = ''
+    
+    def write(self, value: str):
+        self._line = value
+    
+    def format(self, values: list) -> str:
+        self._writer.writerow(values)
+        return self._line
+
+
+def _empty_counts() -> dict:
+    counts = {status: 0 for status in TASK_STATUSES}
+    counts['total'] = 0
+    return counts
+
+
+def _shift(counts: dict, old_status, new_status: str):
+    # Move one task between status counters; old_status is None for a new task.
+    if old_status is None:
+        counts['total'] += 1
+    else:
+        counts[old_status] -= 1
+    counts[new_status] += 1
+
+
+def _buffered(chunks, size: int = 64 * 1024):
+    # Coalesce many small report lines into fewer, larger writes.
+    buffer = []
+    buffered = 0
+    for chunk in chunks:
+        buffer.append(chunk)
+        buffered += len(chunk)
+        if buffered >= size:
+            yield ''.join(buffer)
+            buffer = []
+            buffered = 0
+    if buffer:
+        yield ''.join(buffer)
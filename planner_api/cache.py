@@ -0,0 +1,83 @@
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Optional, Tuple
+
+DEFAULT_RESPONSE_CACHE = {
+    'MAX_ENTRIES': 1024,
+}
+
+
+class ResponseCache:
+    """
+    Bounded LRU of read results.
+
+    Each entry is stored with a tag built from the storage versions the
+    result was computed from (see views._etag). A lookup with a different tag
+    means a write touched one of those scopes since, so the entry is dropped:
+    invalidation follows the same per-scope counters as the ETags, e.g.
+    adding users to a team only retires that team's member list and those
+    users' team lists.
+    """
+
+    def __init__(self, max_entries: int = DEFAULT_RESPONSE_CACHE['MAX_ENTRIES']):
+        self.max_entries = max_entries
+        self._entries: 'OrderedDict[Hashable, Tuple[str, Any]]' = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, tag: str) -> Tuple[bool, Any]:
+        """:return: (found, value); stale entries count as misses"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] == tag:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return True, entry[1]
+            if entry is not None:
+                del self._entries[key]
+            self.misses += 1
+            return False, None
+
+    def put(self, key: Hashable, tag: str, value: Any):
+        with self._lock:
+            self._entries[key] = (tag, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'entries': len(self._entries),
+                'max_entries': self.max_entries,
+                'hits': self.hits,
+                'misses': self.misses,
+                'evictions': self.evictions,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+            }
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Process-wide cache sized by settings.PLANNER_RESPONSE_CACHE."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            from django.conf import settings
+
+            config = DEFAULT_RESPONSE_CACHE
+            if settings.configured:
+                config = {**DEFAULT_RESPONSE_CACHE, **getattr(settings, 'PLANNER_RESPONSE_CACHE', {})}
+            _response_cache = ResponseCache(config['MAX_ENTRIES'])
+        return _response_cache
@@ -0,0 +1,118 @@
+import os
+import time
+import uuid
+from typing import Iterable, Iterator, Optional
+
+DEFAULT_EXPORT_CACHE = {
+    'DIR': 'out',
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'MAX_AGE': 7 * 24 * 3600,
+}
+
+
+class ExportCache:
+    """
+    Board export artifacts in `directory`, named after (board_id, version, format).
+
+    A board's version changes whenever its report would, so an existing file
+    for the current version can be served as is. Files are evicted once they
+    have not been used for `max_age` seconds, and least recently used first
+    while the directory holds more than `max_bytes`.
+    """
+
+    def __init__(self, directory: str = 'out', max_bytes: int = DEFAULT_EXPORT_CACHE['MAX_BYTES'],
+                 max_age: float = DEFAULT_EXPORT_CACHE['MAX_AGE']):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    @classmethod
+    def from_settings(cls) -> 'ExportCache':
+        from django.conf import settings
+
+        config = DEFAULT_EXPORT_CACHE
+        if settings.configured:
+            config = {**DEFAULT_EXPORT_CACHE, **getattr(settings, 'PLANNER_EXPORT_CACHE', {})}
+        return cls(config['DIR'], config['MAX_BYTES'], config['MAX_AGE'])
+
+    @staticmethod
+    def filename(board_id: str, version: str, export_format: str) -> str:
+        return f"board_{board_id}_v{version}.{export_format}"
+
+    def _path(self, filename: str) -> str:
+        return os.path.join(self.directory, filename)
+
+    def lookup(self, filename: str) -> Optional[str]:
+        """Path of the cached artifact, marked as just used, or None."""
+        path = self._path(filename)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def read(self, filename: str, size: int = 64 * 1024) -> Iterator[str]:
+        # Opened eagerly so a concurrent eviction cannot pull the file away
+        # between the lookup and the first chunk.
+        f = open(self._path(filename), 'r', newline='')
+
+        def chunks():
+            with f:
+                while True:
+                    chunk = f.read(size)
+                    if not chunk:
+                        break
+                    yield chunk
+
+        return chunks()
+
+    def store(self, filename: str, chunks: Iterable[str]) -> Iterator[str]:
+        """
+        Pass `chunks` through while writing them to the cache. The artifact
+        only appears once the last chunk was written; an abandoned stream
+        leaves nothing behind.
+        """
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._path(filename)
+        # Unique per stream: concurrent exports of one version must not share
+        # it, and an async stream is resumed on whichever executor thread is free.
+        tmp_path = f"{path}.{os.getpid()}.{uuid.uuid4().hex}.tmp"
+        try:
+            with open(tmp_path, 'w', newline='') as f:
+                for chunk in chunks:
+                    f.write(chunk)
+                    yield chunk
+            os.replace(tmp_path, path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        self.evict()
+
+    def evict(self):
+        now = time.time()
+        entries = []
+        for entry in os.scandir(self.directory):
+            if not entry.is_file() or entry.name.endswith('.tmp') or entry.name.startswith('.'):
+                continue
+            try:
+                st = entry.stat()
+            except FileNotFoundError:
+                continue
+            if now - st.st_mtime > self.max_age:
+                self._remove(entry.path)
+            else:
+                entries.append((st.st_mtime, st.st_size, entry.path))
+
+        total = sum(size for _, size, _ in entries)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str):
+        try:
+            os.remove(path)
+        except FileNotFoundError:
+            pass
@@ -0,0 +1,105 @@
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar, Token
+from typing import Dict, List, Optional, Tuple
+
+# Storage work done for the request being served, when one is being measured.
+_current: ContextVar[Optional['Timings']] = ContextVar('planner_timings', default=None)
+# Process-wide listeners (see subscribe()), told about every entity-level event.
+_subscribers: Tuple = ()
+
+
+class Timings:
+    """
+    Counters for one request: time and count per phase ('load', 'parse',
+    'save', 'scan', ...), plus bytes read and written and records scanned.
+
+    Storage code reports through timed() and count(), which do nothing
+    unless a collection was started with start() or a subscriber is
+    registered, so the hooks cost one context variable lookup when both
+    are off.
+
+    Async requests share one instance between the executor threads their
+    storage calls run on (see AsyncStorage.run()), so updates take a lock.
+    """
+
+    __slots__ = ('phases', 'bytes_read', 'bytes_written', 'records_scanned', 'lock')
+
+    def __init__(self):
+        # phase -> [count, seconds]
+        self.phases: Dict[str, List[float]] = {}
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.records_scanned = 0
+        self.lock = threading.Lock()
+
+    def add(self, phase: str, seconds: float):
+        with self.lock:
+            entry = self.phases.get(phase)
+            if entry is None:
+                self.phases[phase] = [1, seconds]
+            else:
+                entry[0] += 1
+                entry[1] += seconds
+
+    def count(self, bytes_read: int = 0, bytes_written: int = 0, records_scanned: int = 0):
+        with self.lock:
+            self.bytes_read += bytes_read
+            self.bytes_written += bytes_written
+            self.records_scanned += records_scanned
+
+
+def start() -> Token:
+    """Start collecting for the current context; pass the token to stop()."""
+    return _current.set(Timings())
+
+
+def stop(token: Token) -> Timings:
+    timings = _current.get()
+    _current.reset(token)
+    return timings
+
+
+def current() -> Optional[Timings]:
+    return _current.get()
+
+
+def subscribe(subscriber):
+    """
+    Also report to `subscriber` for the life of the process, whatever request
+    is running: subscriber.phase(entity_type, phase, seconds) and
+    subscriber.count(entity_type, bytes_read, bytes_written, records_scanned),
+    for the events that name their entity type.
+    """
+    global _subscribers
+    if subscriber not in _subscribers:
+        _subscribers = (*_subscribers, subscriber)
+
+
+@contextmanager
+def timed(phase: str, entity_type: Optional[str] = None):
+    timings = _current.get()
+    subscribers = _subscribers if entity_type is not None else ()
+    if timings is None and not subscribers:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        seconds = time.perf_counter() - started
+        if timings is not None:
+            timings.add(phase, seconds)
+        for subscriber in subscribers:
+            subscriber.phase(entity_type, phase, seconds)
+
+
+def count(bytes_read: int = 0, bytes_written: int = 0, records_scanned: int = 0,
+          entity_type: Optional[str] = None):
+    timings = _current.get()
+    if timings is not None:
+        timings.count(bytes_read, bytes_written, records_scanned)
+    if entity_type is not None:
+        for subscriber in _subscribers:
+            subscriber.count(entity_type, bytes_read, bytes_written, records_scanned)
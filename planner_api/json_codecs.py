@@ -0,0 +1,98 @@
+import json
+from typing import Any, Dict, Optional
+
+try:
+    import orjson
+except ImportError:  # optional accelerator
+    orjson = None
+
+try:
+    import ujson
+except ImportError:  # optional accelerator
+    ujson = None
+
+# On-disk layout of FileStorage tables. Version 1 files (the original
+# pretty-printed ones) are the bare id -> record mapping; from version 2 on the
+# mapping is wrapped as {"__format__": <version>, "records": {...}}.
+FORMAT_VERSION = 2
+FORMAT_KEY = '__format__'
+
+
+class JsonCodec:
+    """Stdlib json with compact separators. Codecs work on bytes."""
+
+    name = 'json'
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, separators=(',', ':')).encode('utf-8')
+
+    def loads(self, data: bytes) -> Any:
+        return json.loads(data)
+
+
+class PrettyJsonCodec(JsonCodec):
+    """The original indent=2 encoding, kept for comparison and debugging."""
+
+    name = 'json-pretty'
+
+    def dumps(self, value: Any) -> bytes:
+        return json.dumps(value, indent=2).encode('utf-8')
+
+
+class OrjsonCodec(JsonCodec):
+    name = 'orjson'
+
+    def dumps(self, value: Any) -> bytes:
+        return orjson.dumps(value)
+
+    def loads(self, data: bytes) -> Any:
+        return orjson.loads(data)
+
+
+class UjsonCodec(JsonCodec):
+    name = 'ujson'
+
+    def dumps(self, value: Any) -> bytes:
+        return ujson.dumps(value, ensure_ascii=False).encode('utf-8')
+
+    def loads(self, data: bytes) -> Any:
+        return ujson.loads(data)
+
+
+CODECS = {codec.name: codec for codec in (JsonCodec, PrettyJsonCodec, OrjsonCodec, UjsonCodec)}
+
+# Picked by 'auto', fastest first.
+_PREFERRED = [('orjson', orjson), ('ujson', ujson), ('json', json)]
+
+
+def available_codecs() -> list:
+    installed = {'orjson': orjson, 'ujson': ujson}
+    return [name for name in CODECS if installed.get(name, json) is not None]
+
+
+def get_codec(name: Optional[str] = 'auto') -> JsonCodec:
+    """
+    :param name: One of CODECS, or 'auto' (the default) for the fastest
+        installed one
+    """
+    if name in (None, 'auto'):
+        name = next(codec_name for codec_name, module in _PREFERRED if module is not None)
+    if name not in CODECS:
+        raise ValueError(f"Unknown codec: {name}")
+    if name not in available_codecs():
+        raise ValueError(f"Codec {name} is not installed")
+    return CODECS[name]()
+
+
+def encode_table(codec: JsonCodec, records: Dict[str, Any]) -> bytes:
+    return codec.dumps({FORMAT_KEY: FORMAT_VERSION, 'records': records})
+
+
+def decode_table(codec: JsonCodec, data: bytes) -> Dict[str, Any]:
+    """Records of a table file in any known format version."""
+    value = codec.loads(data)
+    if FORMAT_KEY not in value:
+        return value
+    if value[FORMAT_KEY] > FORMAT_VERSION:
+        raise ValueError(f"Unsupported storage format version: {value[FORMAT_KEY]}")
+    return value['records']
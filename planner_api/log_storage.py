@@ -0,0 +1,361 @@
+import os
+import threading
+import zlib
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from . import instrumentation
+from .json_codecs import decode_table
+from .storage import FileStorage, IndexKey, Table
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+# Bumped when the snapshot layout changes; snapshots of another format are ignored.
+SNAPSHOT_FORMAT = 2
+# Bytes checksummed at the start of the log and before the offset a snapshot covers.
+SNAPSHOT_WINDOW = 64 * 1024
+
+
+class LogTable(Table):
+    """
+    Table rebuilt from an append-only segment.
+
+    `entries` counts the log lines backing it, so `entries - len(records)` is
+    the number of superseded lines a compaction would drop. `offset` is the
+    length of the log it reflects, `snapshot_offset` the part of that the
+    newest snapshot covers.
+    """
+
+    def __init__(self, records: Dict[str, Any], index_keys: List[IndexKey] = (), entries: int = 0,
+                 indexes: Optional[Dict[IndexKey, Dict[tuple, Dict[str, None]]]] = None):
+        super().__init__(records, index_keys, indexes)
+        self.entries = entries
+        self.offset = 0
+        self.snapshot_offset = 0
+        self.compacting = False
+        self.snapshotting = False
+
+    @property
+    def garbage(self) -> int:
+        return self.entries - len(self.records)
+
+
+class LogStorage(FileStorage):
+    """
+    Log-structured drop-in for FileStorage.
+
+    Each mutation is appended as one JSON line to db/<entity>.log, so a write
+    costs the size of the change rather than the size of the table. State is
+    rebuilt by replaying the segment on first access (and cached like
+    FileStorage does). Once superseded lines pass the garbage threshold the
+    segment is rewritten in a background thread.
+
+    Once snapshot_bytes of a log are not covered by a snapshot, the table,
+    indexes included, is also saved to db/<entity>.snap (see snapshot()), so
+    opening it again loads that and replays only the lines appended since.
+
+    An existing db/<entity>.json is imported the first time its log is opened.
+    """
+
+    FILE_SUFFIX = '.log'
+    SNAPSHOT_SUFFIX = '.snap'
+
+    def __init__(self, db_dir: str = "db", indexes: Optional[Dict[str, List[IndexKey]]] = None,
+                 compact_ratio: float = 0.5, compact_min_garbage: int = 1000, codec: str = 'auto',
+                 snapshot_bytes: int = 4 * 1024 * 1024, partitions: Optional[Dict[str, str]] = None):
+        super().__init__(db_dir, indexes, codec=codec, partitions=partitions)
+        self.compact_ratio = compact_ratio
+        self.compact_min_garbage = compact_min_garbage
+        # 0 turns snapshots off.
+        self.snapshot_bytes = snapshot_bytes
+
+    def _encode(self, op: str, value: Any) -> bytes:
+        if op == 'put':
+            entry = {'op': 'put', 'record': value}
+        else:
+            entry = {'op': 'delete', 'id': value}
+        return self.codec.dumps(entry) + b'\n'
+
+    def _read_table(self, entity_type: str, file_path: str, stamp) -> Table:
+        index_keys = self._index_keys(entity_type)
+        if stamp is None:
+            legacy_path = os.path.join(self.db_dir, f"{entity_type}.json")
+            if os.path.exists(legacy_path):
+                return self._import_legacy(legacy_path, file_path, index_keys)
+            return LogTable({}, index_keys)
+
+        kind = entity_type.split('/', 1)[0]
+        table = self._read_snapshot(entity_type, file_path, index_keys)
+        if table is None:
+            records = {}
+
+            def apply(entry: Dict[str, Any]):
+                if entry['op'] == 'put':
+                    records[entry['record']['id']] = entry['record']
+                else:
+                    records.pop(entry['id'], None)
+
+            offset, entries = self._replay(file_path, kind, 0, apply)
+            table = LogTable(records, index_keys, entries)
+        else:
+            def apply(entry: Dict[str, Any]):
+                if entry['op'] == 'put':
+                    table.put(entry['record'])
+                else:
+                    table.remove(entry['id'])
+
+            offset, entries = self._replay(file_path, kind, table.offset, apply)
+            table.entries += entries
+        table.offset = offset
+        self._maybe_snapshot(entity_type, table)
+        return table
+
+    def _replay(self, file_path: str, kind: str, offset: int,
+                apply: Callable[[Dict[str, Any]], None]) -> Tuple[int, int]:
+        """
+        Pass each entry of the log from byte `offset` on to `apply`.
+
+        :return: The offset after the last complete entry, and the number of entries
+        """
+        start = offset
+        entries = 0
+        # Lines are decoded as they are read, so 'load' includes parsing here.
+        with instrumentation.timed('load', kind), open(file_path, 'rb') as f:
+            f.seek(offset)
+            for line in f:
+                if not line.endswith(b'\n'):
+                    # An append still in progress, or torn; the file is left
+                    # alone (see _trim_torn_tail()).
+                    break
+                offset += len(line)
+                entries += 1
+                try:
+                    entry = self.codec.loads(line)
+                except ValueError:
+                    continue
+                apply(entry)
+        instrumentation.count(bytes_read=offset - start, entity_type=kind)
+        return offset, entries
+
+    @staticmethod
+    def _trim_torn_tail(f):
+        """
+        Cut a partial last line off the log open as `f`, left by a writer that
+        died mid-append, so the next append does not get glued onto it. Only
+        call it with the log locked: another writer's line may be in progress.
+        """
+        end = position = f.seek(0, os.SEEK_END)
+        while position > 0:
+            start = max(0, position - 4096)
+            f.seek(start)
+            newline = f.read(position - start).rfind(b'\n')
+            if newline >= 0:
+                position = start + newline + 1
+                break
+            position = start
+        if position < end:
+            f.truncate(position)
+
+    def _snapshot_path(self, entity_type: str) -> str:
+        return os.path.join(self.db_dir, f"{entity_type}{self.SNAPSHOT_SUFFIX}")
+
+    @staticmethod
+    def _source_stamp(file_path: str, offset: int) -> Optional[Tuple[int, int, int, int]]:
+        """
+        (inode, offset, checksum of the first bytes, checksum of the bytes
+        before `offset`) of a log, or None when it is shorter than `offset`.
+        Appends leave it alone; compacting or replacing the log changes it.
+        """
+        try:
+            with open(file_path, 'rb') as f:
+                st = os.fstat(f.fileno())
+                if st.st_size < offset:
+                    return None
+                head = f.read(min(offset, SNAPSHOT_WINDOW))
+                f.seek(max(0, offset - SNAPSHOT_WINDOW))
+                tail = f.read(offset - f.tell())
+        except FileNotFoundError:
+            return None
+        return (st.st_ino, offset, zlib.crc32(head), zlib.crc32(tail))
+
+    def _read_snapshot(self, entity_type: str, file_path: str, index_keys: List[IndexKey]) -> Optional[LogTable]:
+        """The table saved by snapshot(), when it is still a prefix of the log."""
+        kind = entity_type.split('/', 1)[0]
+        try:
+            with open(self._snapshot_path(entity_type), 'rb') as f:
+                header = self.codec.loads(f.readline())
+                source = header['source']
+                if (header.get('format') != SNAPSHOT_FORMAT
+                        or header.get('index_keys') != [list(keys) for keys in index_keys]
+                        or source is None or tuple(source) != self._source_stamp(file_path, source[1])):
+                    return None
+                with instrumentation.timed('load', kind):
+                    state = self.codec.loads(f.read())
+                    # Buckets are saved as [value, ids] pairs; JSON turns the
+                    # tuple keys into lists.
+                    indexes = {
+                        tuple(keys): {tuple(value): dict.fromkeys(ids) for value, ids in buckets}
+                        for keys, buckets in state['indexes']
+                    }
+                    table = LogTable(state['records'], index_keys, state['entries'], indexes)
+        except FileNotFoundError:
+            return None
+        except (AttributeError, KeyError, TypeError, IndexError, ValueError):
+            # Torn or from an incompatible version; the log has everything.
+            return None
+        instrumentation.count(bytes_read=os.path.getsize(self._snapshot_path(entity_type)), entity_type=kind)
+        table.offset = table.snapshot_offset = source[1]
+        return table
+
+    def _import_legacy(self, legacy_path: str, file_path: str, index_keys: List[IndexKey]) -> LogTable:
+        with open(legacy_path, 'rb') as f:
+            records = decode_table(self.codec, f.read())
+        tmp_path = file_path + '.import'
+        with open(tmp_path, 'wb') as f:
+            for record in records.values():
+                f.write(self._encode('put', record))
+        os.replace(tmp_path, file_path)
+        table = LogTable(records, index_keys, len(records))
+        table.offset = os.path.getsize(file_path)
+        return table
+
+    def _persist(self, entity_type: str, table: Table, ops: List[Tuple[str, Any]]):
+        file_path = self._get_file_path(entity_type)
+        try:
+            kind = entity_type.split('/', 1)[0]
+            with instrumentation.timed('save', kind):
+                payload = b''.join(self._encode(op, value) for op, value in ops)
+                with open(file_path, 'a+b') as f:
+                    if fcntl is not None:
+                        # Writers in other processes append to the same log.
+                        fcntl.flock(f, fcntl.LOCK_EX)
+                    try:
+                        self._trim_torn_tail(f)
+                        f.write(payload)
+                    finally:
+                        if fcntl is not None:
+                            f.flush()
+                            fcntl.flock(f, fcntl.LOCK_UN)
+            instrumentation.count(bytes_written=len(payload), entity_type=kind)
+        except Exception:
+            self.cache.invalidate(entity_type)
+            raise
+        table.entries += len(ops)
+        stamp = self._stamp(file_path)
+        table.offset = stamp[1]
+        self.cache.put(entity_type, stamp, table)
+        self._maybe_compact(entity_type, table)
+        self._maybe_snapshot(entity_type, table)
+
+    def _maybe_compact(self, entity_type: str, table: LogTable):
+        garbage = table.garbage
+        if table.compacting or garbage < self.compact_min_garbage or garbage < table.entries * self.compact_ratio:
+            return
+        table.compacting = True
+        threading.Thread(
+            target=self.compact, args=(entity_type,),
+            name=f"compact-{entity_type}", daemon=True,
+        ).start()
+
+    def compact(self, entity_type: str):
+        """
+        Rewrite the segment of `entity_type` with one line per live record.
+
+        The snapshot is written without holding the storage lock; lines
+        appended meanwhile are copied over before the new segment replaces
+        the old one.
+        """
+        file_path = self._get_file_path(entity_type)
+        tmp_path = file_path + '.compact'
+        with self.cache.lock:
+            table = self._load_table(entity_type)
+            stamp = self._stamp(file_path)
+            if stamp is None:
+                table.compacting = False
+                return
+            records = list(table.records.values())
+            offset = stamp[1]
+        try:
+            with open(tmp_path, 'wb') as f:
+                for record in records:
+                    f.write(self._encode('put', record))
+            with self.cache.lock:
+                if self._load_table(entity_type) is not table:
+                    # Reloaded from disk meanwhile (another process wrote);
+                    # leave that segment alone.
+                    return
+                with open(file_path, 'rb') as src:
+                    src.seek(offset)
+                    tail = src.read()
+                with open(tmp_path, 'ab') as f:
+                    f.write(tail)
+                os.replace(tmp_path, file_path)
+                table.entries = len(records) + tail.count(b'\n')
+                stamp = self._stamp(file_path)
+                table.offset = stamp[1]
+                # The old snapshot describes the replaced log.
+                table.snapshot_offset = 0
+                self.cache.put(entity_type, stamp, table)
+        finally:
+            table.compacting = False
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with self.cache.lock:
+            self._maybe_snapshot(entity_type, table)
+
+    def _maybe_snapshot(self, entity_type: str, table: LogTable):
+        if (not self.snapshot_bytes or table.snapshotting or table.compacting
+                or table.offset - table.snapshot_offset < self.snapshot_bytes):
+            return
+        table.snapshotting = True
+        threading.Thread(
+            target=self.snapshot, args=(entity_type,),
+            name=f"snapshot-{entity_type}", daemon=True,
+        ).start()
+
+    def snapshot(self, entity_type: str):
+        """
+        Save the records and indexes of `entity_type` to <entity>.snap.
+
+        The snapshot is stamped with the log it was taken from (see
+        _source_stamp()), so a later open can check that the log still starts
+        with the bytes it covers and replay only the rest; after a compaction
+        the check fails and the log is replayed in full once. The table is
+        copied under the storage lock and written without it, with the
+        storage's codec: a header line, then the records, the index buckets
+        as [value, ids] pairs and the entry count.
+        """
+        file_path = self._get_file_path(entity_type)
+        snapshot_path = self._snapshot_path(entity_type)
+        tmp_path = f"{snapshot_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with self.cache.lock:
+            table = self._load_table(entity_type)
+            source = self._source_stamp(file_path, table.offset) if table.offset else None
+            if source is None or table.compacting:
+                table.snapshotting = False
+                return
+            header = {'format': SNAPSHOT_FORMAT, 'index_keys': list(self._index_keys(entity_type)), 'source': source}
+            # Records are replaced rather than changed in place, so copying
+            # the containers is enough.
+            state = {
+                'records': dict(table.records),
+                'indexes': [
+                    [keys, [[value, list(ids)] for value, ids in index.items()]]
+                    for keys, index in table.indexes.items()
+                ],
+                'entries': table.entries,
+            }
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(self.codec.dumps(header) + b'\n')
+                f.write(self.codec.dumps(state))
+            os.replace(tmp_path, snapshot_path)
+            with self.cache.lock:
+                if self._source_stamp(file_path, source[1]) == source:
+                    table.snapshot_offset = max(table.snapshot_offset, source[1])
+        finally:
+            table.snapshotting = False
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
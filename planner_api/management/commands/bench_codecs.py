@@ -0,0 +1,79 @@
+import os
+import tempfile
+import time
+import uuid
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planner_api.json_codecs import available_codecs, decode_table, encode_table, get_codec
+
+
+class Command(BaseCommand):
+    help = "Compare load/save throughput of the FileStorage JSON codecs on synthetic task tables"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--sizes', type=int, nargs='+', default=[10000, 100000, 1000000],
+                            help="Table sizes (records) to benchmark")
+        parser.add_argument('--codecs', nargs='+', default=None,
+                            help=f"Codecs to compare (default: every installed one of {', '.join(available_codecs())})")
+        parser.add_argument('--repeat', type=int, default=3, help="Runs per measurement; the best one is reported")
+
+    def handle(self, *args, **options):
+        names = options['codecs'] or available_codecs()
+        try:
+            codecs = [get_codec(name) for name in names]
+        except ValueError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(f"{'records':>9} {'codec':<12} {'size MB':>8} {'save s':>8} {'load s':>8} "
+                          f"{'save MB/s':>10} {'load MB/s':>10}")
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            path = os.path.join(tmp_dir, 'tasks.json')
+            for size in options['sizes']:
+                records = self._records(size)
+                for codec in codecs:
+                    save = self._best(options['repeat'], self._save, path, codec, records)
+                    load = self._best(options['repeat'], self._load, path, codec)
+                    megabytes = os.path.getsize(path) / (1024 * 1024)
+                    self.stdout.write(f"{size:>9} {codec.name:<12} {megabytes:>8.1f} {save:>8.3f} {load:>8.3f} "
+                                      f"{megabytes / save:>10.1f} {megabytes / load:>10.1f}")
+                del records
+
+    @staticmethod
+    def _records(size: int) -> dict:
+        board_ids = [str(uuid.uuid4()) for _ in range(max(1, size // 1000))]
+        user_ids = [str(uuid.uuid4()) for _ in range(100)]
+        records = {}
+        for i in range(size):
+            task_id = str(uuid.uuid4())
+            records[task_id] = {
+                'title': f'task-{i}',
+                'description': f'description of task {i}',
+                'user_id': user_ids[i % len(user_ids)],
+                'board_id': board_ids[i % len(board_ids)],
+                'status': 'OPEN',
+                'id': task_id,
+                'creation_time': '2024-01-01T00:00:00.000000',
+            }
+        return records
+
+    @staticmethod
+    def _save(path, codec, records):
+        # Same steps as FileStorage._save_data.
+        with open(path, 'wb') as f:
+            f.write(encode_table(codec, records))
+
+    @staticmethod
+    def _load(path, codec):
+        with open(path, 'rb') as f:
+            decode_table(codec, f.read())
+
+    @staticmethod
+    def _best(repeat, func, *args) -> float:
+        best = None
+        for _ in range(max(1, repeat)):
+            start = time.perf_counter()
+            func(*args)
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best
@@ -0,0 +1,328 @@
+import itertools
+import json
+import logging
+import os
+import random
+import shutil
+import tempfile
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import Client, override_settings
+
+from planner_api import urls
+from planner_api.storage import get_storage
+
+# Number of tasks per preset; every other entity count is derived from it.
+SCALES = {'1k': 1000, '100k': 100000, '1m': 1000000}
+TASK_STATUSES = ['OPEN'] * 12 + ['IN_PROGRESS'] * 5 + ['COMPLETE'] * 3
+TEAM_SIZE = 10
+BULK_SIZE = 50
+# Task ids kept around to drive tasks/update and tasks/bulk-update.
+TASK_SAMPLE = 10000
+
+
+class Dataset:
+    """Ids of the generated entities, for building request payloads."""
+
+    def __init__(self):
+        self.users = []
+        self.teams = []
+        self.members = {}
+        self.boards = []
+        self.board_team = {}
+        self.closable = []
+        self.tasks = []
+        self.counts = {}
+        self.serial = itertools.count()
+
+    def unique(self, prefix: str) -> str:
+        return f'{prefix}-{next(self.serial)}'
+
+    def member(self, rng: random.Random, board_id: str) -> str:
+        return rng.choice(self.members[self.board_team[board_id]])
+
+
+class Command(BaseCommand):
+    help = "Generate a synthetic planner at scale and measure every API endpoint under concurrent load"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--scale', choices=sorted(SCALES, key=SCALES.get), default='1k',
+                            help="Dataset preset by number of tasks")
+        parser.add_argument('--tasks', type=int, default=None, help="Number of tasks (overrides --scale)")
+        parser.add_argument('--concurrency', type=int, default=8, help="Client threads issuing requests")
+        parser.add_argument('--requests', type=int, default=200, help="Requests per endpoint")
+        parser.add_argument('--endpoints', nargs='+', default=None,
+                            help="Routes to measure, e.g. users/describe (default: every route in planner_api.urls)")
+        parser.add_argument('--backend', default=None,
+                            help="Storage backend class (default: PLANNER_STORAGE['BACKEND'])")
+        parser.add_argument('--db-dir', default=None,
+                            help="Empty directory for the generated data (default: a temporary one, removed afterwards)")
+        parser.add_argument('--json', default=None, help="Also write the report as JSON to this file ('-' for stdout)")
+        parser.add_argument('--seed', type=int, default=0, help="Random seed for the data and the requests")
+
+    def handle(self, *args, **options):
+        tasks = options['tasks'] if options['tasks'] is not None else SCALES[options['scale']]
+        if tasks < 1 or options['concurrency'] < 1 or options['requests'] < 1:
+            raise CommandError("--tasks, --concurrency and --requests must be positive")
+        backend = options['backend'] or settings.PLANNER_STORAGE['BACKEND']
+
+        routes = [str(pattern.pattern) for pattern in urls.urlpatterns]
+        if options['endpoints']:
+            unknown = set(options['endpoints']) - set(routes)
+            if unknown:
+                raise CommandError(f"Unknown endpoints: {', '.join(sorted(unknown))}")
+            routes = [route for route in routes if route in options['endpoints']]
+
+        db_dir = options['db_dir']
+        if db_dir and os.path.isdir(db_dir) and os.listdir(db_dir):
+            raise CommandError(f"{db_dir} is not empty")
+        work_dir = tempfile.mkdtemp(prefix='bench_planner_')
+        db_dir = db_dir or os.path.join(work_dir, 'db')
+
+        try:
+            overrides = override_settings(
+                PLANNER_STORAGE={'BACKEND': backend, 'OPTIONS': {'db_dir': db_dir}},
+                PLANNER_EXPORT_CACHE={**settings.PLANNER_EXPORT_CACHE, 'DIR': os.path.join(work_dir, 'out')},
+                ALLOWED_HOSTS=[*settings.ALLOWED_HOSTS, 'testserver'],
+            )
+            with overrides:
+                # The instance the views will share under these settings.
+                storage = get_storage()
+                rng = random.Random(options['seed'])
+                started = time.perf_counter()
+                data = self._generate(storage, rng, tasks, options['requests'])
+                seed_seconds = time.perf_counter() - started
+                # Keep stdout for the report alone when it is JSON.
+                log = self.stderr if options['json'] == '-' else self.stdout
+                log.write(f"Generated {data.counts} in {seed_seconds:.1f}s ({backend})")
+
+                workloads = self._workloads(data)
+                results = {}
+                for route in routes:
+                    if route not in workloads:
+                        self.stderr.write(f"No workload for {route}, skipped")
+                        continue
+                    results[route] = self._measure(route, *workloads[route], rng.random(),
+                                                   options['concurrency'], options['requests'])
+        finally:
+            shutil.rmtree(work_dir, ignore_errors=True)
+
+        report = {
+            'backend': backend,
+            'tasks': tasks,
+            'concurrency': options['concurrency'],
+            'requests': options['requests'],
+            'dataset': data.counts,
+            'seed_seconds': round(seed_seconds, 3),
+            'endpoints': results,
+        }
+        if options['json'] == '-':
+            self.stdout.write(json.dumps(report, indent=2))
+            return
+        self._print_table(results)
+        if options['json']:
+            with open(options['json'], 'w') as f:
+                json.dump(report, f, indent=2)
+            self.stdout.write(f"Report written to {options['json']}")
+
+    @staticmethod
+    def _generate(storage, rng: random.Random, tasks: int, closable: int) -> Dataset:
+        """
+        Write the synthetic planner straight through the storage backend.
+
+        One user per 20 tasks in teams of TEAM_SIZE, one board per 200 tasks,
+        and tasks spread over the boards with a long tail (a few boards hold
+        most of them), assigned to members of the board's team.
+        """
+        data = Dataset()
+        user_count = max(TEAM_SIZE, tasks // 20)
+        with storage.transaction():
+            for i in range(user_count):
+                data.users.append(storage.create('users', {'name': f'user-{i}', 'display_name': f'User {i}'}))
+        with storage.transaction():
+            for i in range(0, user_count - TEAM_SIZE + 1, TEAM_SIZE):
+                members = data.users[i:i + TEAM_SIZE]
+                team_id = storage.create('teams', {
+                    'name': f'team-{i // TEAM_SIZE}',
+                    'description': f'team of users {i} to {i + TEAM_SIZE - 1}',
+                    'admin': members[0],
+                })
+                for user_id in members:
+                    storage.create('user_teams', {'user_id': user_id, 'team_id': team_id})
+                data.teams.append(team_id)
+                data.members[team_id] = members
+
+        board_count = max(1, tasks // 200)
+        counter_ids = {}
+        with storage.transaction():
+            for i in range(board_count + closable):
+                team_id = data.teams[i % len(data.teams)]
+                board_id = storage.create('boards', {
+                    'name': f'board-{i}',
+                    'description': f'board {i}',
+                    'team_id': team_id,
+                    'status': 'OPEN',
+                    'version': 0,
+                })
+                counter_ids[board_id] = storage.create('board_counters', {
+                    'board_id': board_id,
+                    'team_id': team_id,
+                    'task_counts': {'OPEN': 0, 'IN_PROGRESS': 0, 'COMPLETE': 0, 'total': 0},
+                    'version': 0,
+                })
+                data.board_team[board_id] = team_id
+                # Boards past board_count stay empty so boards/close can succeed.
+                (data.boards if i < board_count else data.closable).append(board_id)
+
+        weights = [1 / (rank + 1) ** 0.8 for rank in range(board_count)]
+        per_board = [0] * board_count
+        for index in rng.choices(range(board_count), weights, k=tasks):
+            per_board[index] += 1
+        seen = 0
+        for board_id, count in zip(data.boards, per_board):
+            with storage.transaction():
+                counts = {'OPEN': 0, 'IN_PROGRESS': 0, 'COMPLETE': 0, 'total': count}
+                for i in range(count):
+                    status = rng.choice(TASK_STATUSES)
+                    counts[status] += 1
+                    task_id = storage.create('tasks', {
+                        'title': f'task-{i}',
+                        'description': f'task {i} of {board_id}',
+                        'user_id': data.member(rng, board_id),
+                        'board_id': board_id,
+                        'status': status,
+                    })
+                    # Reservoir sample, so large runs keep a bounded id list.
+                    seen += 1
+                    if len(data.tasks) < TASK_SAMPLE:
+                        data.tasks.append(task_id)
+                    elif rng.random() < TASK_SAMPLE / seen:
+                        data.tasks[rng.randrange(TASK_SAMPLE)] = task_id
+                storage.update('board_counters', counter_ids[board_id], {'task_counts': counts})
+
+        data.counts = {
+            'users': user_count,
+            'teams': len(data.teams),
+            'boards': board_count + closable,
+            'tasks': tasks,
+        }
+        return data
+
+    @staticmethod
+    def _workloads(data: Dataset) -> dict:
+        """route -> (HTTP method, payload factory taking a Random)."""
+        def task_payload(rng, board_id):
+            return {
+                'title': data.unique('bench-task'),
+                'description': 'benchmark task',
+                'user_id': data.member(rng, board_id),
+                'board_id': board_id,
+            }
+
+        closable = iter(data.closable)
+        return {
+            'users/create': ('post', lambda rng: {'name': data.unique('bench-user'), 'display_name': 'Bench'}),
+            'users': ('get', lambda rng: {'limit': 100}),
+            'users/describe': ('post', lambda rng: {'id': rng.choice(data.users)}),
+            'users/update': ('put', lambda rng: {
+                'id': rng.choice(data.users), 'user': {'display_name': data.unique('Bench')},
+            }),
+            'users/teams': ('post', lambda rng: {'id': rng.choice(data.users)}),
+
+            'teams/create': ('post', lambda rng: {
+                'name': data.unique('bench-team'), 'description': 'benchmark team', 'admin': rng.choice(data.users),
+            }),
+            'teams': ('get', lambda rng: {'limit': 100}),
+            'teams/describe': ('post', lambda rng: {'id': rng.choice(data.teams)}),
+            'teams/update': ('put', lambda rng: {
+                'id': rng.choice(data.teams), 'team': {'description': data.unique('benchmark team')},
+            }),
+            'teams/add-users': ('post', lambda rng: {'id': rng.choice(data.teams), 'users': [rng.choice(data.users)]}),
+            'teams/remove-users': ('post', lambda rng: {
+                'id': (team_id := rng.choice(data.teams)), 'users': [rng.choice(data.members[team_id][1:])],
+            }),
+            'teams/users': ('post', lambda rng: {'id': rng.choice(data.teams)}),
+
+            'boards/create': ('post', lambda rng: {
+                'name': data.unique('bench-board'), 'description': 'benchmark board', 'team_id': rng.choice(data.teams),
+            }),
+            'boards/close': ('post', lambda rng: {'id': next(closable)}),
+            'boards/list': ('post', lambda rng: {'id': rng.choice(data.teams)}),
+            'boards/export': ('post', lambda rng: {'id': rng.choice(data.boards)}),
+            'boards/progress': ('post', lambda rng: {'team_id': rng.choice(data.teams)}),
+
+            'tasks/create': ('post', lambda rng: task_payload(rng, rng.choice(data.boards))),
+            'tasks/update': ('put', lambda rng: {'id': rng.choice(data.tasks), 'status': rng.choice(TASK_STATUSES)}),
+            'tasks/bulk-create': ('post', lambda rng: {
+                'board_id': (board_id := rng.choice(data.boards)),
+                'tasks': [task_payload(rng, board_id) for _ in range(BULK_SIZE)],
+            }),
+            'tasks/bulk-update': ('put', lambda rng: {
+                'tasks': [{'id': task_id, 'status': rng.choice(TASK_STATUSES)}
+                          for task_id in rng.sample(data.tasks, min(BULK_SIZE, len(data.tasks)))],
+            }),
+
+            '_cache': ('get', lambda rng: {}),
+            '_metrics': ('get', lambda rng: {}),
+        }
+
+    @staticmethod
+    def _measure(route: str, method: str, payload, seed: float, concurrency: int, requests: int) -> dict:
+        rng = random.Random(seed)
+        payloads = [payload(rng) for _ in range(requests)]
+        local = threading.local()
+
+        def send(body):
+            client = getattr(local, 'client', None)
+            if client is None:
+                client = local.client = Client(raise_request_exception=False)
+            started = time.perf_counter()
+            if method == 'get':
+                response = client.get(f'/api/{route}', body)
+            else:
+                response = getattr(client, method)(f'/api/{route}', json.dumps(body), content_type='application/json')
+            if response.streaming:
+                b''.join(response.streaming_content)
+            return time.perf_counter() - started, response.status_code
+
+        # 4xx responses are counted as errors; keep django.request from logging each one.
+        request_logger = logging.getLogger('django.request')
+        level = request_logger.level
+        request_logger.setLevel(logging.ERROR)
+        try:
+            started = time.perf_counter()
+            with ThreadPoolExecutor(concurrency) as pool:
+                outcomes = list(pool.map(send, payloads))
+            elapsed = time.perf_counter() - started
+        finally:
+            request_logger.setLevel(level)
+
+        latencies = sorted(latency for latency, _ in outcomes)
+        return {
+            'method': method.upper(),
+            'requests': requests,
+            'errors': sum(1 for _, code in outcomes if code >= 400),
+            'rps': round(requests / elapsed, 1),
+            'p50_ms': _percentile(latencies, 50),
+            'p95_ms': _percentile(latencies, 95),
+            'p99_ms': _percentile(latencies, 99),
+            'max_ms': round(latencies[-1] * 1000, 2),
+        }
+
+    def _print_table(self, results: dict):
+        self.stdout.write(f"{'endpoint':<20} {'method':<6} {'reqs':>6} {'errors':>6} {'req/s':>9} "
+                          f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8} {'max ms':>8}")
+        for route, result in results.items():
+            self.stdout.write(f"{route:<20} {result['method']:<6} {result['requests']:>6} {result['errors']:>6} "
+                              f"{result['rps']:>9.1f} {result['p50_ms']:>8.2f} {result['p95_ms']:>8.2f} "
+                              f"{result['p99_ms']:>8.2f} {result['max_ms']:>8.2f}")
+
+
+def _percentile(latencies: list, percent: int) -> float:
+    # Nearest-rank percentile of sorted latencies in seconds, reported in ms.
+    rank = max(0, -(-len(latencies) * percent // 100) - 1)
+    return round(latencies[rank] * 1000, 2)
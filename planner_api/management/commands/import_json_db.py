@@ -0,0 +1,41 @@
+import glob
+import os
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planner_api.json_codecs import decode_table, get_codec
+from planner_api.sqlite_storage import SqliteStorage
+from planner_api.storage import Table
+
+
+class Command(BaseCommand):
+    help = "Bulk import db/*.json files written by FileStorage into the SQLite backend"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--source', default='db', help="Directory holding the <entity>.json files")
+        parser.add_argument('--target', default='db', help="Directory of the SQLite database")
+        parser.add_argument('--filename', default='planner.sqlite3', help="SQLite database file name")
+
+    def handle(self, *args, **options):
+        # db/<entity>.json, or db/<entity>/<partition>.json for partitioned entity types.
+        paths = sorted(glob.glob(os.path.join(options['source'], '*.json')))
+        paths += sorted(glob.glob(os.path.join(options['source'], '*', '*.json')))
+        if not paths:
+            raise CommandError(f"No .json files found in {options['source']}")
+
+        storage = SqliteStorage(options['target'], options['filename'])
+        codec = get_codec()
+        tables = {}
+        for path in paths:
+            relative = os.path.relpath(path, options['source'])
+            entity_type = relative.split(os.sep, 1)[0] if os.sep in relative else os.path.splitext(relative)[0]
+            with open(path, 'rb') as f:
+                tables.setdefault(entity_type, []).extend(decode_table(codec, f.read()).values())
+        for entity_type, records in tables.items():
+            # Rows keep their insertion order, which unpaged reads return, so
+            # partitions are merged back into creation order first.
+            records.sort(key=Table.order_key)
+            count = storage.bulk_load(entity_type, records)
+            self.stdout.write(f"{entity_type}: {count} records")
+
+        self.stdout.write(self.style.SUCCESS(f"Imported into {storage.path}"))
@@ -0,0 +1,49 @@
+import io
+import pstats
+
+from django.core.management.base import BaseCommand, CommandError
+
+from planner_api.profiling import Profiler, list_profiles, read_header
+
+
+class Command(BaseCommand):
+    help = "List the request profiles captured by PLANNER_PROFILING, or aggregate them into one pstats report"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dir', default=None, help="Profile directory (default: PLANNER_PROFILING['DIR'])")
+        parser.add_argument('--path', default=None, help="Only profiles of request paths containing this")
+        parser.add_argument('--min-ms', type=float, default=0, help="Only profiles of requests at least this slow")
+        parser.add_argument('--aggregate', action='store_true',
+                            help="Merge the matching profiles and print the top functions")
+        parser.add_argument('--sort', choices=['cumulative', 'tottime', 'ncalls'], default='cumulative',
+                            help="Sort key of the aggregate report")
+        parser.add_argument('--top', type=int, default=30, help="Functions in the aggregate report")
+
+    def handle(self, *args, **options):
+        directory = options['dir'] or Profiler.from_settings().directory
+        selected = []
+        for path in list_profiles(directory):
+            header = read_header(path)
+            if header is None:
+                continue
+            if options['path'] and options['path'] not in header['path']:
+                continue
+            if header['ms'] < options['min_ms']:
+                continue
+            selected.append((path, header))
+        if not selected:
+            raise CommandError(f"No matching profiles in {directory}")
+
+        if not options['aggregate']:
+            self.stdout.write(f"{'time':<26} {'ms':>9} {'method':<6} {'status':>6} {'path':<28} file")
+            for path, header in selected:
+                self.stdout.write(f"{header['time']:<26} {header['ms']:>9.1f} {header['method']:<6} "
+                                  f"{header['status']:>6} {header['path']:<28} {path}")
+            return
+
+        report = io.StringIO()
+        stats = pstats.Stats(*[path for path, _ in selected], stream=report)
+        total_ms = sum(header['ms'] for _, header in selected)
+        report.write(f"{len(selected)} profiles, {total_ms:.1f}ms of requests\n")
+        stats.sort_stats(options['sort']).print_stats(options['top'])
+        self.stdout.write(report.getvalue())
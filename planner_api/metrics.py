@@ -0,0 +1,212 @@
+import bisect
+import os
+import threading
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_METRICS = {
+    # Latency histogram bucket bounds, in seconds.
+    'BUCKETS': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+}
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class Histogram:
+    __slots__ = ('buckets', 'counts', 'sum')
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # Per bucket, not cumulative; the last slot is +Inf.
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class Metrics:
+    """
+    Process-wide metrics, rendered in the Prometheus text format.
+
+    MetricsMiddleware feeds the request counts and latencies, and the
+    instrumentation hooks feed the storage counters, aggregated per entity
+    type (every tasks/<board> partition counts as 'tasks'). Cache hit ratios
+    and file sizes are read when the metrics are rendered.
+    """
+
+    def __init__(self, buckets: Tuple[float, ...] = DEFAULT_METRICS['BUCKETS']):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        # (route, method, status) -> count
+        self.requests: Dict[Tuple[str, str, int], int] = {}
+        # (route, method) -> latency
+        self.latency: Dict[Tuple[str, str], Histogram] = {}
+        # (entity type, phase) -> duration of storage loads, parses, saves and scans
+        self.operations: Dict[Tuple[str, str], Histogram] = {}
+        # entity type -> [bytes read, bytes written, records scanned]
+        self.volumes: Dict[str, List[int]] = {}
+
+    def observe_request(self, route: str, method: str, status: int, seconds: float):
+        with self._lock:
+            key = (route, method, status)
+            self.requests[key] = self.requests.get(key, 0) + 1
+            histogram = self.latency.get((route, method))
+            if histogram is None:
+                histogram = self.latency[(route, method)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    # instrumentation subscriber interface
+
+    def phase(self, entity_type: str, phase: str, seconds: float):
+        with self._lock:
+            histogram = self.operations.get((entity_type, phase))
+            if histogram is None:
+                histogram = self.operations[(entity_type, phase)] = Histogram(self.buckets)
+            histogram.observe(seconds)
+
+    def count(self, entity_type: str, bytes_read: int, bytes_written: int, records_scanned: int):
+        with self._lock:
+            volumes = self.volumes.get(entity_type)
+            if volumes is None:
+                volumes = self.volumes[entity_type] = [0, 0, 0]
+            volumes[0] += bytes_read
+            volumes[1] += bytes_written
+            volumes[2] += records_scanned
+
+    def render(self, storage=None, response_cache=None) -> str:
+        lines: List[str] = []
+        with self._lock:
+            _family(lines, 'planner_http_requests_total', 'counter', "Requests served, by route and status.")
+            for (route, method, status), value in sorted(self.requests.items()):
+                lines.append(f'planner_http_requests_total{_labels(route=route, method=method, status=status)} {value}')
+            _family(lines, 'planner_http_request_duration_seconds', 'histogram', "Request latency, by route.")
+            for (route, method), histogram in sorted(self.latency.items()):
+                _histogram(lines, 'planner_http_request_duration_seconds', histogram, route=route, method=method)
+
+            _family(lines, 'planner_storage_operation_duration_seconds', 'histogram',
+                    "Storage table loads, parses, saves and filter scans, by entity type.")
+            for (entity_type, phase), histogram in sorted(self.operations.items()):
+                _histogram(lines, 'planner_storage_operation_duration_seconds', histogram,
+                           entity=entity_type, operation=phase)
+            volumes = sorted(self.volumes.items())
+            for index, (name, help_text) in enumerate([
+                ('planner_storage_read_bytes_total', "Bytes read from table files."),
+                ('planner_storage_written_bytes_total', "Bytes written to table files."),
+                ('planner_storage_scanned_records_total', "Records examined by filter_by, count and page."),
+            ]):
+                _family(lines, name, 'counter', help_text)
+                for entity_type, values in volumes:
+                    lines.append(f'{name}{_labels(entity=entity_type)} {values[index]}')
+
+        if storage is not None and hasattr(storage, 'cache_stats'):
+            per_entity: Dict[str, List[int]] = {}
+            for key, stats in storage.cache_stats().items():
+                totals = per_entity.setdefault(key.split('/', 1)[0], [0, 0])
+                totals[0] += stats['hits']
+                totals[1] += stats['misses']
+            _family(lines, 'planner_storage_cache_hits_total', 'counter', "Table reads served from memory.")
+            for entity_type, (hits, _) in sorted(per_entity.items()):
+                lines.append(f'planner_storage_cache_hits_total{_labels(entity=entity_type)} {hits}')
+            _family(lines, 'planner_storage_cache_misses_total', 'counter', "Table reads that loaded the file.")
+            for entity_type, (_, misses) in sorted(per_entity.items()):
+                lines.append(f'planner_storage_cache_misses_total{_labels(entity=entity_type)} {misses}')
+            _family(lines, 'planner_storage_cache_hit_ratio', 'gauge', "Share of table reads served from memory.")
+            for entity_type, (hits, misses) in sorted(per_entity.items()):
+                ratio = hits / (hits + misses) if hits + misses else 0.0
+                lines.append(f'planner_storage_cache_hit_ratio{_labels(entity=entity_type)} {ratio:.6f}')
+
+        if response_cache is not None:
+            stats = response_cache.stats()
+            for name, kind, help_text, value in [
+                ('planner_response_cache_hits_total', 'counter', "Read results served from the response cache.",
+                 stats['hits']),
+                ('planner_response_cache_misses_total', 'counter', "Read results computed.", stats['misses']),
+                ('planner_response_cache_hit_ratio', 'gauge', "Share of read results served from the cache.",
+                 f"{stats['hit_rate']:.6f}"),
+                ('planner_response_cache_entries', 'gauge', "Results held in the response cache.", stats['entries']),
+            ]:
+                _family(lines, name, kind, help_text)
+                lines.append(f'{name} {value}')
+
+        db_dir = getattr(storage, 'db_dir', None)
+        if db_dir is not None:
+            files = _db_files(db_dir)
+            for index, (name, help_text) in enumerate([
+                ('planner_db_bytes', "Size of the storage files, by entity type."),
+                ('planner_db_files', "Number of storage files, by entity type."),
+                ('planner_db_largest_file_bytes', "Size of the largest storage file, by entity type."),
+            ]):
+                _family(lines, name, 'gauge', help_text)
+                for entity_type, values in sorted(files.items()):
+                    lines.append(f'{name}{_labels(entity=entity_type)} {values[index]}')
+
+        return '\n'.join(lines) + '\n'
+
+
+def _db_files(db_dir: str) -> Dict[str, List[int]]:
+    """entity type -> [total bytes, files, largest file] for db/<entity>.* and db/<entity>/*."""
+    files: Dict[str, List[int]] = {}
+
+    def add(entity_type: str, size: int):
+        totals = files.setdefault(entity_type, [0, 0, 0])
+        totals[0] += size
+        totals[1] += 1
+        totals[2] = max(totals[2], size)
+
+    try:
+        entries = list(os.scandir(db_dir))
+    except FileNotFoundError:
+        return files
+    for entry in entries:
+        try:
+            if entry.is_dir():
+                for child in os.scandir(entry.path):
+                    if child.is_file():
+                        add(entry.name, child.stat().st_size)
+            elif entry.is_file():
+                add(entry.name.split('.', 1)[0], entry.stat().st_size)
+        except FileNotFoundError:
+            # Replaced or removed by a concurrent write.
+            continue
+    return files
+
+
+def _labels(**labels) -> str:
+    def escape(value) -> str:
+        return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+    return '{' + ','.join(f'{key}="{escape(value)}"' for key, value in labels.items()) + '}'
+
+
+def _family(lines: List[str], name: str, kind: str, help_text: str):
+    lines.append(f'# HELP {name} {help_text}')
+    lines.append(f'# TYPE {name} {kind}')
+
+
+def _histogram(lines: List[str], name: str, histogram: Histogram, **labels):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f'{name}_bucket{_labels(**labels, le=repr(float(bound)))} {cumulative}')
+    cumulative += histogram.counts[-1]
+    lines.append(f'{name}_bucket{_labels(**labels, le="+Inf")} {cumulative}')
+    lines.append(f'{name}_sum{_labels(**labels)} {histogram.sum:.6f}')
+    lines.append(f'{name}_count{_labels(**labels)} {cumulative}')
+
+
+_metrics: Optional[Metrics] = None
+_metrics_lock = threading.Lock()
+
+
+def get_metrics() -> Metrics:
+    """Process-wide registry with the buckets of settings.PLANNER_METRICS."""
+    global _metrics
+    with _metrics_lock:
+        if _metrics is None:
+            from django.conf import settings
+
+            config = DEFAULT_METRICS
+            if settings.configured:
+                config = {**DEFAULT_METRICS, **getattr(settings, 'PLANNER_METRICS', {})}
+            _metrics = Metrics(config['BUCKETS'])
+        return _metrics
@@ -0,0 +1,146 @@
+import json
+import logging
+import time
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+
+from . import instrumentation
+from .metrics import get_metrics
+
+DEFAULT_TIMING = {
+    'HEADER': True,
+    'LOG': False,
+}
+
+logger = logging.getLogger('planner_api.timing')
+
+
+class ServerTimingMiddleware:
+    """
+    Attribute each request's time to storage phases.
+
+    Collects the instrumentation counters for the request and reports them
+    as a Server-Timing header (load / parse / save / scan / render / total,
+    each with a duration and a count, plus bytes read and written and
+    records scanned) and, with PLANNER_TIMING['LOG'], as one JSON line on
+    the planner_api.timing logger. Put it first in MIDDLEWARE so 'total'
+    covers the rest of the stack.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        from django.conf import settings
+
+        self.get_response = get_response
+        config = {**DEFAULT_TIMING, **getattr(settings, 'PLANNER_TIMING', {})}
+        self.header = config['HEADER']
+        self.log = config['LOG']
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        if not (self.header or self.log):
+            return self.get_response(request)
+        token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = self.get_response(request)
+        finally:
+            timings = instrumentation.stop(token)
+        self._report(request, response, timings, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        if not (self.header or self.log):
+            return await self.get_response(request)
+        token = instrumentation.start()
+        started = time.perf_counter()
+        try:
+            response = await self.get_response(request)
+        finally:
+            timings = instrumentation.stop(token)
+        self._report(request, response, timings, time.perf_counter() - started)
+        return response
+
+    def process_template_response(self, request, response):
+        # DRF responses are rendered after the view returns; time that too.
+        timings = instrumentation.current()
+        if timings is not None:
+            started = time.perf_counter()
+            response.add_post_render_callback(lambda _: timings.add('render', time.perf_counter() - started))
+        return response
+
+    def _report(self, request, response, timings: instrumentation.Timings, total: float):
+        # A streamed response may still be reading on an executor thread.
+        with timings.lock:
+            phases = {phase: (int(count), seconds) for phase, (count, seconds) in timings.phases.items()}
+            bytes_read, bytes_written, records_scanned = (
+                timings.bytes_read, timings.bytes_written, timings.records_scanned
+            )
+        if self.header:
+            metrics = [
+                f'{phase};dur={seconds * 1000:.3f};desc="{count}x"'
+                for phase, (count, seconds) in phases.items()
+            ]
+            metrics += [
+                f'bytes-read;desc="{bytes_read}"',
+                f'bytes-written;desc="{bytes_written}"',
+                f'records-scanned;desc="{records_scanned}"',
+                f'total;dur={total * 1000:.3f}',
+            ]
+            response['Server-Timing'] = ', '.join(metrics)
+        if self.log:
+            logger.info(json.dumps({
+                'method': request.method,
+                'path': request.path,
+                'status': response.status_code,
+                'total_ms': round(total * 1000, 3),
+                'phases': {
+                    phase: {'count': count, 'ms': round(seconds * 1000, 3)}
+                    for phase, (count, seconds) in phases.items()
+                },
+                'bytes_read': bytes_read,
+                'bytes_written': bytes_written,
+                'records_scanned': records_scanned,
+            }))
+
+
+class MetricsMiddleware:
+    """
+    Count requests and observe their latency per route for GET /api/_metrics,
+    and subscribe the metrics registry to the storage instrumentation.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        self.metrics = get_metrics()
+        instrumentation.subscribe(self.metrics)
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        started = time.perf_counter()
+        response = self.get_response(request)
+        self._observe(request, response, time.perf_counter() - started)
+        return response
+
+    async def __acall__(self, request):
+        started = time.perf_counter()
+        response = await self.get_response(request)
+        self._observe(request, response, time.perf_counter() - started)
+        return response
+
+    def _observe(self, request, response, seconds: float):
+        # The route pattern, not the path, keeps the label set bounded.
+        match = request.resolver_match
+        route = match.route if match is not None else 'unmatched'
+        self.metrics.observe_request(route, request.method, response.status_code, seconds)
@@ -0,0 +1,142 @@
+import cProfile
+import io
+import itertools
+import os
+import pstats
+import random
+import threading
+import time
+from datetime import datetime
+from typing import Callable, List, Optional
+
+DEFAULT_PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'THRESHOLD_MS': 500,
+    'DIR': 'profiles',
+    'TOP': 30,
+    'MAX_FILES': 500,
+}
+
+
+class Profiler:
+    """
+    Sampled cProfile capture for slow requests.
+
+    A SAMPLE_RATE share of requests runs under cProfile; when one of those
+    takes THRESHOLD_MS or more, its profile is kept in `directory` as
+    <name>.prof (for pstats / snakeviz) plus <name>.txt, the TOP functions
+    by cumulative and by own time under a one-line header. Only the newest
+    MAX_FILES profiles are kept. Unsampled requests pay one random() call.
+    """
+
+    def __init__(self, enabled: bool = False, sample_rate: float = DEFAULT_PROFILING['SAMPLE_RATE'],
+                 threshold_ms: float = DEFAULT_PROFILING['THRESHOLD_MS'], directory: str = DEFAULT_PROFILING['DIR'],
+                 top: int = DEFAULT_PROFILING['TOP'], max_files: int = DEFAULT_PROFILING['MAX_FILES']):
+        self.enabled = enabled
+        self.sample_rate = sample_rate
+        self.threshold_ms = threshold_ms
+        self.directory = directory
+        self.top = top
+        self.max_files = max_files
+        self._serial = itertools.count()
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls) -> 'Profiler':
+        from django.conf import settings
+
+        config = DEFAULT_PROFILING
+        if settings.configured:
+            config = {**DEFAULT_PROFILING, **getattr(settings, 'PLANNER_PROFILING', {})}
+        return cls(config['ENABLED'], config['SAMPLE_RATE'], config['THRESHOLD_MS'], config['DIR'],
+                   config['TOP'], config['MAX_FILES'])
+
+    def run(self, request, func: Callable, *args, **kwargs):
+        """Call func(*args, **kwargs) for `request`, profiled when sampled."""
+        if not self.enabled or random.random() >= self.sample_rate:
+            return func(*args, **kwargs)
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active on this thread.
+            return func(*args, **kwargs)
+        started = time.perf_counter()
+        response = None
+        try:
+            response = func(*args, **kwargs)
+            return response
+        finally:
+            profile.disable()
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            if elapsed_ms >= self.threshold_ms:
+                self.save(profile, request, getattr(response, 'status_code', 500), elapsed_ms)
+
+    def save(self, profile: cProfile.Profile, request, status_code: int, elapsed_ms: float) -> str:
+        """Write <name>.prof and <name>.txt; returns the path without extension."""
+        os.makedirs(self.directory, exist_ok=True)
+        now = datetime.now()
+        slug = request.path.strip('/').replace('/', '_') or 'root'
+        name = f"{now:%Y%m%dT%H%M%S%f}-{os.getpid()}-{next(self._serial)}-{request.method}-{slug}"
+        base = os.path.join(self.directory, name)
+        profile.dump_stats(base + '.prof')
+
+        summary = io.StringIO()
+        summary.write(f"# {now.isoformat()} {request.method} {request.path} {status_code} {elapsed_ms:.1f}ms\n")
+        stats = pstats.Stats(profile, stream=summary)
+        for sort in ('cumulative', 'tottime'):
+            summary.write(f"\n## by {sort}\n")
+            stats.sort_stats(sort).print_stats(self.top)
+        with open(base + '.txt', 'w') as f:
+            f.write(summary.getvalue())
+
+        self.prune()
+        return base
+
+    def prune(self):
+        with self._lock:
+            profiles = list_profiles(self.directory)
+            for path in profiles[:max(0, len(profiles) - self.max_files)]:
+                for extension in ('.prof', '.txt'):
+                    try:
+                        os.remove(path[:-len('.prof')] + extension)
+                    except FileNotFoundError:
+                        pass
+
+
+def list_profiles(directory: str) -> List[str]:
+    """Paths of the .prof files in `directory`, oldest first."""
+    try:
+        names = [name for name in os.listdir(directory) if name.endswith('.prof')]
+    except FileNotFoundError:
+        return []
+    # Names start with a timestamp to the microsecond, then pid and serial.
+    return [os.path.join(directory, name) for name in sorted(names)]
+
+
+def read_header(path: str) -> Optional[dict]:
+    """{'time', 'method', 'path', 'status', 'ms'} from a profile's .txt summary."""
+    try:
+        with open(path[:-len('.prof')] + '.txt') as f:
+            line = f.readline()
+    except FileNotFoundError:
+        return None
+    parts = line.lstrip('# ').split()
+    if len(parts) != 5:
+        return None
+    return {'time': parts[0], 'method': parts[1], 'path': parts[2], 'status': int(parts[3]),
+            'ms': float(parts[4].rstrip('ms'))}
+
+
+_profiler: Optional[Profiler] = None
+_profiler_lock = threading.Lock()
+
+
+def get_profiler() -> Profiler:
+    """Process-wide profiler configured by settings.PLANNER_PROFILING."""
+    global _profiler
+    with _profiler_lock:
+        if _profiler is None:
+            _profiler = Profiler.from_settings()
+        return _profiler
@@ -0,0 +1,574 @@
+import bisect
+import glob
+import mmap
+import os
+import struct
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from .bases.storage_base import StorageBase
+from .json_codecs import decode_table, get_codec
+from .storage import FileStorage, IndexKey, OrderKey, Table
+
+try:
+    import fcntl
+except ImportError:  # not available on Windows
+    fcntl = None
+
+SEGMENT_MAGIC = b'PLNRSEG1'
+INDEX_MAGIC = b'PLNRIDX1'
+
+# Segment record header: magic, op, id, payload length. The payload (the
+# encoded record) follows; deletes have none.
+_RECORD = struct.Struct('<2sB36sI')
+_RECORD_MAGIC = b'PR'
+# Index entry: id, creation_time, payload offset, payload length. An entry
+# with offset 0 is a delete. A creation_time that does not fit in its 26
+# bytes (e.g. with a UTC offset) is left empty and read from the payload.
+_TIME_SIZE = 26
+_ENTRY = struct.Struct(f'<36s{_TIME_SIZE}sQI')
+
+_PUT = 1
+_DELETE = 0
+
+
+def _index_time(record: Dict[str, Any]) -> bytes:
+    """creation_time for an index entry, or b'' when it only fits in the payload."""
+    try:
+        raw = record.get('creation_time', '').encode('ascii')
+    except UnicodeEncodeError:
+        return b''
+    return raw if len(raw) <= _TIME_SIZE else b''
+
+
+class Segment:
+    """
+    One entity type: db/<entity>.seg holds the records, db/<entity>.idx says
+    where the live version of each one starts.
+
+    The index is loaded into `locations` (id -> (creation_time, offset,
+    length), in creation order) and extended from its tail when another
+    process appends. Records themselves are decoded one at a time from an
+    mmap of the segment. Hash indexes on record fields are only built, with
+    one pass over the segment, the first time a filtered read needs them.
+    """
+
+    def __init__(self, path: str, codec, index_keys: List[IndexKey], scope_fields: Tuple[str, ...] = (),
+                 serial: int = 0):
+        self.segment_path = path + '.seg'
+        self.index_path = path + '.idx'
+        self.codec = codec
+        self.index_keys = list(index_keys)
+        # Version counters per scope (() for the whole entity type); `serial`
+        # and `external_changes` make tokens unique across reloads.
+        self.scope_fields = scope_fields
+        self.counters: Dict[tuple, int] = {}
+        self.serial = serial
+        self.external_changes = 0
+        self.locations: Dict[str, Tuple[str, int, int]] = {}
+        # Writes of the open transaction, not in the files yet (None = deleted).
+        self.staged: Dict[str, Optional[Dict[str, Any]]] = {}
+        self.indexes: Optional[Dict[IndexKey, Dict[tuple, Dict[str, None]]]] = None
+        self.indexed: Dict[str, List[Optional[tuple]]] = {}
+        self.order: Optional[List[OrderKey]] = None
+        self.index_offset = len(INDEX_MAGIC)
+        self.stamp: Optional[Tuple[int, int]] = None
+        self._map: Optional[mmap.mmap] = None
+
+    # -- files --
+
+    def create_files(self, records: List[Dict[str, Any]]):
+        """Start both files, holding `records` (used to import older data)."""
+        for path, magic in ((self.segment_path, SEGMENT_MAGIC), (self.index_path, INDEX_MAGIC)):
+            with open(path + '.tmp', 'wb') as f:
+                f.write(magic)
+        self._append([(record['id'], record) for record in records], self.segment_path + '.tmp',
+                      self.index_path + '.tmp')
+        # Segment first: an index must never point past the end of its segment.
+        os.replace(self.segment_path + '.tmp', self.segment_path)
+        os.replace(self.index_path + '.tmp', self.index_path)
+
+    def refresh(self):
+        try:
+            st = os.stat(self.index_path)
+        except FileNotFoundError:
+            st = None
+        stamp = (st.st_mtime_ns, st.st_size) if st else None
+        if stamp == self.stamp:
+            return
+        if stamp is None or stamp[1] < self.index_offset:
+            # Rewritten (or removed) underneath us: start over.
+            self._reset()
+        if stamp is not None:
+            with open(self.index_path, 'rb') as f:
+                f.seek(self.index_offset)
+                # Only whole entries; a torn one is finished or dropped later.
+                data = f.read((stamp[1] - self.index_offset) // _ENTRY.size * _ENTRY.size)
+            changed = False
+            for raw_id, raw_time, offset, length in _ENTRY.iter_unpack(data):
+                entity_id = raw_id.rstrip(b'\0').decode('ascii')
+                location = None
+                if offset:
+                    creation_time = raw_time.rstrip(b'\0').decode('ascii')
+                    if not creation_time:
+                        creation_time = self._decode((creation_time, offset, length)).get('creation_time', '')
+                    location = (creation_time, offset, length)
+                if self.locations.get(entity_id) == location:
+                    continue  # our own write
+                changed = True
+                if location is None:
+                    self.locations.pop(entity_id, None)
+                else:
+                    self.locations[entity_id] = location
+                if self.indexes is not None and entity_id not in self.staged:
+                    self._reindex(entity_id, self._decode(location) if location else None)
+            self.index_offset += len(data)
+            if changed:
+                self.order = None
+                self.external_changes += 1
+        self.stamp = stamp
+
+    def _reset(self):
+        self.external_changes += 1
+        self.locations = {}
+        self.indexes = None
+        self.indexed = {}
+        self.order = None
+        self.index_offset = len(INDEX_MAGIC)
+        self.close()
+
+    def close(self):
+        if self._map is not None:
+            self._map.close()
+            self._map = None
+
+    def _decode(self, location: Tuple[str, int, int]) -> Dict[str, Any]:
+        _, offset, length = location
+        end = offset + length
+        if self._map is None or len(self._map) < end:
+            self.close()
+            with open(self.segment_path, 'rb') as f:
+                self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        return self.codec.loads(self._map[offset:end])
+
+    def _append(self, items: List[Tuple[str, Optional[Dict[str, Any]]]],
+                segment_path: Optional[str] = None, index_path: Optional[str] = None):
+        segment_path = segment_path or self.segment_path
+        index_path = index_path or self.index_path
+        with open(index_path, 'ab') as index_file:
+            if fcntl is not None:
+                # Writers in other processes append to the same files.
+                fcntl.flock(index_file, fcntl.LOCK_EX)
+            try:
+                with open(segment_path, 'ab') as segment_file:
+                    position = segment_file.seek(0, os.SEEK_END)
+                    chunks = []
+                    entries = []
+                    for entity_id, record in items:
+                        raw_id = entity_id.encode('ascii')
+                        if len(raw_id) > 36:
+                            raise ValueError(f"Id too long for the record store: {entity_id}")
+                        if record is None:
+                            chunks.append(_RECORD.pack(_RECORD_MAGIC, _DELETE, raw_id, 0))
+                            entries.append(_ENTRY.pack(raw_id, b'', 0, 0))
+                            position += _RECORD.size
+                            continue
+                        payload = self.codec.dumps(record)
+                        chunks.append(_RECORD.pack(_RECORD_MAGIC, _PUT, raw_id, len(payload)))
+                        chunks.append(payload)
+                        creation_time = _index_time(record)
+                        entries.append(_ENTRY.pack(raw_id, creation_time, position + _RECORD.size, len(payload)))
+                        position += _RECORD.size + len(payload)
+                    segment_file.write(b''.join(chunks))
+                    segment_file.flush()
+                index_size = index_file.seek(0, os.SEEK_END)
+                if (index_size - len(INDEX_MAGIC)) % _ENTRY.size:
+                    # A writer died mid-entry; cut it off before appending.
+                    index_file.truncate(index_size - (index_size - len(INDEX_MAGIC)) % _ENTRY.size)
+                index_file.write(b''.join(entries))
+            finally:
+                if fcntl is not None:
+                    index_file.flush()
+                    fcntl.flock(index_file, fcntl.LOCK_UN)
+        return [
+            (entity_id, _ENTRY.unpack(entry)) for (entity_id, _), entry in zip(items, entries)
+        ]
+
+    def flush(self):
+        """Write the staged changes to the files."""
+        if not self.staged:
+            return
+        items = list(self.staged.items())
+        appended = self._append(items)
+        for entity_id, (_, _, offset, length) in appended:
+            if offset:
+                self.locations[entity_id] = (self.staged[entity_id].get('creation_time', ''), offset, length)
+            else:
+                self.locations.pop(entity_id, None)
+        self.staged = {}
+
+    def rollback(self):
+        staged, self.staged = self.staged, {}
+        if self.indexes is not None:
+            for entity_id in staged:
+                self._reindex(entity_id, self.read(entity_id))
+        self.order = None
+
+    # -- records --
+
+    def read(self, entity_id: str) -> Optional[Dict[str, Any]]:
+        if entity_id in self.staged:
+            return self.staged[entity_id]
+        location = self.locations.get(entity_id)
+        return self._decode(location) if location is not None else None
+
+    def ids(self) -> List[str]:
+        """Live ids in creation order."""
+        ids = [entity_id for entity_id in self.locations if self.staged.get(entity_id, True) is not None]
+        ids.extend(entity_id for entity_id, record in self.staged.items()
+                   if record is not None and entity_id not in self.locations)
+        return ids
+
+    def stage(self, entity_id: str, record: Optional[Dict[str, Any]]):
+        previous = self.read(entity_id)
+        self.staged[entity_id] = record
+        scopes = {()}
+        for item in (previous, record):
+            for field in self.scope_fields:
+                if item is not None and field in item:
+                    try:
+                        scopes.add((field, item[field]))
+                    except TypeError:
+                        pass
+        for scope in scopes:
+            self.counters[scope] = self.counters.get(scope, 0) + 1
+        if self.indexes is not None:
+            self._reindex(entity_id, record)
+        if self.order is not None:
+            old_key = Table.order_key(previous) if previous is not None else None
+            new_key = Table.order_key(record) if record is not None else None
+            if old_key != new_key:
+                if old_key is not None:
+                    i = bisect.bisect_left(self.order, old_key)
+                    if i < len(self.order) and self.order[i] == old_key:
+                        del self.order[i]
+                if new_key is not None:
+                    bisect.insort(self.order, new_key)
+
+    def ordered(self) -> List[OrderKey]:
+        if self.order is None:
+            order = [(location[0], entity_id) for entity_id, location in self.locations.items()
+                     if entity_id not in self.staged]
+            order.extend(Table.order_key(record) for record in self.staged.values() if record is not None)
+            self.order = sorted(order)
+        return self.order
+
+    # -- field indexes --
+
+    def ensure_indexes(self):
+        if self.indexes is not None:
+            return
+        self.indexes = {keys: {} for keys in self.index_keys}
+        self.indexed = {}
+        for entity_id in self.ids():
+            self._reindex(entity_id, self.read(entity_id))
+
+    def _reindex(self, entity_id: str, record: Optional[Dict[str, Any]]):
+        # As Table._move: ids only change buckets when their value changed,
+        # and join the new bucket in creation order.
+        previous = self.indexed.pop(entity_id, None) or [None] * len(self.index_keys)
+        values = []
+        for keys, old in zip(self.index_keys, previous):
+            value = None
+            if record is not None and all(k in record for k in keys):
+                value = tuple(record.get(k) for k in keys)
+                try:
+                    hash(value)
+                except TypeError:  # unhashable field value
+                    value = None
+            values.append(value)
+            if value == old:
+                continue
+            bucket = self.indexes[keys].get(old) if old is not None else None
+            if bucket is not None:
+                bucket.pop(entity_id, None)
+                if not bucket:
+                    del self.indexes[keys][old]
+            if value is None:
+                continue
+            bucket = self.indexes[keys].setdefault(value, {})
+            last = next(reversed(bucket), None)
+            bucket[entity_id] = None
+            if old is not None and last is not None and self._order_key(last) > Table.order_key(record):
+                self.indexes[keys][value] = dict.fromkeys(sorted(bucket, key=self._order_key))
+        if record is not None:
+            self.indexed[entity_id] = values
+
+    def _order_key(self, entity_id: str) -> OrderKey:
+        record = self.staged.get(entity_id)
+        if record is not None:
+            return Table.order_key(record)
+        location = self.locations.get(entity_id)
+        return (location[0] if location is not None else '', entity_id)
+
+    def candidates(self, filters: Dict[str, Any]) -> Tuple[List[str], bool]:
+        """
+        Ids that may match `filters`, and whether the index used covers every
+        filter (so no record has to be decoded to confirm the match).
+        """
+        best = None
+        for keys in self.index_keys:
+            if all(k in filters for k in keys) and (best is None or len(keys) > len(best)):
+                best = keys
+        if best is None:
+            return self.ids(), False
+        self.ensure_indexes()
+        try:
+            bucket = self.indexes[best].get(tuple(filters[k] for k in best), {})
+        except TypeError:
+            return self.ids(), False
+        return list(bucket), len(best) == len(filters)
+
+
+class _Store:
+    """Process-wide state of one db directory."""
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        self.segments: Dict[str, Segment] = {}
+        self.epoch = uuid.uuid4().hex[:8]
+        self.serials = 0
+        # Segments with staged writes while a transaction is open.
+        self.txn: Optional[Set[Segment]] = None
+
+
+_stores: Dict[str, _Store] = {}
+_stores_lock = threading.Lock()
+
+
+class RecordStorage(StorageBase):
+    """
+    Binary record store for large tables that are mostly read by id.
+
+    Every write appends the record to db/<entity>.seg behind a fixed header
+    and its location to db/<entity>.idx, so `get` costs one dict probe plus
+    decoding one mmap slice, whatever the table size. Filtered reads use the
+    same hash indexes as FileStorage (built on first use). Superseded record
+    versions stay in the segment until compact() is run.
+
+    Existing db/<entity>.json (or db/<entity>/*.json partition) files are
+    imported the first time an entity type is opened.
+    """
+
+    def __init__(self, db_dir: str = "db", indexes: Optional[Dict[str, List[IndexKey]]] = None,
+                 codec: str = 'auto', partitions: Optional[Dict[str, str]] = None):
+        if partitions:
+            # Accepted so the FileStorage OPTIONS can be shared, but only empty.
+            raise ValueError("RecordStorage keeps one segment per entity type and does not support 'partitions'")
+        self.db_dir = db_dir
+        os.makedirs(db_dir, exist_ok=True)
+        self.indexes = FileStorage.INDEXES if indexes is None else indexes
+        self.codec = get_codec(codec)
+        key = os.path.abspath(db_dir)
+        with _stores_lock:
+            if key not in _stores:
+                _stores[key] = _Store()
+            self._store = _stores[key]
+
+    def _segment(self, entity_type: str) -> Segment:
+        # Callers must hold self._store.lock.
+        segment = self._store.segments.get(entity_type)
+        if segment is None:
+            if os.sep in entity_type or '/' in entity_type:
+                raise ValueError(f"Invalid entity type: {entity_type}")
+            self._store.serials += 1
+            segment = Segment(os.path.join(self.db_dir, entity_type), self.codec,
+                              self.indexes.get(entity_type, ()), FileStorage.VERSION_SCOPES.get(entity_type, ()),
+                              self._store.serials)
+            if not os.path.exists(segment.index_path):
+                segment.create_files(self._legacy_records(entity_type))
+            self._store.segments[entity_type] = segment
+        segment.refresh()
+        return segment
+
+    def _legacy_records(self, entity_type: str) -> List[Dict[str, Any]]:
+        paths = glob.glob(os.path.join(self.db_dir, f"{entity_type}.json"))
+        paths += glob.glob(os.path.join(self.db_dir, entity_type, '*.json'))
+        records = []
+        for path in paths:
+            with open(path, 'rb') as f:
+                records.extend(decode_table(self.codec, f.read()).values())
+        records.sort(key=Table.order_key)
+        return records
+
+    def _put(self, segment: Segment, entity_id: str, record: Optional[Dict[str, Any]]):
+        segment.stage(entity_id, record)
+        txn = self._store.txn
+        if txn is not None:
+            txn.add(segment)
+            return
+        try:
+            segment.flush()
+        except Exception:
+            segment.rollback()
+            raise
+
+    @contextmanager
+    def transaction(self):
+        """
+        Staged writes are visible to reads inside the block and appended
+        to the files when the outermost block exits, or dropped if it raises.
+        """
+        with self._store.lock:
+            if self._store.txn is not None:
+                yield self
+                return
+            txn = self._store.txn = set()
+            try:
+                yield self
+            except BaseException:
+                for segment in txn:
+                    segment.rollback()
+                raise
+            finally:
+                self._store.txn = None
+            try:
+                for segment in txn:
+                    segment.flush()
+            except Exception:
+                # Reload whatever made it to disk.
+                for entity_type, segment in list(self._store.segments.items()):
+                    if segment in txn:
+                        segment.close()
+                        del self._store.segments[entity_type]
+                raise
+
+    def create(self, entity_type: str, data: Dict[str, Any]) -> str:
+        entity_id = str(uuid.uuid4())
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            data['id'] = entity_id
+            data['creation_time'] = datetime.now().isoformat()
+            self._put(segment, entity_id, dict(data))
+        return entity_id
+
+    def get(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
+        with self._store.lock:
+            record = self._segment(entity_type).read(entity_id)
+            return dict(record) if record is not None else None
+
+    def get_many(self, entity_type: str, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            records = {}
+            for entity_id in entity_ids:
+                record = segment.read(entity_id)
+                if record is not None:
+                    records[entity_id] = dict(record)
+            return records
+
+    def get_all(self, entity_type: str) -> List[Dict[str, Any]]:
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            return [dict(segment.read(entity_id)) for entity_id in segment.ids()]
+
+    def update(self, entity_type: str, entity_id: str, data: Dict[str, Any]):
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            previous = segment.read(entity_id)
+            if previous is None:
+                return False
+            record = dict(previous)
+            record.update(data)
+            self._put(segment, entity_id, record)
+            return True
+
+    def delete(self, entity_type: str, entity_id: str):
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            if segment.read(entity_id) is None:
+                return False
+            self._put(segment, entity_id, None)
+            return True
+
+    def _matches(self, segment: Segment, filters: Dict[str, Any]):
+        ids, _ = segment.candidates(filters)
+        for entity_id in ids:
+            record = segment.read(entity_id)
+            if record is not None and FileStorage._match(record, filters):
+                yield record
+
+    def filter_by(self, entity_type: str, **filters) -> List[Dict[str, Any]]:
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            return [dict(record) for record in self._matches(segment, filters)]
+
+    def count(self, entity_type: str, **filters) -> int:
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            ids, exact = segment.candidates(filters)
+            if exact or not filters:
+                return len(ids)
+            return sum(1 for _ in self._matches(segment, filters))
+
+    def iter_filter(self, entity_type: str, **filters):
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            ids, _ = segment.candidates(filters)
+        for start in range(0, len(ids), FileStorage.ITER_CHUNK):
+            with self._store.lock:
+                batch = []
+                for entity_id in ids[start:start + FileStorage.ITER_CHUNK]:
+                    record = segment.read(entity_id)
+                    if record is not None and FileStorage._match(record, filters):
+                        batch.append(dict(record))
+            yield from batch
+
+    def page(self, entity_type: str, limit: int, after: Optional[OrderKey] = None, **filters):
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            if filters:
+                keys = sorted(Table.order_key(record) for record in self._matches(segment, filters))
+            else:
+                keys = segment.ordered()
+            start = bisect.bisect_right(keys, tuple(after)) if after else 0
+            chunk = keys[start:start + limit + 1]
+            records = [dict(segment.read(entity_id)) for _, entity_id in chunk[:limit]]
+            return records, (chunk[limit - 1] if len(chunk) > limit else None)
+
+    def version(self, entity_type: str, **scope) -> Optional[str]:
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            counter = segment.counters.get((), 0)
+            if len(scope) == 1 and next(iter(scope)) in segment.scope_fields:
+                try:
+                    counter = segment.counters.get(next(iter(scope.items())), 0)
+                except TypeError:
+                    pass
+            return f"{self._store.epoch}-{segment.serial}.{segment.external_changes}-{counter}"
+
+    def warm_up(self, entity_types: List[str]):
+        # Records stay on disk; the id offsets, field indexes and page order
+        # are what a first request would otherwise build.
+        with self._store.lock:
+            for entity_type in entity_types:
+                segment = self._segment(entity_type)
+                segment.ensure_indexes()
+                segment.ordered()
+
+    def compact(self, entity_type: str):
+        """
+        Rewrite the files of `entity_type` with only the live records.
+
+        Other processes keep offsets into the old segment, so run this while
+        no other process has the store open.
+        """
+        with self._store.lock:
+            segment = self._segment(entity_type)
+            records = [segment.read(entity_id) for entity_id in segment.ids()]
+            segment.close()
+            segment.create_files(records)
+            del self._store.segments[entity_type]
@@ -0,0 +1,316 @@
+import json
+import os
+import random
+import re
+import sqlite3
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from .bases.storage_base import StorageBase
+from .storage import FileStorage
+
+_IDENTIFIER = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+class SqliteStorage(StorageBase):
+    """
+    Drop-in replacement for FileStorage backed by a local SQLite file.
+
+    Each entity type gets its own table holding the full record as JSON plus
+    indexed copies of the fields the API filters on. The database runs in WAL
+    mode so readers never block on a writer. Connections are per thread.
+    """
+
+    INDEXED_FIELDS = ('team_id', 'board_id', 'user_id', 'name', 'title', 'status')
+    VERSION_SCOPES = FileStorage.VERSION_SCOPES
+
+    _known_tables = set()
+    _known_tables_lock = threading.Lock()
+
+    def __init__(self, db_dir: str = "db", filename: str = "planner.sqlite3"):
+        self.db_dir = db_dir
+        os.makedirs(db_dir, exist_ok=True)
+        self.path = os.path.abspath(os.path.join(db_dir, filename))
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+            self._local.depth = 0
+        return conn
+
+    @contextmanager
+    def _writing(self):
+        # Commits on its own unless an enclosing transaction() will.
+        conn = self._conn()
+        if self._local.depth:
+            yield conn
+        else:
+            with conn:
+                yield conn
+
+    @contextmanager
+    def transaction(self):
+        conn = self._conn()
+        if self._local.depth:
+            self._local.depth += 1
+            try:
+                yield self
+            finally:
+                self._local.depth -= 1
+            return
+        conn.execute('BEGIN IMMEDIATE')
+        self._local.depth = 1
+        try:
+            yield self
+        except BaseException:
+            conn.rollback()
+            # Tables created inside the transaction are gone again.
+            with self._known_tables_lock:
+                self._known_tables.difference_update(
+                    [key for key in self._known_tables if key[0] == self.path]
+                )
+            raise
+        else:
+            conn.commit()
+        finally:
+            self._local.depth = 0
+
+    def _table(self, entity_type: str) -> str:
+        if not _IDENTIFIER.match(entity_type):
+            raise ValueError(f"Invalid entity type: {entity_type}")
+        key = (self.path, entity_type)
+        if key not in self._known_tables:
+            columns = ', '.join(f'{field} TEXT' for field in self.INDEXED_FIELDS)
+            with self._writing() as conn:
+                conn.execute(
+                    f'CREATE TABLE IF NOT EXISTS "{entity_type}" ('
+                    f'id TEXT PRIMARY KEY, creation_time TEXT, {columns}, data TEXT NOT NULL)'
+                )
+                conn.execute(
+                    f'CREATE INDEX IF NOT EXISTS "{entity_type}_creation_time" '
+                    f'ON "{entity_type}" (creation_time)'
+                )
+                for field in self.INDEXED_FIELDS:
+                    conn.execute(
+                        f'CREATE INDEX IF NOT EXISTS "{entity_type}_{field}" ON "{entity_type}" ({field})'
+                    )
+            with self._known_tables_lock:
+                self._known_tables.add(key)
+            self._versions_table()
+        return f'"{entity_type}"'
+
+    def _versions_table(self):
+        # version() counters: one row per (entity, scope); scope '' is the
+        # whole entity type and 'gen' moves on bulk loads. The random epoch
+        # keeps tokens of a deleted and recreated database from matching.
+        key = (self.path, '_versions')
+        if key not in self._known_tables:
+            with self._writing() as conn:
+                conn.execute(
+                    'CREATE TABLE IF NOT EXISTS _versions ('
+                    'entity TEXT NOT NULL, scope TEXT NOT NULL, version INTEGER NOT NULL, '
+                    'PRIMARY KEY (entity, scope))'
+                )
+                conn.execute(
+                    "INSERT OR IGNORE INTO _versions VALUES ('', 'epoch', ?)", (random.getrandbits(31),)
+                )
+            with self._known_tables_lock:
+                self._known_tables.add(key)
+
+    def _scope_key(self, entity_type: str, field: str, value: Any) -> Optional[str]:
+        if field not in self.VERSION_SCOPES.get(entity_type, ()):
+            return None
+        try:
+            return json.dumps([field, value], sort_keys=True)
+        except TypeError:
+            return None
+
+    def _bump(self, conn: sqlite3.Connection, entity_type: str, *records: Optional[Dict[str, Any]], scopes=()):
+        keys = {''} | set(scopes)
+        for record in records:
+            for field in self.VERSION_SCOPES.get(entity_type, ()):
+                if record is not None and field in record:
+                    keys.add(self._scope_key(entity_type, field, record[field]))
+        keys.discard(None)
+        conn.executemany(
+            'INSERT INTO _versions VALUES (?, ?, 1) '
+            'ON CONFLICT(entity, scope) DO UPDATE SET version = version + 1',
+            [(entity_type, key) for key in keys],
+        )
+
+    def version(self, entity_type: str, **scope) -> Optional[str]:
+        self._versions_table()
+        key = ''
+        if len(scope) == 1:
+            key = self._scope_key(entity_type, *next(iter(scope.items()))) or ''
+        rows = dict(self._conn().execute(
+            "SELECT scope, version FROM _versions WHERE (entity = ? AND scope IN (?, 'gen')) "
+            "OR (entity = '' AND scope = 'epoch')",
+            (entity_type, key),
+        ).fetchall())
+        return f"{rows.get('epoch', 0)}-{rows.get('gen', 0)}-{rows.get(key, 0)}"
+
+    def _row(self, record: Dict[str, Any]) -> tuple:
+        indexed = []
+        for field in self.INDEXED_FIELDS:
+            value = record.get(field)
+            indexed.append(value if isinstance(value, str) else None)
+        return (record['id'], record.get('creation_time'), *indexed, json.dumps(record))
+
+    def _upsert_sql(self, table: str) -> str:
+        # ON CONFLICT ... DO UPDATE keeps the rowid, and with it the creation order.
+        columns = ('id', 'creation_time') + self.INDEXED_FIELDS + ('data',)
+        placeholders = ', '.join('?' * len(columns))
+        assignments = ', '.join(f'{column} = excluded.{column}' for column in columns[1:])
+        return (
+            f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({placeholders}) '
+            f'ON CONFLICT(id) DO UPDATE SET {assignments}'
+        )
+
+    def create(self, entity_type: str, data: Dict[str, Any]) -> str:
+        table = self._table(entity_type)
+        entity_id = str(uuid.uuid4())
+        data['id'] = entity_id
+        data['creation_time'] = datetime.now().isoformat()
+        with self._writing() as conn:
+            conn.execute(self._upsert_sql(table), self._row(data))
+            self._bump(conn, entity_type, data)
+        return entity_id
+
+    def get(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
+        table = self._table(entity_type)
+        row = self._conn().execute(f'SELECT data FROM {table} WHERE id = ?', (entity_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, entity_type: str, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        table = self._table(entity_type)
+        ids = list(dict.fromkeys(entity_ids))
+        records = {}
+        # Stay well under SQLite's bound-parameter limit.
+        for start in range(0, len(ids), 500):
+            chunk = ids[start:start + 500]
+            placeholders = ', '.join('?' * len(chunk))
+            rows = self._conn().execute(f'SELECT data FROM {table} WHERE id IN ({placeholders})', chunk)
+            for row in rows:
+                item = json.loads(row[0])
+                records[item['id']] = item
+        return records
+
+    def get_all(self, entity_type: str) -> List[Dict[str, Any]]:
+        table = self._table(entity_type)
+        rows = self._conn().execute(f'SELECT data FROM {table} ORDER BY rowid')
+        return [json.loads(row[0]) for row in rows]
+
+    def update(self, entity_type: str, entity_id: str, data: Dict[str, Any]):
+        table = self._table(entity_type)
+        with self._writing() as conn:
+            row = conn.execute(f'SELECT data FROM {table} WHERE id = ?', (entity_id,)).fetchone()
+            if not row:
+                return False
+            previous = json.loads(row[0])
+            record = dict(previous)
+            record.update(data)
+            conn.execute(self._upsert_sql(table), self._row(record))
+            self._bump(conn, entity_type, previous, record)
+        return True
+
+    def delete(self, entity_type: str, entity_id: str):
+        table = self._table(entity_type)
+        with self._writing() as conn:
+            row = conn.execute(f'SELECT data FROM {table} WHERE id = ?', (entity_id,)).fetchone()
+            if not row:
+                return False
+            conn.execute(f'DELETE FROM {table} WHERE id = ?', (entity_id,))
+            self._bump(conn, entity_type, json.loads(row[0]))
+        return True
+
+    def _where(self, filters: Dict[str, Any]):
+        clauses = []
+        params = []
+        for key, value in filters.items():
+            if key in self.INDEXED_FIELDS and isinstance(value, str):
+                clauses.append(f'{key} = ?')
+                params.append(value)
+        return clauses, params
+
+    @staticmethod
+    def _matches(item: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        return all(key in item and item[key] == value for key, value in filters.items())
+
+    def filter_by(self, entity_type: str, **filters) -> List[Dict[str, Any]]:
+        table = self._table(entity_type)
+        clauses, params = self._where(filters)
+        where = f' WHERE {" AND ".join(clauses)}' if clauses else ''
+        rows = self._conn().execute(f'SELECT data FROM {table}{where} ORDER BY rowid', params)
+        results = []
+        for row in rows:
+            item = json.loads(row[0])
+            if self._matches(item, filters):
+                results.append(item)
+        return results
+
+    def count(self, entity_type: str, **filters) -> int:
+        table = self._table(entity_type)
+        clauses, params = self._where(filters)
+        if len(clauses) < len(filters):
+            return sum(1 for _ in self.iter_filter(entity_type, **filters))
+        where = f' WHERE {" AND ".join(clauses)}' if clauses else ''
+        return self._conn().execute(f'SELECT COUNT(*) FROM {table}{where}', params).fetchone()[0]
+
+    def iter_filter(self, entity_type: str, **filters):
+        # One keyset query per chunk: no cursor stays open across yields, so
+        # the generator may be resumed on another thread (AsyncStorage.iterate),
+        # which has a connection of its own.
+        table = self._table(entity_type)
+        clauses, params = self._where(filters)
+        where = ' AND '.join(clauses + ['rowid > ?'])
+        last = 0
+        while True:
+            rows = self._conn().execute(
+                f'SELECT rowid, data FROM {table} WHERE {where} ORDER BY rowid LIMIT ?',
+                params + [last, FileStorage.ITER_CHUNK]
+            ).fetchall()
+            if not rows:
+                break
+            last = rows[-1][0]
+            for _, data in rows:
+                item = json.loads(data)
+                if self._matches(item, filters):
+                    yield item
+
+    def page(self, entity_type: str, limit: int, after: Optional[Tuple[str, str]] = None, **filters):
+        table = self._table(entity_type)
+        clauses, params = self._where(filters)
+        if after:
+            clauses.append('(creation_time > ? OR (creation_time = ? AND id > ?))')
+            params.extend([after[0], after[0], after[1]])
+        where = f' WHERE {" AND ".join(clauses)}' if clauses else ''
+        rows = self._conn().execute(
+            f'SELECT data FROM {table}{where} ORDER BY creation_time, id', params
+        )
+        records = []
+        for row in rows:
+            item = json.loads(row[0])
+            if not self._matches(item, filters):
+                continue
+            if len(records) == limit:
+                last = records[-1]
+                return records, (last['creation_time'], last['id'])
+            records.append(item)
+        return records, None
+
+    def bulk_load(self, entity_type: str, records: Iterable[Dict[str, Any]]) -> int:
+        """Insert (or replace) already-identified records in one transaction."""
+        table = self._table(entity_type)
+        with self._writing() as conn:
+            cursor = conn.executemany(self._upsert_sql(table), (self._row(record) for record in records))
+            self._bump(conn, entity_type, scopes=['gen'])
+        return cursor.rowcount
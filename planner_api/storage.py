@@ -1,71 +1,854 @@
+import bisect
 import json
+import logging
 import os
+import re
+import threading
+import time
 import uuid
+from contextlib import contextmanager
 from datetime import datetime
-from typing import Dict, List, Any
+from typing import Dict, List, Any, Optional, Tuple
 
-class FileStorage:
-    def __init__(self, db_dir: str = "db"):
+from . import instrumentation
+from .bases.storage_base import StorageBase
+from .json_codecs import decode_table, encode_table, get_codec
+
+
+IndexKey = Tuple[str, ...]
+OrderKey = Tuple[str, str]
+
+_MISSING = object()
+
+logger = logging.getLogger('planner_api.storage')
+
+_PARTITION_NAME = re.compile(r'^[A-Za-z0-9_-]+$')
+
+
+class Table:
+    """
+    Records of one entity type plus the hash indexes declared for it.
+
+    Each index maps a tuple of field values to the ids holding them, in
+    insertion order. Records missing any indexed field are left out of that
+    index, matching filter_by's "key must be present" semantics.
+
+    The (creation_time, id) order used for pagination is built on first use
+    and kept sorted from then on.
+    """
+
+    def __init__(self, records: Dict[str, Any], index_keys: List[IndexKey] = (),
+                 indexes: Optional[Dict[IndexKey, Dict[tuple, Dict[str, None]]]] = None):
+        self.records = records
+        if indexes is not None:
+            # Already built for these records and keys, e.g. by a snapshot.
+            self.indexes = indexes
+        else:
+            self.indexes = {keys: {} for keys in index_keys}
+            for record in records.values():
+                self._index(record)
+        self._order: Optional[List[OrderKey]] = None
+
+    @staticmethod
+    def order_key(record: Dict[str, Any]) -> OrderKey:
+        return (record.get('creation_time', ''), record['id'])
+
+    def ordered(self) -> List[OrderKey]:
+        if self._order is None:
+            self._order = sorted(self.order_key(record) for record in self.records.values())
+        return self._order
+
+    def _unorder(self, record: Dict[str, Any]):
+        key = self.order_key(record)
+        i = bisect.bisect_left(self._order, key)
+        if i < len(self._order) and self._order[i] == key:
+            del self._order[i]
+
+    def _reorder(self, previous: Optional[Dict[str, Any]], record: Dict[str, Any]):
+        key = self.order_key(record)
+        if previous is not None:
+            if self.order_key(previous) == key:
+                return
+            self._unorder(previous)
+        if not self._order or key > self._order[-1]:
+            self._order.append(key)
+        else:
+            bisect.insort(self._order, key)
+
+    @staticmethod
+    def _key(record: Dict[str, Any], keys: IndexKey):
+        values = tuple(record.get(k, _MISSING) for k in keys)
+        return None if _MISSING in values else values
+
+    def _index(self, record: Dict[str, Any]):
+        for keys, index in self.indexes.items():
+            value = self._key(record, keys)
+            if value is not None:
+                index.setdefault(value, {})[record['id']] = None
+
+    def _unindex(self, record: Dict[str, Any]):
+        for keys, index in self.indexes.items():
+            value = self._key(record, keys)
+            bucket = index.get(value) if value is not None else None
+            if bucket is not None:
+                bucket.pop(record['id'], None)
+                if not bucket:
+                    del index[value]
+
+    def _move(self, previous: Dict[str, Any], record: Dict[str, Any]):
+        """
+        File an updated record under its new values. Ids stay where they are
+        in buckets whose value did not change, and join others in
+        (creation_time, id) order, so filter_by keeps returning records in
+        the order they were created however often they are written.
+        """
+        entity_id = record['id']
+        for keys, index in self.indexes.items():
+            old, new = self._key(previous, keys), self._key(record, keys)
+            if old == new:
+                continue
+            bucket = index.get(old) if old is not None else None
+            if bucket is not None:
+                bucket.pop(entity_id, None)
+                if not bucket:
+                    del index[old]
+            if new is None:
+                continue
+            bucket = index.setdefault(new, {})
+            last = next(reversed(bucket), None)
+            bucket[entity_id] = None
+            if last is not None and self.order_key(self.records[last]) > self.order_key(record):
+                index[new] = dict.fromkeys(sorted(bucket, key=lambda i: self.order_key(self.records[i])))
+
+    def put(self, record: Dict[str, Any]):
+        previous = self.records.get(record['id'])
+        self.records[record['id']] = record
+        if previous is None:
+            self._index(record)
+        else:
+            self._move(previous, record)
+        if self._order is not None:
+            self._reorder(previous, record)
+
+    def remove(self, entity_id: str) -> bool:
+        record = self.records.pop(entity_id, None)
+        if record is None:
+            return False
+        self._unindex(record)
+        if self._order is not None:
+            self._unorder(record)
+        return True
+
+    def best_index(self, filters: Dict[str, Any]) -> Optional[IndexKey]:
+        best = None
+        for keys in self.indexes:
+            if all(k in filters for k in keys) and (best is None or len(keys) > len(best)):
+                best = keys
+        return best
+
+    def candidates(self, filters: Dict[str, Any]):
+        """Records that may match `filters`, narrowed through an index when one covers them."""
+        keys = self.best_index(filters)
+        if keys is None:
+            return self.records.values()
+        try:
+            bucket = self.lookup(keys, filters)
+        except TypeError:  # unhashable filter value, fall back to a scan
+            return self.records.values()
+        return [self.records[entity_id] for entity_id in bucket]
+
+    def lookup(self, keys: IndexKey, filters: Dict[str, Any]) -> Dict[str, None]:
+        """Ids stored under the values `filters` gives for the index on `keys`."""
+        return self.indexes[keys].get(tuple(filters[k] for k in keys), {})
+
+
+class _Transaction:
+    """Mutations staged by FileStorage.transaction(), grouped per entity type."""
+
+    def __init__(self):
+        self.tables: Dict[str, Table] = {}
+        self.ops: Dict[str, List[Tuple[str, Any]]] = {}
+        self.undo: List[Tuple[Table, str, Optional[Dict[str, Any]]]] = []
+        # Partition map changes, per partitioned entity type.
+        self.map_ops: Dict[str, List[Tuple[str, Optional[str]]]] = {}
+        self.map_undo: List[Tuple['PartitionMap', str, Optional[str]]] = []
+
+    def rollback(self):
+        for table, entity_id, previous in reversed(self.undo):
+            if previous is None:
+                table.remove(entity_id)
+            else:
+                table.put(previous)
+        for partition_map, entity_id, previous in reversed(self.map_undo):
+            partition_map.apply(entity_id, previous)
+
+
+class RecordCache:
+    """
+    Process-wide cache of parsed entity files for one db directory.
+
+    Each entry is stamped with the file's (mtime, size) and revalidated with a
+    stat() on every access, so writes made by other processes are still seen.
+
+    It also hands out the version tokens of FileStorage.version(): writes made
+    through this process bump per-scope counters, and a file stamp changing
+    behind its back bumps the entity type's generation, which invalidates
+    every token of that type. The epoch keeps tokens from a previous process
+    from ever matching.
+    """
+
+    def __init__(self):
+        self.lock = threading.RLock()
+        # Open transaction of the thread currently holding `lock`, if any.
+        self.txn: Optional[_Transaction] = None
+        self._entries: Dict[str, Tuple[Optional[Tuple[int, int]], Table]] = {}
+        self.partition_maps: Dict[str, 'PartitionMap'] = {}
+        self.hits: Dict[str, int] = {}
+        self.misses: Dict[str, int] = {}
+        self.epoch = uuid.uuid4().hex[:8]
+        self.generations: Dict[str, int] = {}
+        self.counters: Dict[tuple, int] = {}
+        self._seen: Dict[str, Optional[Tuple[int, int]]] = {}
+
+    def get(self, entity_type: str, stamp) -> Optional[Table]:
+        entry = self._entries.get(entity_type)
+        if entry is not None and entry[0] == stamp:
+            self.hits[entity_type] = self.hits.get(entity_type, 0) + 1
+            return entry[1]
+        self.misses[entity_type] = self.misses.get(entity_type, 0) + 1
+        self.observe(entity_type, stamp)
+        return None
+
+    def put(self, entity_type: str, stamp, table: Table):
+        self._entries[entity_type] = (stamp, table)
+        self._seen[entity_type] = stamp
+
+    def observe(self, key: str, stamp):
+        """Note the current stamp of the file behind `key` (a table key or other file)."""
+        if key in self._seen and self._seen[key] != stamp:
+            entity_type = key.split('/', 1)[0]
+            self.generations[entity_type] = self.generations.get(entity_type, 0) + 1
+        self._seen[key] = stamp
+
+    def bump(self, entity_type: str, scopes):
+        for scope in scopes:
+            key = (entity_type,) + scope
+            self.counters[key] = self.counters.get(key, 0) + 1
+
+    def version(self, entity_type: str, scope: tuple = ()) -> str:
+        counter = self.counters.get((entity_type,) + scope, 0)
+        return f"{self.epoch}-{self.generations.get(entity_type, 0)}-{counter}"
+
+    def invalidate(self, entity_type: str):
+        self._entries.pop(entity_type, None)
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self.lock:
+            entity_types = set(self.hits) | set(self.misses)
+            return {
+                entity_type: {
+                    'hits': self.hits.get(entity_type, 0),
+                    'misses': self.misses.get(entity_type, 0),
+                }
+                for entity_type in sorted(entity_types)
+            }
+
+
+class PartitionMap:
+    """
+    id -> partition of a partitioned entity type.
+
+    Kept as an append-only log of {"id", "partition"} lines (partition null
+    for a delete), so recording a new id costs one short append however many
+    records exist. Refreshing after another process appended only reads the
+    new tail.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self.ids: Dict[str, str] = {}
+        # Number of ids per partition.
+        self.partitions: Dict[str, int] = {}
+        self.offset = 0
+        self.stamp: Optional[Tuple[int, int]] = None
+        # Entries appended by other processes that changed the map.
+        self.external_changes = 0
+
+    def apply(self, entity_id: str, partition: Optional[str]) -> bool:
+        previous = self.ids.get(entity_id)
+        if previous == partition:
+            return False
+        if previous is not None:
+            self.partitions[previous] -= 1
+            if not self.partitions[previous]:
+                del self.partitions[previous]
+            del self.ids[entity_id]
+        if partition is not None:
+            self.ids[entity_id] = partition
+            self.partitions[partition] = self.partitions.get(partition, 0) + 1
+        return True
+
+    def refresh(self, codec):
+        try:
+            st = os.stat(self.path)
+            stamp = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            stamp = None
+        if stamp == self.stamp:
+            return
+        if stamp is None or stamp[1] < self.offset:
+            self.ids, self.partitions, self.offset = {}, {}, 0
+        if stamp is not None:
+            with open(self.path, 'rb') as f:
+                f.seek(self.offset)
+                for line in f:
+                    if not line.endswith(b'\n'):
+                        break  # append still in progress, or torn
+                    self.offset += len(line)
+                    try:
+                        entry = codec.loads(line)
+                    except ValueError:
+                        continue
+                    if self.apply(entry['id'], entry['partition']):
+                        self.external_changes += 1
+        self.stamp = stamp
+
+    def append(self, codec, entries: List[Tuple[str, Optional[str]]]):
+        data = b''.join(
+            codec.dumps({'id': entity_id, 'partition': partition}) + b'\n'
+            for entity_id, partition in entries
+        )
+        with open(self.path, 'ab+') as f:
+            if f.tell():
+                # Never glue onto a line left unterminated by a dead writer.
+                f.seek(-1, os.SEEK_END)
+                if f.read(1) != b'\n':
+                    data = b'\n' + data
+            f.write(data)
+        for entity_id, partition in entries:
+            self.apply(entity_id, partition)
+
+
+_caches: Dict[Tuple[str, str], RecordCache] = {}
+_caches_lock = threading.Lock()
+
+
+def _cache_for(db_dir: str, file_suffix: str) -> RecordCache:
+    key = (os.path.abspath(db_dir), file_suffix)
+    with _caches_lock:
+        if key not in _caches:
+            _caches[key] = RecordCache()
+        return _caches[key]
+
+
+class FileStorage(StorageBase):
+    FILE_SUFFIX = '.json'
+
+    # Hash indexes maintained per entity type; filter_by uses the widest one
+    # whose keys are all present in the filter.
+    INDEXES: Dict[str, List[IndexKey]] = {
+        'users': [('name',)],
+        'teams': [('name',)],
+        'user_teams': [('team_id',), ('user_id',), ('user_id', 'team_id')],
+        'boards': [('team_id',), ('team_id', 'name')],
+        'tasks': [('board_id',), ('board_id', 'title')],
+        'board_counters': [('board_id',), ('team_id',)],
+    }
+
+    # Entity types stored as one file per value of a field, e.g.
+    # db/tasks/<board_id>.json, so a write only rewrites its own partition.
+    # Records without the field go to DEFAULT_PARTITION.
+    PARTITIONS: Dict[str, str] = {
+        'tasks': 'board_id',
+    }
+    DEFAULT_PARTITION = '_default'
+
+    # Fields whose values get their own version() counter; other scopes fall
+    # back to the version of the whole entity type.
+    VERSION_SCOPES: Dict[str, Tuple[str, ...]] = {
+        'user_teams': ('team_id', 'user_id'),
+        'boards': ('team_id',),
+        'tasks': ('board_id',),
+        'board_counters': ('board_id', 'team_id'),
+    }
+
+    def __init__(self, db_dir: str = "db", indexes: Optional[Dict[str, List[IndexKey]]] = None,
+                 codec: str = 'auto', partitions: Optional[Dict[str, str]] = None):
         self.db_dir = db_dir
         os.makedirs(db_dir, exist_ok=True)
-        
+        self.cache = _cache_for(db_dir, self.FILE_SUFFIX)
+        self.indexes = self.INDEXES if indexes is None else indexes
+        self.partitions = self.PARTITIONS if partitions is None else partitions
+        # Any codec reads files written by any other one.
+        self.codec = get_codec(codec)
+
     def _get_file_path(self, entity_type: str) -> str:
-        return os.path.join(self.db_dir, f"{entity_type}.json")
-    
-    def _load_data(self, entity_type: str) -> Dict[str, Any]:
+        # entity_type may also name a partition, as "<entity type>/<partition>".
+        return os.path.join(self.db_dir, f"{entity_type}{self.FILE_SUFFIX}")
+
+    def _index_keys(self, entity_type: str) -> List[IndexKey]:
+        return self.indexes.get(entity_type.split('/', 1)[0], ())
+
+    def _stamp(self, file_path: str) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(file_path)
+        except FileNotFoundError:
+            return None
+        return (st.st_mtime_ns, st.st_size)
+
+    def _load_table(self, entity_type: str) -> Table:
+        # Returns the cached table itself; callers must hold self.cache.lock
+        # while mutating it and copy records before handing them out.
+        txn = self.cache.txn
+        if txn is not None and entity_type in txn.tables:
+            return txn.tables[entity_type]
         file_path = self._get_file_path(entity_type)
-        if os.path.exists(file_path):
-            with open(file_path, 'r') as f:
-                return json.load(f)
-        return {}
-    
-    def _save_data(self, entity_type: str, data: Dict[str, Any]):
+        stamp = self._stamp(file_path)
+        table = self.cache.get(entity_type, stamp)
+        if table is None:
+            table = self._read_table(entity_type, file_path, stamp)
+            self.cache.put(entity_type, stamp, table)
+        if txn is not None:
+            # Pin it so the rest of the transaction sees one consistent table.
+            txn.tables[entity_type] = table
+        return table
+
+    def _read_table(self, entity_type: str, file_path: str, stamp) -> Table:
+        data = {}
+        if stamp is not None:
+            kind = entity_type.split('/', 1)[0]
+            with instrumentation.timed('load', kind):
+                with open(file_path, 'rb') as f:
+                    raw = f.read()
+            instrumentation.count(bytes_read=len(raw), entity_type=kind)
+            with instrumentation.timed('parse', kind):
+                data = decode_table(self.codec, raw)
+        return Table(data, self._index_keys(entity_type))
+
+    def _load_data(self, entity_type: str) -> Dict[str, Any]:
+        return self._load_table(entity_type).records
+
+    def _partition_map(self, entity_type: str) -> PartitionMap:
+        # Callers must hold self.cache.lock.
+        partition_map = self.cache.partition_maps.get(entity_type)
+        if partition_map is None:
+            directory = os.path.join(self.db_dir, entity_type)
+            os.makedirs(directory, exist_ok=True)
+            partition_map = PartitionMap(os.path.join(directory, '_partitions.map'))
+            partition_map.refresh(self.codec)
+            self.cache.partition_maps[entity_type] = partition_map
+            if partition_map.stamp is None:
+                self._split_legacy(entity_type, partition_map)
+        else:
+            partition_map.refresh(self.codec)
+        return partition_map
+
+    def _split_legacy(self, entity_type: str, partition_map: PartitionMap):
+        # Move records from a single db/<entity><suffix> file, written before
+        # the entity type was partitioned, into their partitions. The old file
+        # is kept, renamed to <name>.partitioned.
+        legacy_path = self._get_file_path(entity_type)
+        records = self._read_table(entity_type, legacy_path, self._stamp(legacy_path)).records
+        if not records:
+            return
+        grouped: Dict[str, List[Dict[str, Any]]] = {}
+        for record in records.values():
+            grouped.setdefault(self._partition_of(entity_type, record), []).append(record)
+        partition_map.append(self.codec, [
+            (record['id'], partition) for partition, items in grouped.items() for record in items
+        ])
+        for partition, items in grouped.items():
+            key = f"{entity_type}/{partition}"
+            table = self._load_table(key)
+            for record in items:
+                table.put(record)
+            self._persist(key, table, [('put', record) for record in items])
+        if os.path.exists(legacy_path):
+            os.replace(legacy_path, legacy_path + '.partitioned')
+        self.cache.invalidate(entity_type)
+
+    def _partition_of(self, entity_type: str, record: Dict[str, Any]) -> str:
+        field = self.partitions[entity_type]
+        value = record.get(field)
+        if value is None:
+            return self.DEFAULT_PARTITION
+        if not isinstance(value, str) or not _PARTITION_NAME.match(value):
+            raise ValueError(f"Invalid {field} for a {entity_type} partition: {value!r}")
+        return value
+
+    def _key_of(self, entity_type: str, entity_id: str) -> Optional[str]:
+        """Table holding `entity_id`, or None when no partition knows it."""
+        if entity_type not in self.partitions:
+            return entity_type
+        partition = self._partition_map(entity_type).ids.get(entity_id)
+        return f"{entity_type}/{partition}" if partition is not None else None
+
+    def _keys_for(self, entity_type: str, filters: Dict[str, Any]) -> List[str]:
+        """Tables that may hold records matching `filters`."""
+        if entity_type not in self.partitions:
+            return [entity_type]
+        partitions = self._partition_map(entity_type).partitions
+        field = self.partitions[entity_type]
+        if field in filters:
+            value = filters[field]
+            if value is None:
+                value = self.DEFAULT_PARTITION
+            if not isinstance(value, str) or value not in partitions:
+                return []
+            return [f"{entity_type}/{value}"]
+        return [f"{entity_type}/{partition}" for partition in sorted(partitions)]
+
+    def _map(self, entity_type: str, entity_id: str, partition: Optional[str]):
+        # Record where `entity_id` lives now. Runs before the record's own
+        # write, so a crash in between leaves a stale entry, never a lost one.
+        partition_map = self._partition_map(entity_type)
+        txn = self.cache.txn
+        if txn is None:
+            partition_map.append(self.codec, [(entity_id, partition)])
+            return
+        txn.map_ops.setdefault(entity_type, []).append((entity_id, partition))
+        txn.map_undo.append((partition_map, entity_id, partition_map.ids.get(entity_id)))
+        partition_map.apply(entity_id, partition)
+
+    def _save_data(self, entity_type: str, table: Table):
         file_path = self._get_file_path(entity_type)
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
-    
+        tmp_path = f"{file_path}.{os.getpid()}.tmp"
+        try:
+            kind = entity_type.split('/', 1)[0]
+            with instrumentation.timed('save', kind):
+                payload = encode_table(self.codec, table.records)
+                with open(tmp_path, 'wb') as f:
+                    f.write(payload)
+                os.replace(tmp_path, file_path)
+            instrumentation.count(bytes_written=len(payload), entity_type=kind)
+        except Exception:
+            self.cache.invalidate(entity_type)
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+        self.cache.put(entity_type, self._stamp(file_path), table)
+
+    def _persist(self, entity_type: str, table: Table, ops: List[Tuple[str, Any]]):
+        """
+        Make `ops` durable after they were applied to `table`.
+
+        `ops` is a list of ('put', record) / ('delete', entity_id) pairs; this
+        store simply rewrites the whole file, subclasses may do better.
+        """
+        self._save_data(entity_type, table)
+
+    def _write(self, entity_type: str, table: Table, op: Tuple[str, Any], previous: Optional[Dict[str, Any]]):
+        self.cache.bump(entity_type.split('/', 1)[0], self._scopes(
+            entity_type.split('/', 1)[0], [op[1] if op[0] == 'put' else None, previous]
+        ))
+        txn = self.cache.txn
+        if txn is None:
+            self._persist(entity_type, table, [op])
+            return
+        entity_id = op[1]['id'] if op[0] == 'put' else op[1]
+        txn.ops.setdefault(entity_type, []).append(op)
+        txn.undo.append((table, entity_id, previous))
+
+    def _scopes(self, entity_type: str, records: List[Optional[Dict[str, Any]]]) -> set:
+        """Version scopes a write of `records` (new and previous version) touches."""
+        scopes = {()}
+        for record in records:
+            if record is None:
+                continue
+            for field in self.VERSION_SCOPES.get(entity_type, ()):
+                if field in record:
+                    try:
+                        scopes.add((field, record[field]))
+                    except TypeError:  # unhashable value, only the entity-wide counter moves
+                        pass
+        return scopes
+
+    def version(self, entity_type: str, **scope) -> Optional[str]:
+        with self.cache.lock:
+            field, value = next(iter(scope.items())) if len(scope) == 1 else (None, None)
+            if entity_type not in self.partitions:
+                paths = [(entity_type, self._get_file_path(entity_type))]
+            elif field == self.partitions[entity_type] and isinstance(value, str) and _PARTITION_NAME.match(value):
+                key = f"{entity_type}/{value}"
+                paths = [(key, self._get_file_path(key))]
+            else:
+                # Ids added to the map by other processes may sit in
+                # partitions this process has not seen yet.
+                self.cache.observe(f"{entity_type}/_partitions", self._partition_map(entity_type).external_changes)
+                paths = [(key, self._get_file_path(key)) for key in self._keys_for(entity_type, {})]
+            for key, path in paths:
+                self.cache.observe(key, self._stamp(path))
+            if field in self.VERSION_SCOPES.get(entity_type, ()):
+                try:
+                    return self.cache.version(entity_type, (field, value))
+                except TypeError:
+                    pass
+            return self.cache.version(entity_type)
+
+    @contextmanager
+    def transaction(self):
+        """
+        Group several operations into one unit.
+
+        Reads inside see the staged writes; each touched entity file is
+        persisted once when the outermost block exits, or every change is
+        rolled back if it raises. Nested blocks join the outer one. Other
+        threads wait on the storage lock until the transaction ends.
+        """
+        with self.cache.lock:
+            if self.cache.txn is not None:
+                yield self
+                return
+            txn = self.cache.txn = _Transaction()
+            try:
+                yield self
+            except BaseException:
+                txn.rollback()
+                raise
+            finally:
+                self.cache.txn = None
+            try:
+                for entity_type, entries in txn.map_ops.items():
+                    self._partition_map(entity_type).append(self.codec, entries)
+                for entity_type, ops in txn.ops.items():
+                    self._persist(entity_type, txn.tables[entity_type], ops)
+            except Exception:
+                # Drop in-memory state that may be ahead of the files.
+                for entity_type in txn.ops:
+                    self.cache.invalidate(entity_type)
+                for entity_type in txn.map_ops:
+                    self.cache.partition_maps.pop(entity_type, None)
+                raise
+
     def create(self, entity_type: str, data: Dict[str, Any]) -> str:
         entity_id = str(uuid.uuid4())
-        all_data = self._load_data(entity_type)
-        data['id'] = entity_id
-        data['creation_time'] = datetime.now().isoformat()
-        all_data[entity_id] = data
-        self._save_data(entity_type, all_data)
+        with self.cache.lock:
+            key = entity_type
+            if entity_type in self.partitions:
+                partition = self._partition_of(entity_type, data)
+                key = f"{entity_type}/{partition}"
+                self._map(entity_type, entity_id, partition)
+            table = self._load_table(key)
+            data['id'] = entity_id
+            data['creation_time'] = datetime.now().isoformat()
+            record = dict(data)
+            table.put(record)
+            self._write(key, table, ('put', record), None)
         return entity_id
-    
+
     def get(self, entity_type: str, entity_id: str) -> Dict[str, Any]:
-        all_data = self._load_data(entity_type)
-        return all_data.get(entity_id)
-    
+        with self.cache.lock:
+            key = self._key_of(entity_type, entity_id)
+            item = self._load_data(key).get(entity_id) if key is not None else None
+            return dict(item) if item is not None else None
+
+    def get_many(self, entity_type: str, entity_ids: List[str]) -> Dict[str, Dict[str, Any]]:
+        with self.cache.lock:
+            result = {}
+            for entity_id in entity_ids:
+                key = self._key_of(entity_type, entity_id)
+                item = self._load_data(key).get(entity_id) if key is not None else None
+                if item is not None:
+                    result[entity_id] = dict(item)
+            return result
+
     def get_all(self, entity_type: str) -> List[Dict[str, Any]]:
-        all_data = self._load_data(entity_type)
-        return list(all_data.values())
-    
+        with self.cache.lock:
+            keys = self._keys_for(entity_type, {})
+            items = [item for key in keys for item in self._load_data(key).values()]
+            if len(keys) > 1:
+                items.sort(key=Table.order_key)
+            return [dict(item) for item in items]
+
     def update(self, entity_type: str, entity_id: str, data: Dict[str, Any]):
-        all_data = self._load_data(entity_type)
-        if entity_id in all_data:
-            all_data[entity_id].update(data)
-            self._save_data(entity_type, all_data)
+        with self.cache.lock:
+            key = self._key_of(entity_type, entity_id)
+            if key is None:
+                return False
+            table = self._load_table(key)
+            previous = table.records.get(entity_id)
+            if previous is None:
+                return False
+            record = dict(previous)
+            record.update(data)
+            if entity_type in self.partitions:
+                partition = self._partition_of(entity_type, record)
+                if key != f"{entity_type}/{partition}":
+                    # The partition field changed: move the record over.
+                    self._map(entity_type, entity_id, partition)
+                    table.remove(entity_id)
+                    self._write(key, table, ('delete', entity_id), previous)
+                    key = f"{entity_type}/{partition}"
+                    table = self._load_table(key)
+                    previous = None
+            table.put(record)
+            self._write(key, table, ('put', record), previous)
             return True
-        return False
-    
+
     def delete(self, entity_type: str, entity_id: str):
-        all_data = self._load_data(entity_type)
-        if entity_id in all_data:
-            del all_data[entity_id]
-            self._save_data(entity_type, all_data)
+        with self.cache.lock:
+            key = self._key_of(entity_type, entity_id)
+            if key is None:
+                return False
+            table = self._load_table(key)
+            previous = table.records.get(entity_id)
+            if previous is None:
+                return False
+            if entity_type in self.partitions:
+                self._map(entity_type, entity_id, None)
+            table.remove(entity_id)
+            self._write(key, table, ('delete', entity_id), previous)
             return True
-        return False
-    
+
+    @staticmethod
+    def _match(item: Dict[str, Any], filters: Dict[str, Any]) -> bool:
+        for key, value in filters.items():
+            if key not in item or item[key] != value:
+                return False
+        return True
+
+    def _matches(self, entity_type: str, table: Table, filters: Dict[str, Any]):
+        candidates = table.candidates(filters)
+        instrumentation.count(records_scanned=len(candidates), entity_type=entity_type)
+        for item in candidates:
+            if self._match(item, filters):
+                yield item
+
     def filter_by(self, entity_type: str, **filters) -> List[Dict[str, Any]]:
-        all_data = self._load_data(entity_type)
-        results = []
-        for item in all_data.values():
-            match = True
-            for key, value in filters.items():
-                if key not in item or item[key] != value:
-                    match = False
-                    break
-            if match:
-                results.append(item)
-        return results
+        with self.cache.lock:
+            tables = [self._load_table(key) for key in self._keys_for(entity_type, filters)]
+            with instrumentation.timed('scan', entity_type):
+                items = [item for table in tables for item in self._matches(entity_type, table, filters)]
+                if len(tables) > 1:
+                    items.sort(key=Table.order_key)
+                return [dict(item) for item in items]
+
+    def count(self, entity_type: str, **filters) -> int:
+        with self.cache.lock:
+            total = 0
+            for table in [self._load_table(key) for key in self._keys_for(entity_type, filters)]:
+                index_keys = table.best_index(filters)
+                if index_keys is not None and len(index_keys) == len(filters):
+                    try:
+                        total += len(table.lookup(index_keys, filters))
+                        continue
+                    except TypeError:
+                        pass
+                with instrumentation.timed('scan', entity_type):
+                    total += sum(1 for _ in self._matches(entity_type, table, filters))
+            return total
+
+    ITER_CHUNK = 500
+
+    def iter_filter(self, entity_type: str, **filters):
+        # Only the matching ids are snapshotted up front; records are copied
+        # out a chunk at a time so the lock is not held while the caller works.
+        with self.cache.lock:
+            keys = self._keys_for(entity_type, filters)
+            tables = [self._load_table(key) for key in keys]
+            ids = [(table, item['id']) for table in tables for item in table.candidates(filters)]
+            if len(tables) > 1:
+                ids.sort(key=lambda pair: Table.order_key(pair[0].records[pair[1]]))
+        for start in range(0, len(ids), self.ITER_CHUNK):
+            with self.cache.lock:
+                batch = []
+                for table, entity_id in ids[start:start + self.ITER_CHUNK]:
+                    item = table.records.get(entity_id)
+                    if item is not None and self._match(item, filters):
+                        batch.append(dict(item))
+            yield from batch
+
+    def page(self, entity_type: str, limit: int, after: Optional[OrderKey] = None, **filters):
+        with self.cache.lock:
+            tables = [self._load_table(key) for key in self._keys_for(entity_type, filters)]
+            if len(tables) == 1 and not filters:
+                table = tables[0]
+                keys = table.ordered()
+                start = bisect.bisect_right(keys, tuple(after)) if after else 0
+                chunk = [(key, table.records[key[1]]) for key in keys[start:start + limit + 1]]
+            else:
+                with instrumentation.timed('scan', entity_type):
+                    chunk = sorted(
+                        ((Table.order_key(item), item)
+                         for table in tables for item in self._matches(entity_type, table, filters)),
+                        key=lambda pair: pair[0],
+                    )
+                if after:
+                    start = bisect.bisect_right([key for key, _ in chunk], tuple(after))
+                    chunk = chunk[start:]
+                chunk = chunk[:limit + 1]
+            records = [dict(item) for _, item in chunk[:limit]]
+            return records, (chunk[limit - 1][0] if len(chunk) > limit else None)
+
+    def warm_up(self, entity_types: List[str]):
+        with self.cache.lock:
+            for entity_type in entity_types:
+                # Every partition of a partitioned type, with its indexes.
+                for key in self._keys_for(entity_type, {}):
+                    self._load_table(key)
+
+    def cache_stats(self) -> Dict[str, Dict[str, int]]:
+        return self.cache.stats()
+
+
+DEFAULT_STORAGE = {
+    'BACKEND': 'planner_api.storage.FileStorage',
+    'OPTIONS': {},
+    'PRELOAD': [],
+}
+
+# Shared backends, by (BACKEND, OPTIONS) as configured when they were built.
+_storages: Dict[Tuple[str, str], StorageBase] = {}
+_storages_lock = threading.Lock()
+
+
+def _storage_config() -> Dict[str, Any]:
+    from django.conf import settings
+
+    if settings.configured:
+        return {**DEFAULT_STORAGE, **getattr(settings, 'PLANNER_STORAGE', {})}
+    return DEFAULT_STORAGE
+
+
+def build_storage(config: Optional[Dict[str, Any]] = None) -> StorageBase:
+    """A new instance of the backend selected by `config` (settings.PLANNER_STORAGE by default)."""
+    from django.utils.module_loading import import_string
+
+    config = config or _storage_config()
+    backend = import_string(config.get('BACKEND', DEFAULT_STORAGE['BACKEND']))
+    return backend(**config.get('OPTIONS', {}))
+
+
+def get_storage() -> StorageBase:
+    """
+    The process-wide backend selected by settings.PLANNER_STORAGE (FileStorage
+    by default), built on first use. Backends are thread safe, so every
+    request shares it; a changed setting (e.g. override_settings) gets an
+    instance of its own.
+    """
+    config = _storage_config()
+    key = (config.get('BACKEND', DEFAULT_STORAGE['BACKEND']),
+           json.dumps(config.get('OPTIONS', {}), sort_keys=True, default=str))
+    storage = _storages.get(key)
+    if storage is None:
+        with _storages_lock:
+            storage = _storages.get(key)
+            if storage is None:
+                storage = _storages[key] = build_storage(config)
+    return storage
+
+
+def init_storage() -> StorageBase:
+    """
+    Build the shared backend and read the entity types listed in
+    PLANNER_STORAGE['PRELOAD'], so the first request after a start does not
+    pay for loading them. Called once by the WSGI and ASGI entry points, so
+    other manage.py commands neither preload nor create the db directory.
+    """
+    storage = get_storage()
+    preload = _storage_config().get('PRELOAD') or []
+    if preload:
+        started = time.perf_counter()
+        storage.warm_up(list(preload))
+        logger.info("Preloaded %s in %.2fs", ', '.join(preload), time.perf_counter() - started)
+    return storage
@@ -1,25 +1,64 @@
 import json
 from .bases.team_base import TeamBase
-from .storage import FileStorage
+from .cache import ResponseCache
+from .storage import get_storage
+from .utils import page_request, page_response, parse_request
+
+# Member ids per team, tagged with the team's user_teams version they were read at.
+_memberships = ResponseCache(4096)
 
 class Team(TeamBase):
-    def __init__(self):
-        self.storage = FileStorage()
+    def __init__(self, storage=None):
+        self.storage = storage if storage is not None else get_storage()
+    
+    def _members_key(self, team_id: str) -> tuple:
+        return (type(self.storage).__name__, getattr(self.storage, 'db_dir', None), team_id)
+    
+    def _members_version(self, team_id: str):
+        return self.storage.version('user_teams', team_id=team_id)
+    
+    def _members(self, team_id: str) -> set:
+        """
+        A copy of the ids of the team's users, read from its user_teams records
+        only when a write changed them since the last read. Its size is the
+        team's member count; nothing is kept on the team record, so membership
+        changes leave the teams version (and its ETags) alone.
+        """
+        key = self._members_key(team_id)
+        tag = self._members_version(team_id)
+        # Without a version (see StorageBase.version()) a cached set could never be invalidated.
+        found, members = _memberships.get(key, tag) if tag is not None else (False, None)
+        if not found:
+            members = frozenset(
+                membership['user_id'] for membership in self.storage.filter_by('user_teams', team_id=team_id)
+            )
+            if tag is not None:
+                _memberships.put(key, tag, members)
+        return set(members)
+    
+    def _cache_members(self, team_id: str, tag, members: set):
+        # `tag` is read inside the writing transaction; anything else written
+        # to the team since it committed moves the version on, and the set
+        # read then is not kept. A rolled back transaction never gets here.
+        if tag is not None and self._members_version(team_id) == tag:
+            _memberships.put(self._members_key(team_id), tag, frozenset(members))
     
     def create_team(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            name = data.get('name', '').strip()
-            description = data.get('description', '').strip()
-            admin = data.get('admin')
-            
-            if not name or len(name) > 64:
-                raise ValueError("Name is required and must be max 64 characters")
-            if len(description) > 128:
-                raise ValueError("Description must be max 128 characters")
-            if not admin:
-                raise ValueError("Admin user ID is required")
-            
+        return json.dumps(self.create_team_dict(parse_request(request)))
+    
+    def create_team_dict(self, data: dict) -> dict:
+        name = data.get('name', '').strip()
+        description = data.get('description', '').strip()
+        admin = data.get('admin')
+        
+        if not name or len(name) > 64:
+            raise ValueError("Name is required and must be max 64 characters")
+        if len(description) > 128:
+            raise ValueError("Description must be max 128 characters")
+        if not admin:
+            raise ValueError("Admin user ID is required")
+        
+        with self.storage.transaction():
             admin_user = self.storage.get('users', admin)
             if not admin_user:
                 raise ValueError("Admin user not found")
@@ -38,14 +77,19 @@ class Team(TeamBase):
                 'user_id': admin,
                 'team_id': team_id
             })
-            
-            return json.dumps({"id": team_id})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        
+        return {"id": team_id}
     
     def list_teams(self) -> str:
-        teams = self.storage.get_all('teams')
+        return json.dumps(self.list_teams_dict())
+    
+    def list_teams_dict(self, page: dict = None):
+        """Paginated like User.list_users_dict when `page` carries "limit"/"cursor"."""
+        paging = page_request(page or {})
+        if paging:
+            teams, next_key = self.storage.page('teams', *paging)
+        else:
+            teams = self.storage.get_all('teams')
         result = []
         for team in teams:
             result.append({
@@ -54,165 +98,176 @@ class Team(TeamBase):
                 'creation_time': team['creation_time'],
                 'admin': team['admin']
             })
-        return json.dumps(result)
+        return page_response(result, next_key) if paging else result
     
     def describe_team(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            team_id = data.get('id')
-            
-            if not team_id:
-                raise ValueError("Team ID is required")
-            
-            team = self.storage.get('teams', team_id)
-            if not team:
-                raise ValueError("Team not found")
-            
-            return json.dumps({
-                'name': team['name'],
-                'description': team['description'],
-                'creation_time': team['creation_time'],
-                'admin': team['admin']
-            })
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        return json.dumps(self.describe_team_dict(parse_request(request)))
+    
+    def describe_team_dict(self, data: dict) -> dict:
+        team_id = data.get('id')
+        
+        if not team_id:
+            raise ValueError("Team ID is required")
+        
+        team = self.storage.get('teams', team_id)
+        if not team:
+            raise ValueError("Team not found")
+        
+        return {
+            'name': team['name'],
+            'description': team['description'],
+            'creation_time': team['creation_time'],
+            'admin': team['admin']
+        }
     
     def update_team(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            team_id = data.get('id')
-            team_data = data.get('team', {})
-            
-            if not team_id:
-                raise ValueError("Team ID is required")
-            
-            existing_team = self.storage.get('teams', team_id)
-            if not existing_team:
-                raise ValueError("Team not found")
-            
-            name = team_data.get('name', '').strip()
-            description = team_data.get('description', '').strip()
-            admin = team_data.get('admin')
-            
-            if name and len(name) > 64:
-                raise ValueError("Name must be max 64 characters")
-            if len(description) > 128:
-                raise ValueError("Description must be max 128 characters")
-            
-            if name and name != existing_team['name']:
-                existing_teams = self.storage.filter_by('teams', name=name)
-                if existing_teams:
-                    raise ValueError("Team name must be unique")
-            
-            if admin:
-                admin_user = self.storage.get('users', admin)
-                if not admin_user:
-                    raise ValueError("Admin user not found")
-            
-            update_data = {}
-            if name:
-                update_data['name'] = name
-            if description:
-                update_data['description'] = description
-            if admin:
-                update_data['admin'] = admin
-            
-            self.storage.update('teams', team_id, update_data)
-            return json.dumps({"status": "success"})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        return json.dumps(self.update_team_dict(parse_request(request)))
+    
+    def update_team_dict(self, data: dict) -> dict:
+        team_id = data.get('id')
+        team_data = data.get('team', {})
+        
+        if not team_id:
+            raise ValueError("Team ID is required")
+        
+        existing_team = self.storage.get('teams', team_id)
+        if not existing_team:
+            raise ValueError("Team not found")
+        
+        name = team_data.get('name', '').strip()
+        description = team_data.get('description', '').strip()
+        admin = team_data.get('admin')
+        
+        if name and len(name) > 64:
+            raise ValueError("Name must be max 64 characters")
+        if len(description) > 128:
+            raise ValueError("Description must be max 128 characters")
+        
+        if name and name != existing_team['name']:
+            existing_teams = self.storage.filter_by('teams', name=name)
+            if existing_teams:
+                raise ValueError("Team name must be unique")
+        
+        if admin:
+            admin_user = self.storage.get('users', admin)
+            if not admin_user:
+                raise ValueError("Admin user not found")
+        
+        update_data = {}
+        if name:
+            update_data['name'] = name
+        if description:
+            update_data['description'] = description
+        if admin:
+            update_data['admin'] = admin
+        
+        self.storage.update('teams', team_id, update_data)
+        return {"status": "success"}
     
     def add_users_to_team(self, request: str):
-        try:
-            data = json.loads(request)
-            team_id = data.get('id')
-            users = data.get('users', [])
-            
-            if not team_id:
-                raise ValueError("Team ID is required")
-            if not users:
-                raise ValueError("Users list is required")
-            
+        return json.dumps(self.add_users_to_team_dict(parse_request(request)))
+    
+    def add_users_to_team_dict(self, data: dict) -> dict:
+        team_id = data.get('id')
+        users = data.get('users', [])
+        
+        if not team_id:
+            raise ValueError("Team ID is required")
+        if not users:
+            raise ValueError("Users list is required")
+        if not isinstance(users, list) or not all(isinstance(user_id, str) for user_id in users):
+            raise ValueError("Users must be a list of user IDs")
+        
+        with self.storage.transaction():
             team = self.storage.get('teams', team_id)
             if not team:
                 raise ValueError("Team not found")
             
-            current_members = self.storage.filter_by('user_teams', team_id=team_id)
-            if len(current_members) + len(users) > 50:
+            members = self._members(team_id)
+            new_users = [user_id for user_id in dict.fromkeys(users) if user_id not in members]
+            if len(members) + len(new_users) > 50:
                 raise ValueError("Cannot exceed 50 users per team")
             
-            for user_id in users:
+            for user_id in new_users:
                 user = self.storage.get('users', user_id)
                 if not user:
                     raise ValueError(f"User {user_id} not found")
                 
-                existing_membership = self.storage.filter_by('user_teams', user_id=user_id, team_id=team_id)
-                if not existing_membership:
-                    self.storage.create('user_teams', {
-                        'user_id': user_id,
-                        'team_id': team_id
-                    })
-            
-            return json.dumps({"status": "success"})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+                self.storage.create('user_teams', {
+                    'user_id': user_id,
+                    'team_id': team_id
+                })
+                members.add(user_id)
+            
+            tag = self._members_version(team_id)
+        
+        self._cache_members(team_id, tag, members)
+        return {"status": "success"}
     
     def remove_users_from_team(self, request: str):
-        try:
-            data = json.loads(request)
-            team_id = data.get('id')
-            users = data.get('users', [])
-            
-            if not team_id:
-                raise ValueError("Team ID is required")
-            if not users:
-                raise ValueError("Users list is required")
-            
+        return json.dumps(self.remove_users_from_team_dict(parse_request(request)))
+    
+    def remove_users_from_team_dict(self, data: dict) -> dict:
+        team_id = data.get('id')
+        users = data.get('users', [])
+        
+        if not team_id:
+            raise ValueError("Team ID is required")
+        if not users:
+            raise ValueError("Users list is required")
+        if not isinstance(users, list) or not all(isinstance(user_id, str) for user_id in users):
+            raise ValueError("Users must be a list of user IDs")
+        
+        with self.storage.transaction():
             team = self.storage.get('teams', team_id)
             if not team:
                 raise ValueError("Team not found")
             
+            members = self._members(team_id)
             for user_id in users:
                 if user_id == team['admin']:
                     raise ValueError("Cannot remove team admin")
+                if user_id not in members:
+                    continue
                 
                 memberships = self.storage.filter_by('user_teams', user_id=user_id, team_id=team_id)
                 for membership in memberships:
                     self.storage.delete('user_teams', membership['id'])
+                members.discard(user_id)
             
-            return json.dumps({"status": "success"})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+            tag = self._members_version(team_id)
+        
+        self._cache_members(team_id, tag, members)
+        return {"status": "success"}
     
     def list_team_users(self, request: str):
-        try:
-            data = json.loads(request)
-            team_id = data.get('id')
-            
-            if not team_id:
-                raise ValueError("Team ID is required")
-            
-            team = self.storage.get('teams', team_id)
-            if not team:
-                raise ValueError("Team not found")
-            
+        return json.dumps(self.list_team_users_dict(parse_request(request)))
+    
+    def list_team_users_dict(self, data: dict) -> list:
+        team_id = data.get('id')
+        
+        if not team_id:
+            raise ValueError("Team ID is required")
+        
+        team = self.storage.get('teams', team_id)
+        if not team:
+            raise ValueError("Team not found")
+        
+        paging = page_request(data)
+        if paging:
+            user_teams, next_key = self.storage.page('user_teams', *paging, team_id=team_id)
+        else:
             user_teams = self.storage.filter_by('user_teams', team_id=team_id)
-            result = []
-            
-            for user_team in user_teams:
-                user = self.storage.get('users', user_team['user_id'])
-                if user:
-                    result.append({
-                        'id': user['id'],
-                        'name': user['name'],
-                        'display_name': user['display_name']
-                    })
-            
-            return json.dumps(result)
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        users = self.storage.get_many('users', [user_team['user_id'] for user_team in user_teams])
+        result = []
+        
+        for user_team in user_teams:
+            user = users.get(user_team['user_id'])
+            if user:
+                result.append({
+                    'id': user['id'],
+                    'name': user['name'],
+                    'display_name': user['display_name']
+                })
+        
+        return page_response(result, next_key) if paging else result
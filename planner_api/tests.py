@@ -1,3 +1,1054 @@
-from django.test import TestCase
+import csv
+import importlib
+import io
+import json
+import os
+import shutil
+import tempfile
+import threading
+import time
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.core.management import call_command
+from django.test import SimpleTestCase, override_settings
+from django.urls import include, path
+
+from project_planner import urls as project_urls
+
+from . import instrumentation, metrics
+from .async_storage import get_async_config
+from .board import ProjectBoard
+from .cache import ResponseCache
+from .export_cache import ExportCache
+from .json_codecs import FORMAT_KEY, FORMAT_VERSION, available_codecs, decode_table, encode_table, get_codec
+from .log_storage import LogStorage
+from .profiling import Profiler, list_profiles, read_header
+from .record_storage import RecordStorage
+from .sqlite_storage import SqliteStorage
+from .storage import FileStorage, get_storage
+from .team import Team
+
+BACKENDS = [FileStorage, LogStorage, SqliteStorage, RecordStorage]
+
+# Routes /api/ to the async views; see APITestCase.urlconf.
+ASYNC_URLCONF = __name__
+urlpatterns = [path('api/', include('planner_api.async_urls'))]
+
+
+class StorageTestCase(SimpleTestCase):
+    """Each test gets an empty db directory per backend."""
+
+    def setUp(self):
+        self.db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.db_dir, True)
+
+    def storages(self):
+        return [backend(db_dir=os.path.join(self.db_dir, backend.__name__)) for backend in BACKENDS]
+
+    def backend(self, storage):
+        return self.subTest(backend=type(storage).__name__)
+
+
+class APITestCase(SimpleTestCase):
+    """Requests against a `backend` (FileStorage by default) in an empty db directory."""
+
+    backend = 'planner_api.storage.FileStorage'
+    # The URL conf to route /api/ with, e.g. ASYNC_URLCONF; the project's by default.
+    urlconf = None
+
+    def setUp(self):
+        self.db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.db_dir, True)
+        overrides = override_settings(
+            PLANNER_STORAGE={'BACKEND': self.backend,
+                             'OPTIONS': {'db_dir': os.path.join(self.db_dir, 'db')}},
+            PLANNER_EXPORT_CACHE={'DIR': os.path.join(self.db_dir, 'out')},
+            **({'ROOT_URLCONF': self.urlconf} if self.urlconf else {}),
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        # Process-wide; a result cached against another test's db could carry the same tag.
+        # Patched by name: the runner may import this module under another package path
+        # than the views', with its own copy of planner_api.cache.
+        patcher = mock.patch('planner_api.cache._response_cache', ResponseCache())
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def call(self, method: str, path: str, body=None, status: int = 200):
+        if method == 'get':
+            response = self.client.get(f'/api/{path}', body or {})
+        else:
+            response = getattr(self.client, method)(f'/api/{path}', json.dumps(body or {}),
+                                                    content_type='application/json')
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+
+def _state(storage, entity_types=('users', 'tasks')):
+    return {entity_type: storage.get_all(entity_type) for entity_type in entity_types}
+
+
+class RecordCacheTests(StorageTestCase):
+    def test_reads_and_writes_are_served_from_memory(self):
+        storage = FileStorage(db_dir=self.db_dir)
+        user = storage.create('users', {'name': 'a'})
+        before = storage.cache_stats()['users']
+        storage.update('users', user, {'name': 'b'})
+        storage.get('users', user)
+        storage.get_all('users')
+        self.assertEqual(storage.filter_by('users', name='b')[0]['id'], user)
+        after = storage.cache_stats()['users']
+        self.assertEqual(after['misses'], before['misses'])
+        self.assertEqual(after['hits'], before['hits'] + 4)
+
+    def test_changes_on_disk_are_picked_up(self):
+        storage = FileStorage(db_dir=self.db_dir)
+        storage.create('users', {'name': 'a'})
+        misses = storage.cache_stats()['users']['misses']
+        # Another process rewrites the table.
+        other = {'x': {'id': 'x', 'name': 'b', 'creation_time': '1'}}
+        with open(storage._get_file_path('users'), 'wb') as f:
+            f.write(encode_table(storage.codec, other))
+        self.assertEqual(storage.get_all('users'), [other['x']])
+        self.assertEqual(storage.filter_by('users', name='b'), [other['x']])
+        self.assertEqual(storage.cache_stats()['users']['misses'], misses + 1)
+
+    def test_describe_does_not_touch_disk(self):
+        storage = FileStorage(db_dir=self.db_dir)
+        team_impl = Team(storage)
+        admin = storage.create('users', {'name': 'admin'})
+        team = team_impl.create_team_dict({'name': 'alpha', 'description': '', 'admin': admin})['id']
+        misses = storage.cache_stats()
+        team_impl.describe_team_dict({'id': team})
+        self.assertEqual(storage.cache_stats()['teams']['misses'], misses['teams']['misses'])
+        self.assertEqual(storage.cache_stats()['users']['misses'], misses['users']['misses'])
+
+
+class TransactionTests(StorageTestCase):
+    def test_rollback_leaves_memory_and_disk_unchanged(self):
+        for storage in self.storages():
+            with self.backend(storage):
+                user = storage.create('users', {'name': 'alice', 'display_name': 'A'})
+                task = storage.create('tasks', {'board_id': 'b1', 'title': 't', 'status': 'OPEN'})
+                before = _state(storage)
+
+                with self.assertRaises(RuntimeError), storage.transaction():
+                    storage.update('users', user, {'display_name': 'changed'})
+                    storage.delete('tasks', task)
+                    storage.create('tasks', {'board_id': 'b2', 'title': 'new', 'status': 'OPEN'})
+                    self.assertEqual(len(storage.get_all('tasks')), 1)
+                    raise RuntimeError
+
+                self.assertEqual(_state(storage), before)
+                self.assertEqual(storage.filter_by('tasks', board_id='b2'), [])
+                # A fresh instance on a copy only sees what reached the files.
+                copy = os.path.join(self.db_dir, 'copy-' + type(storage).__name__)
+                shutil.copytree(storage.db_dir, copy)
+                self.assertEqual(_state(type(storage)(db_dir=copy)), before)
+
+
+class PaginationTests(StorageTestCase):
+    def test_pages_add_up_to_the_full_list(self):
+        for storage in self.storages():
+            with self.backend(storage):
+                for i in range(7):
+                    storage.create('tasks', {'board_id': 'b1' if i % 2 else 'b2', 'title': f't{i}'})
+                for filters in ({}, {'board_id': 'b1'}):
+                    expected = storage.filter_by('tasks', **filters) if filters else storage.get_all('tasks')
+                    expected.sort(key=lambda task: (task['creation_time'], task['id']))
+                    pages, after = [], None
+                    while True:
+                        records, after = storage.page('tasks', 2, after, **filters)
+                        pages.extend(records)
+                        if after is None:
+                            break
+                    self.assertEqual(pages, expected)
+
+
+class GetManyTests(StorageTestCase):
+    def test_returns_the_found_records_by_id(self):
+        for storage in self.storages():
+            with self.backend(storage):
+                ids = [storage.create('tasks', {'board_id': f'b{i % 3}', 'title': f't{i}'}) for i in range(600)]
+                wanted = ids[::7] + ['missing'] + ids[:2]
+                records = storage.get_many('tasks', wanted)
+                self.assertEqual(set(records), set(ids[::7]) | set(ids[:2]))
+                for entity_id, record in records.items():
+                    self.assertEqual(record, storage.get('tasks', entity_id))
+                records[ids[0]]['title'] = 'changed'
+                self.assertEqual(storage.get('tasks', ids[0])['title'], 't0')
+                self.assertEqual(storage.get_many('tasks', []), {})
+                self.assertEqual(storage.get_many('users', ['missing']), {})
+
+
+class CodecTests(StorageTestCase):
+    records = {'u1': {'id': 'u1', 'name': 'zoë', 'tags': ['a', 'b'], 'count': 3, 'end_time': None}}
+
+    def test_every_installed_codec_reads_what_any_other_wrote(self):
+        for writer in available_codecs():
+            for reader in available_codecs():
+                with self.subTest(writer=writer, reader=reader):
+                    data = encode_table(get_codec(writer), self.records)
+                    self.assertEqual(json.loads(data)[FORMAT_KEY], FORMAT_VERSION)
+                    self.assertEqual(decode_table(get_codec(reader), data), self.records)
+
+    def test_legacy_pretty_printed_tables_still_load(self):
+        legacy = json.dumps(self.records, indent=2).encode('utf-8')
+        for name in available_codecs():
+            with self.subTest(codec=name):
+                self.assertEqual(decode_table(get_codec(name), legacy), self.records)
+
+    def test_newer_format_versions_are_refused(self):
+        data = json.dumps({FORMAT_KEY: FORMAT_VERSION + 1, 'records': {}}).encode('utf-8')
+        with self.assertRaises(ValueError):
+            decode_table(get_codec('json'), data)
+
+    def test_unknown_codec(self):
+        with self.assertRaises(ValueError):
+            get_codec('yaml')
+
+    def test_storage_rewrites_legacy_tables_in_the_current_format(self):
+        for name in available_codecs():
+            with self.subTest(codec=name):
+                db_dir = os.path.join(self.db_dir, name)
+                os.makedirs(db_dir)
+                with open(os.path.join(db_dir, 'users.json'), 'w') as f:
+                    json.dump(self.records, f, indent=2)
+                storage = FileStorage(db_dir=db_dir, codec=name)
+                self.assertEqual(storage.get('users', 'u1'), self.records['u1'])
+                storage.update('users', 'u1', {'name': 'zoe'})
+                with open(os.path.join(db_dir, 'users.json'), 'rb') as f:
+                    stored = json.loads(f.read())
+                self.assertEqual(stored[FORMAT_KEY], FORMAT_VERSION)
+                self.assertEqual(stored['records']['u1']['name'], 'zoe')
+
+
+class PartitionTests(SimpleTestCase):
+    def test_legacy_tasks_file_is_split_per_board(self):
+        db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, db_dir, True)
+        tasks = {
+            f'task-{i}': {'id': f'task-{i}', 'board_id': f'b{i % 2}', 'title': f't{i}',
+                          'creation_time': f'2024-01-01T00:00:0{i}'}
+            for i in range(4)
+        }
+        with open(os.path.join(db_dir, 'tasks.json'), 'w') as f:
+            json.dump(tasks, f, indent=2)
+
+        storage = FileStorage(db_dir=db_dir)
+        self.assertEqual([task['id'] for task in storage.filter_by('tasks', board_id='b1')], ['task-1', 'task-3'])
+        self.assertEqual(storage.get('tasks', 'task-2'), tasks['task-2'])
+        self.assertFalse(os.path.exists(os.path.join(db_dir, 'tasks.json')))
+        self.assertTrue(os.path.exists(os.path.join(db_dir, 'tasks.json.partitioned')))
+        self.assertEqual(sorted(name for name in os.listdir(os.path.join(db_dir, 'tasks')) if name.endswith('.json')),
+                         ['b0.json', 'b1.json'])
+
+
+    def test_partitions_option(self):
+        db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, db_dir, True)
+        storage = LogStorage(db_dir=db_dir, partitions={})
+        task = storage.create('tasks', {'board_id': 'b1', 'title': 't'})
+        self.assertTrue(os.path.exists(os.path.join(db_dir, 'tasks.log')))
+        self.assertEqual(storage.filter_by('tasks', board_id='b1')[0]['id'], task)
+        with self.assertRaises(ValueError):
+            RecordStorage(db_dir=db_dir, partitions={'tasks': 'board_id'})
+        RecordStorage(db_dir=os.path.join(db_dir, 'records'), partitions={})
+
+
+class SqliteStorageTests(StorageTestCase):
+    def test_records_round_trip(self):
+        storage = SqliteStorage(db_dir=self.db_dir)
+        record = {'name': 'a', 'team_id': 't', 'tags': ['x', 'y'], 'meta': {'n': 1, 'ok': True}, 'note': None}
+        first = storage.create('users', dict(record))
+        second = storage.create('users', {'name': 'b', 'team_id': 't'})
+        self.assertEqual({k: v for k, v in storage.get('users', first).items() if k in record}, record)
+        self.assertTrue(storage.update('users', first, {'name': 'c', 'meta': {'n': 2}}))
+        self.assertFalse(storage.update('users', 'missing', {'name': 'x'}))
+
+        # A new instance has a connection of its own and reads the same rows.
+        reopened = SqliteStorage(db_dir=self.db_dir)
+        self.assertEqual(reopened.get('users', first)['meta'], {'n': 2})
+        self.assertEqual([user['id'] for user in reopened.get_all('users')], [first, second])
+        self.assertEqual([user['id'] for user in reopened.filter_by('users', team_id='t', name='c')], [first])
+        self.assertEqual([user['id'] for user in reopened.filter_by('users', note=None)], [first])
+        self.assertEqual(reopened.count('users', team_id='t'), 2)
+        self.assertEqual(set(reopened.get_many('users', [first, 'missing', second])), {first, second})
+
+        self.assertTrue(reopened.delete('users', second))
+        self.assertIsNone(storage.get('users', second))
+        self.assertFalse(storage.delete('users', second))
+
+    def test_versions_move_with_their_scope(self):
+        storage = SqliteStorage(db_dir=self.db_dir)
+        storage.create('boards', {'name': 'a', 'team_id': 't1'})
+        t1, t2 = storage.version('boards', team_id='t1'), storage.version('boards', team_id='t2')
+        board = storage.create('boards', {'name': 'b', 'team_id': 't1'})
+        self.assertNotEqual(storage.version('boards', team_id='t1'), t1)
+        self.assertEqual(storage.version('boards', team_id='t2'), t2)
+        with self.assertRaises(RuntimeError):
+            with storage.transaction():
+                storage.update('boards', board, {'team_id': 't2'})
+                raise RuntimeError
+        self.assertEqual(storage.get('boards', board)['team_id'], 't1')
+
+
+class SqliteImportTests(SimpleTestCase):
+    def setUp(self):
+        self.db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.db_dir, True)
+
+    def test_partitions_are_imported_in_creation_order(self):
+        source = FileStorage(db_dir=os.path.join(self.db_dir, 'json'))
+        for i in range(6):
+            source.create('tasks', {'title': f't{i}', 'board_id': f'b{i % 2}'})
+        target = os.path.join(self.db_dir, 'sqlite')
+        call_command('import_json_db', source=source.db_dir, target=target, stdout=io.StringIO())
+        self.assertEqual(SqliteStorage(db_dir=target).get_all('tasks'), source.get_all('tasks'))
+
+
+class RecordStorageTests(SimpleTestCase):
+    def test_long_creation_times_survive_the_index(self):
+        db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, db_dir, True)
+        # Equal in their first 26 characters: only the full values order them.
+        times = ['2024-01-01T00:00:02.000000+05:30', '2024-01-01T00:00:03', '2024-01-01T00:00:01']
+        users = {f'user-{i}': {'id': f'user-{i}', 'name': f'u{i}', 'creation_time': value}
+                 for i, value in enumerate(times)}
+        with open(os.path.join(db_dir, 'users.json'), 'w') as f:
+            json.dump(users, f)
+        storage = RecordStorage(db_dir=db_dir)
+        storage.update('users', 'user-1', {'creation_time': '2024-01-01T00:00:02.000000+00:00'})
+
+        copy = os.path.join(db_dir, 'copy')
+        shutil.copytree(db_dir, copy, ignore=shutil.ignore_patterns('copy'))
+        for reader in (storage, RecordStorage(db_dir=copy)):
+            records, _ = reader.page('users', 10)
+            self.assertEqual([user['id'] for user in records], ['user-2', 'user-1', 'user-0'])
+            self.assertEqual(reader.get('users', 'user-0')['creation_time'], times[0])
+
+
+class LogReplayTests(SimpleTestCase):
+    def setUp(self):
+        self.db_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.db_dir, True)
+
+    def test_reader_leaves_a_partial_line_alone(self):
+        writer = LogStorage(db_dir=self.db_dir, snapshot_bytes=0)
+        first = writer.create('users', {'name': 'a'})
+        path = writer._get_file_path('users')
+        line = writer._encode('put', {'id': 'late', 'name': 'b', 'creation_time': '2'})
+        # Another process's append, caught halfway.
+        with open(path, 'ab') as f:
+            f.write(line[:10])
+        size = os.path.getsize(path)
+        table = LogStorage(db_dir=self.db_dir)._read_table('users', path, writer._stamp(path))
+        self.assertEqual(list(table.records), [first])
+        self.assertEqual(os.path.getsize(path), size)
+        with open(path, 'ab') as f:
+            f.write(line[10:])
+        table = LogStorage(db_dir=self.db_dir)._read_table('users', path, writer._stamp(path))
+        self.assertEqual(list(table.records), [first, 'late'])
+
+    def test_next_append_trims_a_torn_line(self):
+        storage = LogStorage(db_dir=self.db_dir, snapshot_bytes=0)
+        first = storage.create('users', {'name': 'a'})
+        path = storage._get_file_path('users')
+        with open(path, 'ab') as f:
+            f.write(b'{"op": "put", "rec')
+        second = storage.create('users', {'name': 'b'})
+        table = LogStorage(db_dir=self.db_dir)._read_table('users', path, storage._stamp(path))
+        self.assertEqual(list(table.records), [first, second])
+
+
+class SnapshotTests(StorageTestCase):
+    def test_snapshot_plus_log_delta_equals_full_replay(self):
+        storage = LogStorage(db_dir=os.path.join(self.db_dir, 'log'), snapshot_bytes=0)
+        ids = [storage.create('user_teams', {'user_id': f'u{i}', 'team_id': f't{i % 3}'}) for i in range(20)]
+        storage.snapshot('user_teams')
+        storage.update('user_teams', ids[0], {'team_id': 't2'})
+        storage.delete('user_teams', ids[1])
+        storage.create('user_teams', {'user_id': 'late', 'team_id': 't0'})
+
+        path = storage._get_file_path('user_teams')
+        index_keys = storage._index_keys('user_teams')
+        self.assertIsNotNone(storage._read_snapshot('user_teams', path, index_keys))
+        from_snapshot = storage._read_table('user_teams', path, storage._stamp(path))
+        os.remove(storage._snapshot_path('user_teams'))
+        replayed = storage._read_table('user_teams', path, storage._stamp(path))
+        self.assertEqual(from_snapshot.records, replayed.records)
+        self.assertEqual(list(from_snapshot.records), list(replayed.records))
+        self.assertEqual(from_snapshot.indexes, replayed.indexes)
+        self.assertEqual(from_snapshot.entries, replayed.entries)
+        self.assertEqual(replayed.records, {record['id']: record for record in storage.get_all('user_teams')})
+
+    def test_snapshot_is_json(self):
+        storage = LogStorage(db_dir=os.path.join(self.db_dir, 'log'), snapshot_bytes=0, codec='json')
+        storage.create('user_teams', {'user_id': 'u', 'team_id': 't'})
+        storage.snapshot('user_teams')
+        with open(storage._snapshot_path('user_teams'), 'rb') as f:
+            header, state = (json.loads(line) for line in f)
+        self.assertEqual(header['index_keys'], [list(keys) for keys in storage._index_keys('user_teams')])
+        buckets = {tuple(keys): buckets for keys, buckets in state['indexes']}
+        self.assertEqual(buckets[('user_id', 'team_id')], [[['u', 't'], list(state['records'])]])
+
+
+class RecordOrderTests(StorageTestCase):
+    def test_filter_by_keeps_creation_order_after_updates(self):
+        for storage in self.storages():
+            with self.backend(storage):
+                ids = [storage.create('tasks', {'board_id': 'b1', 'title': f't{i}', 'status': 'OPEN'})
+                       for i in range(3)]
+                storage.update('tasks', ids[0], {'status': 'COMPLETE'})
+                storage.update('tasks', ids[1], {'title': 'renamed'})
+                with self.assertRaises(RuntimeError), storage.transaction():
+                    storage.update('tasks', ids[0], {'title': 'rolled back'})
+                    raise RuntimeError
+                self.assertEqual([task['id'] for task in storage.filter_by('tasks', board_id='b1')], ids)
+                self.assertEqual([task['id'] for task in storage.iter_filter('tasks', board_id='b1')], ids)
+
+    def test_record_moved_into_a_bucket_takes_its_creation_place(self):
+        for storage in self.storages():
+            with self.backend(storage):
+                first = storage.create('user_teams', {'user_id': 'u1', 'team_id': 'a'})
+                moved = storage.create('user_teams', {'user_id': 'u2', 'team_id': 'b'})
+                last = storage.create('user_teams', {'user_id': 'u3', 'team_id': 'a'})
+                storage.update('user_teams', moved, {'team_id': 'a'})
+                self.assertEqual([m['id'] for m in storage.filter_by('user_teams', team_id='a')], [first, moved, last])
+
+
+class BoardOrderTests(APITestCase):
+    def test_board_list_order_survives_task_writes(self):
+        user = self.call('post', 'users/create', {'name': 'alice', 'display_name': 'Alice'}, 201)['id']
+        team = self.call('post', 'teams/create', {'name': 'alpha', 'description': '', 'admin': user}, 201)['id']
+        for name in ('b1', 'b2'):
+            self.call('post', 'boards/create', {'name': name, 'description': '', 'team_id': team}, 201)
+        board = self.call('post', 'boards/list', {'id': team})[0]['id']
+        task = self.call('post', 'tasks/create',
+                         {'title': 't', 'description': '', 'user_id': user, 'board_id': board}, 201)['id']
+        self.call('put', 'tasks/update', {'id': task, 'status': 'COMPLETE'})
+        self.assertEqual([b['name'] for b in self.call('post', 'boards/list', {'id': team})], ['b1', 'b2'])
+
+
+class BoardCounterTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.call('post', 'users/create', {'name': 'alice', 'display_name': 'Alice'}, 201)['id']
+        self.team = self.call('post', 'teams/create', {'name': 'alpha', 'description': '', 'admin': self.user}, 201)['id']
+        self.board = self.call('post', 'boards/create', {'name': 'b', 'description': '', 'team_id': self.team}, 201)['id']
+
+    def add_task(self, title: str) -> str:
+        return self.call('post', 'tasks/create',
+                         {'title': title, 'description': '', 'user_id': self.user, 'board_id': self.board}, 201)['id']
+
+    def etag(self, path: str, body: dict) -> str:
+        return self.client.post(f'/api/{path}', json.dumps(body), content_type='application/json')['ETag']
+
+    def test_task_writes_leave_the_board_list_alone(self):
+        list_etag = self.etag('boards/list', {'id': self.team})
+        progress_etag = self.etag('boards/progress', {'id': self.board})
+        export = self.call('post', 'boards/export', {'id': self.board})['out_file']
+        task = self.add_task('t')
+        self.call('put', 'tasks/update', {'id': task, 'status': 'COMPLETE'})
+        self.assertEqual(self.etag('boards/list', {'id': self.team}), list_etag)
+        self.assertNotEqual(self.etag('boards/progress', {'id': self.board}), progress_etag)
+        self.assertNotEqual(self.call('post', 'boards/export', {'id': self.board})['out_file'], export)
+        counts = self.call('post', 'boards/progress', {'team_id': self.team})[0]['task_counts']
+        self.assertEqual(counts, {'OPEN': 0, 'IN_PROGRESS': 0, 'COMPLETE': 1, 'total': 1})
+
+    def test_task_of_a_missing_board_is_a_bad_request(self):
+        task = self.add_task('t')
+        get_storage().delete('boards', self.board)
+        error = self.call('put', 'tasks/update', {'id': task, 'status': 'COMPLETE'}, 400)
+        self.assertEqual(error, {'error': 'Board not found'})
+        result = self.call('put', 'tasks/bulk-update', {'tasks': [{'id': task, 'status': 'COMPLETE'}]})
+        self.assertEqual(result['results'], [{'id': task, 'error': 'Board not found'}])
+
+    def test_progress_of_a_board_without_counters_does_not_write(self):
+        self.add_task('t')
+        storage = get_storage()
+        for counter in storage.get_all('board_counters'):
+            storage.delete('board_counters', counter['id'])
+        progress = self.call('post', 'boards/progress', {'id': self.board})
+        self.assertEqual(progress['task_counts'], {'OPEN': 1, 'IN_PROGRESS': 0, 'COMPLETE': 0, 'total': 1})
+        self.assertEqual(storage.get_all('board_counters'), [])
+
+
+class BulkTaskTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.call('post', 'users/create', {'name': 'alice', 'display_name': 'Alice'}, 201)['id']
+        self.team = self.call('post', 'teams/create', {'name': 'alpha', 'description': '', 'admin': self.user}, 201)['id']
+        self.board = self.call('post', 'boards/create', {'name': 'b', 'description': '', 'team_id': self.team}, 201)['id']
+
+    def task(self, title, **fields):
+        return {'title': title, 'description': '', 'user_id': self.user, **fields}
+
+    def test_bulk_create_reports_each_failure_in_place(self):
+        result = self.call('post', 'tasks/bulk-create', {'board_id': self.board, 'tasks': [
+            self.task('a'),
+            self.task('a'),
+            self.task(5),
+            self.task('b', user_id='missing'),
+            'not an object',
+            self.task('c', board_id='missing'),
+            self.task('d'),
+        ]}, 201)
+        self.assertEqual(result['created'], 2)
+        self.assertEqual([item.get('error') for item in result['results']], [
+            None,
+            'Task title must be unique for a board',
+            'Task title must be a string',
+            'User not found',
+            'Task must be an object',
+            'Board not found',
+            None,
+        ])
+        titles = [task['title'] for task in get_storage().filter_by('tasks', board_id=self.board)]
+        self.assertEqual(titles, ['a', 'd'])
+        progress = self.call('post', 'boards/progress', {'id': self.board})
+        self.assertEqual(progress['task_counts']['total'], 2)
+
+    def test_bulk_create_without_any_task_added_is_a_bad_request(self):
+        result = self.call('post', 'tasks/bulk-create', {'board_id': self.board, 'tasks': [
+            self.task(None), self.task('a', description=['x']),
+        ]}, 400)
+        self.assertEqual(result, {'created': 0, 'results': [
+            {'error': 'Title is required and must be max 64 characters'},
+            {'error': 'Task description must be a string'},
+        ]})
+        self.call('post', 'tasks/bulk-create', {'board_id': self.board, 'tasks': []}, 400)
+        self.call('post', 'tasks/bulk-create', {'board_id': self.board, 'tasks': [self.task('x')] * 1001}, 400)
+
+    def test_bulk_update_applies_the_valid_changes(self):
+        created = self.call('post', 'tasks/bulk-create', {'board_id': self.board,
+                                                          'tasks': [self.task('a'), self.task('b')]}, 201)
+        first, second = [item['id'] for item in created['results']]
+        result = self.call('put', 'tasks/bulk-update', {'tasks': [
+            {'id': first, 'status': 'COMPLETE'},
+            {'id': second, 'status': 'DONE'},
+            {'id': 'missing', 'status': 'OPEN'},
+            {'id': {'not': 'an id'}, 'status': 'OPEN'},
+            {'id': second, 'status': 'IN_PROGRESS'},
+        ]})
+        self.assertEqual(result['updated'], 2)
+        self.assertEqual([item.get('error') for item in result['results']], [
+            None,
+            'Status must be OPEN, IN_PROGRESS, or COMPLETE',
+            'Task not found',
+            'Task ID must be a string',
+            None,
+        ])
+        progress = self.call('post', 'boards/progress', {'id': self.board})
+        self.assertEqual(progress['task_counts'], {'OPEN': 0, 'IN_PROGRESS': 1, 'COMPLETE': 1, 'total': 2})
+
+
+class ExportFormatTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.user = self.call('post', 'users/create', {'name': 'alice', 'display_name': 'Alice'}, 201)['id']
+        self.team = self.call('post', 'teams/create', {'name': 'alpha', 'description': '', 'admin': self.user}, 201)['id']
+        self.board = self.call('post', 'boards/create', {'name': 'b', 'description': 'the board', 'team_id': self.team}, 201)['id']
+        self.tasks = [
+            self.call('post', 'tasks/create', {'title': title, 'description': description,
+                                               'user_id': self.user, 'board_id': self.board}, 201)['id']
+            for title, description in [('first', 'plain'), ('second', 'has, a "comma"')]
+        ]
+        self.call('put', 'tasks/update', {'id': self.tasks[1], 'status': 'COMPLETE'})
+        get_storage().delete('users', self.user)
+        self.user = self.call('post', 'users/create', {'name': 'bob', 'display_name': ''}, 201)['id']
+        self.call('post', 'tasks/create', {'title': 'third', 'description': '',
+                                           'user_id': self.user, 'board_id': self.board}, 201)
+
+    def export(self, export_format: str) -> str:
+        response = self.client.post('/api/boards/export', json.dumps({
+            'id': self.board, 'format': export_format, 'download': True,
+        }), content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(f'.{export_format}"', response['Content-Disposition'])
+        return b''.join(response.streaming_content).decode()
+
+    def test_txt_report(self):
+        report = self.export('txt')
+        self.assertTrue(report.startswith('BOARD EXPORT REPORT\n'))
+        self.assertIn('Description: the board\n', report)
+        self.assertIn('TASKS (3 total)\n', report)
+        self.assertIn('1. first [OPEN]\n   Assigned to: Unknown User\n   Description: plain\n', report)
+        self.assertIn('2. second [COMPLETE]\n', report)
+        self.assertIn('3. third [OPEN]\n   Assigned to: bob\n', report)
+        self.assertTrue(report.endswith('Open: 2\nIn Progress: 0\nComplete: 1\nTotal: 3\n'))
+
+    def test_csv_rows(self):
+        rows = list(csv.reader(io.StringIO(self.export('csv'))))
+        self.assertEqual(rows[0], ['title', 'status', 'assigned_to', 'description', 'creation_time'])
+        self.assertEqual([row[:4] for row in rows[1:]], [
+            ['first', 'OPEN', 'Unknown User', 'plain'],
+            ['second', 'COMPLETE', 'Unknown User', 'has, a "comma"'],
+            ['third', 'OPEN', 'bob', ''],
+        ])
+
+    def test_jsonl_records(self):
+        records = [json.loads(line) for line in self.export('jsonl').splitlines()]
+        self.assertEqual([record['id'] for record in records[:2]], self.tasks)
+        self.assertEqual([(record['title'], record['status'], record['assigned_to']) for record in records], [
+            ('first', 'OPEN', 'Unknown User'),
+            ('second', 'COMPLETE', 'Unknown User'),
+            ('third', 'OPEN', 'bob'),
+        ])
+        self.assertEqual(records[1]['description'], 'has, a "comma"')
+
+    def test_download_matches_the_exported_file(self):
+        out_file = self.call('post', 'boards/export', {'id': self.board, 'format': 'csv'})['out_file']
+        with open(os.path.join(settings.PLANNER_EXPORT_CACHE['DIR'], out_file), newline='') as f:
+            self.assertEqual(f.read(), self.export('csv'))
+
+    def test_unknown_format_is_a_bad_request(self):
+        error = self.call('post', 'boards/export', {'id': self.board, 'format': 'xml'}, 400)
+        self.assertEqual(error, {'error': 'Format must be txt, csv, or jsonl'})
+
+
+class ExportCacheTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.cache = ExportCache(os.path.join(self.db_dir, 'cache'), max_bytes=10, max_age=60)
+
+    def store(self, filename: str, content: str, age: float = 0):
+        for _ in self.cache.store(filename, [content]):
+            pass
+        when = time.time() - age
+        os.utime(os.path.join(self.cache.directory, filename), (when, when))
+
+    def cached(self):
+        return sorted(os.listdir(self.cache.directory))
+
+    def test_export_is_served_from_the_cache_until_the_board_changes(self):
+        user = self.call('post', 'users/create', {'name': 'alice', 'display_name': ''}, 201)['id']
+        team = self.call('post', 'teams/create', {'name': 'alpha', 'description': '', 'admin': user}, 201)['id']
+        board = self.call('post', 'boards/create', {'name': 'b', 'description': '', 'team_id': team}, 201)['id']
+        out_file = self.call('post', 'boards/export', {'id': board})['out_file']
+        with open(os.path.join(settings.PLANNER_EXPORT_CACHE['DIR'], out_file), 'w') as f:
+            f.write('cached report')
+        self.assertEqual(self.call('post', 'boards/export', {'id': board})['out_file'], out_file)
+        response = self.client.post('/api/boards/export', json.dumps({'id': board, 'download': True}),
+                                    content_type='application/json')
+        self.assertEqual(b''.join(response.streaming_content), b'cached report')
+
+        task = self.call('post', 'tasks/create',
+                         {'title': 't', 'description': '', 'user_id': user, 'board_id': board}, 201)['id']
+        self.call('put', 'tasks/update', {'id': task, 'status': 'COMPLETE'})
+        after_task = self.call('post', 'boards/export', {'id': board})['out_file']
+        self.assertNotEqual(after_task, out_file)
+        self.call('post', 'boards/close', {'id': board})
+        self.assertNotIn(self.call('post', 'boards/export', {'id': board})['out_file'], (out_file, after_task))
+
+    def test_expired_files_are_evicted(self):
+        self.store('old.txt', 'a', age=120)
+        self.store('new.txt', 'b')
+        self.assertEqual(self.cached(), ['new.txt'])
+        self.assertIsNone(self.cache.lookup('old.txt'))
+
+    def test_least_recently_used_files_go_first_over_the_size_limit(self):
+        self.store('a.txt', '1234', age=30)
+        self.store('b.txt', '1234', age=20)
+        self.assertIsNotNone(self.cache.lookup('a.txt'))
+        self.store('c.txt', '1234')
+        self.assertEqual(self.cached(), ['a.txt', 'c.txt'])
+
+    def test_abandoned_stream_leaves_nothing_behind(self):
+        stream = self.cache.store('partial.txt', iter(['a', 'b']))
+        next(stream)
+        stream.close()
+        self.assertEqual(self.cached(), [])
+        self.assertIsNone(self.cache.lookup('partial.txt'))
+
+
+class PaginationAPITests(APITestCase):
+    def test_cursor_walk_matches_the_full_list(self):
+        for i in range(5):
+            self.call('post', 'users/create', {'name': f'user{i}', 'display_name': ''}, 201)
+        items, cursor = [], None
+        while True:
+            page = self.call('get', 'users', {'limit': 2, **({'cursor': cursor} if cursor else {})})
+            items.extend(page['items'])
+            cursor = page['next_cursor']
+            if cursor is None:
+                break
+        self.assertEqual(items, self.call('get', 'users'))
+
+    def test_bad_cursor_is_a_bad_request(self):
+        self.assertEqual(self.call('get', 'users', {'cursor': 'not-a-cursor'}, 400), {'error': 'Invalid cursor'})
+        self.call('get', 'users', {'limit': 0}, 400)
+
+
+class ConditionalRequestTests(APITestCase):
+    def get(self, path: str, params=None, **headers):
+        return self.client.get(f'/api/{path}', params or {}, **headers)
+
+    def test_matching_etag_is_not_modified(self):
+        self.call('post', 'users/create', {'name': 'alice', 'display_name': ''}, 201)
+        response = self.get('users')
+        etag = response['ETag']
+        for if_none_match in (etag, f'W/{etag}', f'"other", {etag}', '*'):
+            with self.subTest(if_none_match=if_none_match):
+                not_modified = self.get('users', HTTP_IF_NONE_MATCH=if_none_match)
+                self.assertEqual(not_modified.status_code, 304)
+                self.assertEqual(not_modified.content, b'')
+                self.assertEqual(not_modified['ETag'], etag)
+        self.assertEqual(self.get('users', HTTP_IF_NONE_MATCH='"other"').status_code, 200)
+        self.assertNotEqual(self.get('users', {'limit': 1})['ETag'], etag)
+
+    def test_writes_change_the_etag(self):
+        user = self.call('post', 'users/create', {'name': 'alice', 'display_name': ''}, 201)['id']
+        etag = self.get('users')['ETag']
+        self.call('put', 'users/update', {'id': user, 'user': {'display_name': 'Alice'}})
+        response = self.get('users', HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(response.status_code, 200)
+        self.assertNotEqual(response['ETag'], etag)
+        self.assertEqual(response.json()[0]['display_name'], 'Alice')
+
+
+class ResponseCacheTests(SimpleTestCase):
+    def test_a_new_tag_retires_the_entry(self):
+        cache = ResponseCache(max_entries=4)
+        cache.put('k', '"1"', 'old')
+        self.assertEqual(cache.get('k', '"1"'), (True, 'old'))
+        self.assertEqual(cache.get('k', '"2"'), (False, None))
+        self.assertEqual(cache.stats()['entries'], 0)
+        cache.put('k', '"2"', 'new')
+        self.assertEqual(cache.get('k', '"2"'), (True, 'new'))
+        self.assertEqual(cache.stats(), {'entries': 1, 'max_entries': 4, 'hits': 2, 'misses': 1,
+                                         'evictions': 0, 'hit_rate': 2 / 3})
+
+    def test_least_recently_used_entries_are_evicted(self):
+        cache = ResponseCache(max_entries=2)
+        cache.put('a', 't', 1)
+        cache.put('b', 't', 2)
+        cache.get('a', 't')
+        cache.put('c', 't', 3)
+        self.assertEqual(cache.get('b', 't'), (False, None))
+        self.assertEqual(cache.get('a', 't'), (True, 1))
+        self.assertEqual(cache.get('c', 't'), (True, 3))
+        self.assertEqual(cache.stats()['evictions'], 1)
+
+
+class ResponseCacheAPITests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = self.call('post', 'users/create', {'name': 'admin', 'display_name': ''}, 201)['id']
+        self.user = self.call('post', 'users/create', {'name': 'user', 'display_name': ''}, 201)['id']
+        self.teams = [
+            self.call('post', 'teams/create', {'name': name, 'description': '', 'admin': self.admin}, 201)['id']
+            for name in ('alpha', 'beta')
+        ]
+
+    def members(self, team: str):
+        return {user['id'] for user in self.call('post', 'teams/users', {'id': team})}
+
+    def test_writes_only_retire_the_results_they_touch(self):
+        for team in self.teams:
+            self.members(team)
+        stats = self.call('get', '_cache')
+        self.call('post', 'teams/add-users', {'id': self.teams[0], 'users': [self.user]})
+        self.assertEqual(self.members(self.teams[1]), {self.admin})
+        self.assertEqual(self.members(self.teams[0]), {self.admin, self.user})
+        after = self.call('get', '_cache')
+        self.assertEqual(after['hits'] - stats['hits'], 1)
+        self.assertEqual(after['misses'] - stats['misses'], 1)
+
+
+class TeamMemberCapTests(APITestCase):
+    def setUp(self):
+        super().setUp()
+        self.users = [
+            self.call('post', 'users/create', {'name': f'user{i}', 'display_name': ''}, 201)['id'] for i in range(52)
+        ]
+        self.team = self.call('post', 'teams/create',
+                              {'name': 'alpha', 'description': '', 'admin': self.users[0]}, 201)['id']
+
+    def members(self):
+        return {user['id'] for user in self.call('post', 'teams/users', {'id': self.team})}
+
+    def test_duplicates_and_existing_members_do_not_count(self):
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': self.users[1:40] + self.users[1:40]})
+        self.assertEqual(len(self.members()), 40)
+        # 40 members, 39 of them resent with 10 new users: exactly 50.
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': self.users[:50]})
+        self.assertEqual(self.members(), set(self.users[:50]))
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': self.users[:50]})
+
+    def test_cap_rejects_the_51st_member(self):
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': self.users[1:50]})
+        error = self.call('post', 'teams/add-users', {'id': self.team, 'users': [self.users[50]]}, 400)
+        self.assertEqual(error, {'error': 'Cannot exceed 50 users per team'})
+        self.call('post', 'teams/remove-users', {'id': self.team, 'users': [self.users[1]]})
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': [self.users[50], self.users[2]]})
+        self.assertEqual(len(self.members()), 50)
+
+    def test_membership_changes_keep_the_team_etags(self):
+        describe = self.client.post('/api/teams/describe', json.dumps({'id': self.team}), content_type='application/json')
+        listing = self.client.get('/api/teams')
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': self.users[1:5]})
+        self.call('post', 'teams/remove-users', {'id': self.team, 'users': [self.users[1]]})
+        self.assertEqual(self.client.post('/api/teams/describe', json.dumps({'id': self.team}),
+                                          content_type='application/json')['ETag'], describe['ETag'])
+        self.assertEqual(self.client.get('/api/teams')['ETag'], listing['ETag'])
+        self.assertEqual(len(self.members()), 4)
+
+    def test_failed_add_changes_nothing(self):
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': [self.users[1], 'missing']}, 400)
+        self.assertEqual(self.members(), {self.users[0]})
+        self.call('post', 'teams/add-users', {'id': self.team, 'users': [self.users[1]]})
+        self.assertEqual(self.members(), {self.users[0], self.users[1]})
+
+
+class ServerTimingTests(APITestCase):
+    def test_header_reports_storage_phases_and_total(self):
+        self.call('post', 'users/create', {'name': 'alice', 'display_name': 'Alice'}, 201)
+        header = self.client.get('/api/users')['Server-Timing']
+        names = [metric.split(';', 1)[0] for metric in header.split(', ')]
+        self.assertEqual(names[-4:], ['bytes-read', 'bytes-written', 'records-scanned', 'total'])
+        self.assertEqual(settings.MIDDLEWARE[0], 'planner_api.middleware.ServerTimingMiddleware')
+
+    def test_header_can_be_turned_off(self):
+        with override_settings(PLANNER_TIMING={'HEADER': False}):
+            self.assertNotIn('Server-Timing', self.client.get('/api/users'))
+
+    def test_timings_shared_between_threads_add_up(self):
+        timings = instrumentation.Timings()
+
+        def work():
+            for _ in range(1000):
+                timings.add('load', 0.001)
+                timings.count(bytes_read=1)
+
+        threads = [threading.Thread(target=work) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(timings.phases['load'][0], 8000)
+        self.assertEqual(timings.bytes_read, 8000)
+
+
+def _samples(text: str) -> dict:
+    return dict(line.rsplit(' ', 1) for line in text.splitlines() if not line.startswith('#'))
+
+
+class MetricsTests(APITestCase):
+    def metrics(self) -> dict:
+        response = self.client.get('/api/_metrics')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Content-Type'], metrics.CONTENT_TYPE)
+        return _samples(response.content.decode())
+
+    def test_requests_and_storage_are_reported(self):
+        before = self.metrics()
+        self.call('post', 'users/create', {'name': 'alice', 'display_name': ''}, 201)
+        self.call('post', 'users/create', {'name': 'alice', 'display_name': ''}, 400)
+        self.call('get', 'users')
+        after = self.metrics()
+
+        def delta(sample: str) -> float:
+            return float(after[sample]) - float(before.get(sample, 0))
+
+        created = 'planner_http_requests_total{route="api/users/create",method="POST",status="201"}'
+        rejected = 'planner_http_requests_total{route="api/users/create",method="POST",status="400"}'
+        self.assertEqual(delta(created), 1)
+        self.assertEqual(delta(rejected), 1)
+        latency = 'planner_http_request_duration_seconds'
+        self.assertEqual(delta(f'{latency}_count{{route="api/users/create",method="POST"}}'), 2)
+        self.assertEqual(delta(f'{latency}_bucket{{route="api/users/create",method="POST",le="+Inf"}}'), 2)
+        self.assertGreater(delta('planner_storage_written_bytes_total{entity="users"}'), 0)
+        self.assertIn('planner_storage_cache_hits_total{entity="users"}', after)
+        self.assertGreater(int(after['planner_db_bytes{entity="users"}']), 0)
+        self.assertEqual(after['planner_db_files{entity="users"}'], '1')
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = metrics.Metrics(buckets=(0.1, 1.0))
+        for seconds in (0.05, 0.5, 0.5, 5.0):
+            registry.observe_request('api/users', 'GET', 200, seconds)
+        samples = _samples(registry.render())
+        labels = 'route="api/users",method="GET"'
+        self.assertEqual(samples[f'planner_http_requests_total{{{labels},status="200"}}'], '4')
+        self.assertEqual([samples[f'planner_http_request_duration_seconds_bucket{{{labels},le="{le}"}}']
+                          for le in ('0.1', '1.0', '+Inf')], ['1', '3', '4'])
+        self.assertEqual(samples[f'planner_http_request_duration_seconds_sum{{{labels}}}'], '6.050000')
+
+
+class ProfilingTests(APITestCase):
+    def profile_requests(self, **options):
+        profiler = Profiler(**{'enabled': True, 'sample_rate': 1, 'threshold_ms': 0,
+                               'directory': os.path.join(self.db_dir, 'profiles'), **options})
+        # By name, like the response cache in APITestCase.setUp.
+        patcher = mock.patch('planner_api.profiling._profiler', profiler)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        return profiler
+
+    def test_sampled_slow_requests_are_saved(self):
+        profiler = self.profile_requests()
+        self.call('post', 'users/create', {'name': 'alice', 'display_name': ''}, 201)
+        self.call('get', 'users')
+        headers = [read_header(path) for path in list_profiles(profiler.directory)]
+        self.assertEqual([(header['method'], header['path'], header['status']) for header in headers],
+                         [('POST', '/api/users/create', 201), ('GET', '/api/users', 200)])
+        out = io.StringIO()
+        call_command('profiles', dir=profiler.directory, path='create', stdout=out)
+        self.assertEqual(len(out.getvalue().splitlines()), 2)
+
+    def test_unsampled_and_fast_requests_are_not_saved(self):
+        for options in ({'sample_rate': 0}, {'threshold_ms': 60_000}, {'enabled': False}):
+            with self.subTest(**options):
+                profiler = self.profile_requests(**options)
+                self.call('get', 'users')
+                self.assertEqual(list_profiles(profiler.directory), [])
+
+    def test_only_the_newest_profiles_are_kept(self):
+        profiler = self.profile_requests(max_files=2)
+        for i in range(4):
+            self.call('post', 'users/create', {'name': f'user{i}', 'display_name': ''}, 201)
+        self.call('get', 'users')
+        profiles = list_profiles(profiler.directory)
+        self.assertEqual([read_header(path)['method'] for path in profiles], ['POST', 'GET'])
+        self.assertEqual(len(os.listdir(profiler.directory)), 4)
+
+
+class UnversionedStorage(FileStorage):
+    """A backend that cannot report versions, like StorageBase's default."""
+
+    def version(self, entity_type: str, **scope):
+        return None
+
+
+class UnversionedMembershipTests(StorageTestCase):
+    def test_members_are_read_without_a_version(self):
+        storage = UnversionedStorage(db_dir=self.db_dir)
+        team_impl = Team(storage)
+        admin = storage.create('users', {'name': 'admin'})
+        other = storage.create('users', {'name': 'other'})
+        team = team_impl.create_team_dict({'name': 'alpha', 'description': '', 'admin': admin})['id']
+        self.assertEqual(team_impl._members(team), {admin})
+        # Written behind the team's back; nothing may have cached the old set.
+        storage.create('user_teams', {'user_id': other, 'team_id': team})
+        self.assertEqual(team_impl._members(team), {admin, other})
+
+
+class AsyncSettingsTests(SimpleTestCase):
+    def test_partial_async_settings_fall_back_to_the_defaults(self):
+        with override_settings(PLANNER_ASYNC={'MAX_WORKERS': 4}):
+            self.assertEqual(get_async_config(), {'VIEWS': False, 'MAX_WORKERS': 4})
+            self.addCleanup(importlib.reload, project_urls)
+            importlib.reload(project_urls)
+
+
+class CountingStorage(FileStorage):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.gets = 0
+
+    def get(self, entity_type: str, entity_id: str):
+        self.gets += 1
+        return super().get(entity_type, entity_id)
+
+
+class AsyncAddTaskTests(StorageTestCase):
+    async def test_board_and_user_are_read_once(self):
+        storage = CountingStorage(db_dir=self.db_dir)
+        board_impl = ProjectBoard(storage)
+        user = storage.create('users', {'name': 'alice'})
+        board = storage.create('boards', {'name': 'b', 'team_id': 't', 'status': 'OPEN'})
+        data = {'title': 't', 'description': '', 'user_id': user, 'board_id': board}
+        task = (await board_impl.add_task_async(data))['id']
+        self.assertEqual(storage.gets, 2)
+        self.assertEqual(storage.get('tasks', task)['board_id'], board)
+        with self.assertRaisesMessage(ValueError, "Task title must be unique for a board"):
+            await board_impl.add_task_async(data)
+
+
+class AsyncViewTests(APITestCase):
+    urlconf = ASYNC_URLCONF
+
+    async def acall(self, method: str, path: str, body=None, status: int = 200):
+        if method == 'get':
+            response = await self.async_client.get(f'/api/{path}', body or {})
+        else:
+            response = await getattr(self.async_client, method)(f'/api/{path}', json.dumps(body or {}),
+                                                                content_type='application/json')
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
+
+    async def test_writes_and_reads(self):
+        user = (await self.acall('post', 'users/create', {'name': 'alice', 'display_name': 'Alice'}, 201))['id']
+        await self.acall('put', 'users/update', {'id': user, 'user': {'display_name': 'Al'}})
+        self.assertEqual((await self.acall('post', 'users/describe', {'id': user}))['description'], 'Al')
+        team = (await self.acall('post', 'teams/create', {'name': 'alpha', 'description': '', 'admin': user}, 201))['id']
+        board = (await self.acall('post', 'boards/create', {'name': 'b', 'description': '', 'team_id': team}, 201))['id']
+        task = (await self.acall('post', 'tasks/create',
+                                 {'title': 't', 'description': '', 'user_id': user, 'board_id': board}, 201))['id']
+        await self.acall('put', 'tasks/update', {'id': task, 'status': 'COMPLETE'})
+        progress = await self.acall('post', 'boards/progress', {'id': board})
+        self.assertEqual(progress['task_counts'], {'OPEN': 0, 'IN_PROGRESS': 0, 'COMPLETE': 1, 'total': 1})
+        self.assertEqual([item['display_name'] for item in await self.acall('get', 'users')], ['Al'])
+
+    async def test_errors_are_bad_requests(self):
+        self.assertEqual(await self.acall('post', 'users/describe', {'id': 'missing'}, 400), {'error': 'User not found'})
+        response = await self.async_client.post('/api/users/create', '{not json', content_type='application/json')
+        self.assertEqual(response.status_code, 400)
+        response = await self.async_client.get('/api/users/create')
+        self.assertEqual(response.status_code, 405)
+        user = (await self.acall('post', 'users/create', {'name': 'alice', 'display_name': ''}, 201))['id']
+        team = (await self.acall('post', 'teams/create', {'name': 'alpha', 'description': '', 'admin': user}, 201))['id']
+        board = (await self.acall('post', 'boards/create', {'name': 'b', 'description': '', 'team_id': team}, 201))['id']
+        result = await self.acall('post', 'tasks/bulk-create', {'board_id': board, 'tasks': [{'title': 5}]}, 400)
+        self.assertEqual(result['created'], 0)
+
+    async def test_matching_etag_is_not_modified(self):
+        await self.acall('post', 'users/create', {'name': 'alice', 'display_name': ''}, 201)
+        etag = (await self.async_client.get('/api/users'))['ETag']
+        response = await self.async_client.get('/api/users', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 304)
+        self.assertEqual(response['ETag'], etag)
+        await self.acall('post', 'users/create', {'name': 'bob', 'display_name': ''}, 201)
+        response = await self.async_client.get('/api/users', headers={'If-None-Match': etag})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(len(response.json()), 2)
+
+
+class AsyncExportTests(APITestCase):
+    backend = 'planner_api.sqlite_storage.SqliteStorage'
+    urlconf = ASYNC_URLCONF
+
+    def test_sqlite_iteration_resumes_on_another_thread(self):
+        storage = SqliteStorage(db_dir=os.path.join(self.db_dir, 'direct'))
+        for i in range(FileStorage.ITER_CHUNK + 10):
+            storage.create('tasks', {'title': f't{i}', 'board_id': 'b'})
+        tasks = storage.iter_filter('tasks', board_id='b')
+        first = next(tasks)
+        rest = []
+        thread = threading.Thread(target=lambda: rest.extend(tasks))
+        thread.start()
+        thread.join()
+        self.assertEqual([task['title'] for task in [first] + rest],
+                         [f't{i}' for i in range(FileStorage.ITER_CHUNK + 10)])
+
+    async def test_download_export_streams_every_task(self):
+        user = (await self.acall('users/create', {'name': 'alice', 'display_name': 'Alice'}, 201))['id']
+        team = (await self.acall('teams/create', {'name': 'alpha', 'description': '', 'admin': user}, 201))['id']
+        board = (await self.acall('boards/create', {'name': 'b', 'description': '', 'team_id': team}, 201))['id']
+        titles = [f't{i}' for i in range(1200)]
+        for start in range(0, len(titles), 600):
+            tasks = [{'title': title, 'description': '', 'user_id': user} for title in titles[start:start + 600]]
+            await self.acall('tasks/bulk-create', {'board_id': board, 'tasks': tasks}, 201)
+
+        response = await self.async_client.post('/api/boards/export', json.dumps({'id': board, 'format': 'jsonl',
+                                                                                  'download': True}),
+                                                content_type='application/json')
+        self.assertEqual(response.status_code, 200)
+        body = b''.join([chunk async for chunk in response.streaming_content])
+        self.assertEqual([json.loads(line)['title'] for line in body.splitlines()], titles)
+
+    async def acall(self, path: str, body: dict, status: int = 200):
+        response = await self.async_client.post(f'/api/{path}', json.dumps(body), content_type='application/json')
+        self.assertEqual(response.status_code, status, response.content)
+        return response.json()
@@ -2,7 +2,8 @@ from django.urls import path
 from .views import (
     UserCreateView, UserListView, UserDetailView, UserUpdateView, UserTeamsView,
     TeamCreateView, TeamListView, TeamDetailView, TeamUpdateView, TeamAddUsersView, TeamRemoveUsersView, TeamUsersView,
-    BoardCreateView, BoardCloseView, TaskCreateView, TaskUpdateView, BoardListView, BoardExportView,
+    BoardCreateView, BoardCloseView, TaskCreateView, TaskUpdateView, BoardListView, BoardExportView, BoardProgressView,
+    TaskBulkCreateView, TaskBulkUpdateView, ResponseCacheStatsView, MetricsView,
 )
 
 urlpatterns = [
@@ -27,7 +28,14 @@ urlpatterns = [
     path('boards/close', BoardCloseView.as_view()),
     path('boards/list', BoardListView.as_view()),
     path('boards/export', BoardExportView.as_view()),
+    path('boards/progress', BoardProgressView.as_view()),
 
     path('tasks/create', TaskCreateView.as_view()),
     path('tasks/update', TaskUpdateView.as_view()),
+    path('tasks/bulk-create', TaskBulkCreateView.as_view()),
+    path('tasks/bulk-update', TaskBulkUpdateView.as_view()),
+
+    # Diagnostics
+    path('_cache', ResponseCacheStatsView.as_view()),
+    path('_metrics', MetricsView.as_view()),
 ]
@@ -1,38 +1,48 @@
 import json
 from .bases.user_base import UserBase
-from .storage import FileStorage
+from .storage import get_storage
+from .utils import page_request, page_response, parse_request
 
 class User(UserBase):
-    def __init__(self):
-        self.storage = FileStorage()
+    def __init__(self, storage=None):
+        self.storage = storage if storage is not None else get_storage()
     
     def create_user(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            name = data.get('name', '').strip()
-            display_name = data.get('display_name', '').strip()
-            
-            if not name or len(name) > 64:
-                raise ValueError("Name is required and must be max 64 characters")
-            if len(display_name) > 64:
-                raise ValueError("Display name must be max 64 characters")
-            
-            existing_users = self.storage.filter_by('users', name=name)
-            if existing_users:
-                raise ValueError("User name must be unique")
-            
-            user_id = self.storage.create('users', {
-                'name': name,
-                'display_name': display_name
-            })
-            
-            return json.dumps({"id": user_id})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        return json.dumps(self.create_user_dict(parse_request(request)))
+    
+    def create_user_dict(self, data: dict) -> dict:
+        name = data.get('name', '').strip()
+        display_name = data.get('display_name', '').strip()
+        
+        if not name or len(name) > 64:
+            raise ValueError("Name is required and must be max 64 characters")
+        if len(display_name) > 64:
+            raise ValueError("Display name must be max 64 characters")
+        
+        existing_users = self.storage.filter_by('users', name=name)
+        if existing_users:
+            raise ValueError("User name must be unique")
+        
+        user_id = self.storage.create('users', {
+            'name': name,
+            'display_name': display_name
+        })
+        
+        return {"id": user_id}
     
     def list_users(self) -> str:
-        users = self.storage.get_all('users')
+        return json.dumps(self.list_users_dict())
+    
+    def list_users_dict(self, page: dict = None):
+        """
+        Without "limit"/"cursor" in `page` this returns every user. With them it
+        returns {"items": [...], "next_cursor": "<cursor>" or None}, in creation order.
+        """
+        paging = page_request(page or {})
+        if paging:
+            users, next_key = self.storage.page('users', *paging)
+        else:
+            users = self.storage.get_all('users')
         result = []
         for user in users:
             result.append({
@@ -40,80 +50,75 @@ class User(UserBase):
                 'display_name': user['display_name'],
                 'creation_time': user['creation_time']
             })
-        return json.dumps(result)
+        return page_response(result, next_key) if paging else result
     
     def describe_user(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            user_id = data.get('id')
-            
-            if not user_id:
-                raise ValueError("User ID is required")
-            
-            user = self.storage.get('users', user_id)
-            if not user:
-                raise ValueError("User not found")
-            
-            return json.dumps({
-                'name': user['name'],
-                'description': user.get('display_name', ''),
-                'creation_time': user['creation_time']
-            })
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        return json.dumps(self.describe_user_dict(parse_request(request)))
+    
+    def describe_user_dict(self, data: dict) -> dict:
+        user_id = data.get('id')
+        
+        if not user_id:
+            raise ValueError("User ID is required")
+        
+        user = self.storage.get('users', user_id)
+        if not user:
+            raise ValueError("User not found")
+        
+        return {
+            'name': user['name'],
+            'description': user.get('display_name', ''),
+            'creation_time': user['creation_time']
+        }
     
     def update_user(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            user_id = data.get('id')
-            user_data = data.get('user', {})
-            
-            if not user_id:
-                raise ValueError("User ID is required")
-            
-            existing_user = self.storage.get('users', user_id)
-            if not existing_user:
-                raise ValueError("User not found")
-            
-            display_name = user_data.get('display_name', '').strip()
-            if len(display_name) > 128:
-                raise ValueError("Display name must be max 128 characters")
-            
-            self.storage.update('users', user_id, {
-                'display_name': display_name
-            })
-            
-            return json.dumps({"status": "success"})
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        return json.dumps(self.update_user_dict(parse_request(request)))
+    
+    def update_user_dict(self, data: dict) -> dict:
+        user_id = data.get('id')
+        user_data = data.get('user', {})
+        
+        if not user_id:
+            raise ValueError("User ID is required")
+        
+        existing_user = self.storage.get('users', user_id)
+        if not existing_user:
+            raise ValueError("User not found")
+        
+        display_name = user_data.get('display_name', '').strip()
+        if len(display_name) > 128:
+            raise ValueError("Display name must be max 128 characters")
+        
+        self.storage.update('users', user_id, {
+            'display_name': display_name
+        })
+        
+        return {"status": "success"}
     
     def get_user_teams(self, request: str) -> str:
-        try:
-            data = json.loads(request)
-            user_id = data.get('id')
-            
-            if not user_id:
-                raise ValueError("User ID is required")
-            
-            user = self.storage.get('users', user_id)
-            if not user:
-                raise ValueError("User not found")
-            
-            user_teams = self.storage.filter_by('user_teams', user_id=user_id)
-            result = []
-            
-            for user_team in user_teams:
-                team = self.storage.get('teams', user_team['team_id'])
-                if team:
-                    result.append({
-                        'name': team['name'],
-                        'description': team['description'],
-                        'creation_time': team['creation_time']
-                    })
-            
-            return json.dumps(result)
-            
-        except json.JSONDecodeError:
-            raise ValueError("Invalid JSON format")
+        return json.dumps(self.get_user_teams_dict(parse_request(request)))
+    
+    def get_user_teams_dict(self, data: dict) -> list:
+        user_id = data.get('id')
+        
+        if not user_id:
+            raise ValueError("User ID is required")
+        
+        user = self.storage.get('users', user_id)
+        if not user:
+            raise ValueError("User not found")
+        
+        user_teams = self.storage.filter_by('user_teams', user_id=user_id)
+        teams = self.storage.get_many('teams', [user_team['team_id'] for user_team in user_teams])
+        result = []
+        
+        for user_team in user_teams:
+            team = teams.get(user_team['team_id'])
+            if team:
+                result.append({
+                    'name': team['name'],
+                    'description': team['description'],
+                    'creation_time': team['creation_time']
+                })
+        
+        return result
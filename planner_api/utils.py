@@ -0,0 +1,55 @@
+import base64
+import binascii
+import json
+from typing import Any, Dict, List, Optional, Tuple
+
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
+
+def parse_request(request: str) -> Dict[str, Any]:
+    try:
+        data = json.loads(request)
+    except json.JSONDecodeError:
+        raise ValueError("Invalid JSON format")
+    if not isinstance(data, dict):
+        raise ValueError("Request must be a JSON object")
+    return data
+
+
+def encode_cursor(key: Tuple[str, str]) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode()
+
+
+def decode_cursor(cursor: str) -> Tuple[str, str]:
+    try:
+        key = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (AttributeError, binascii.Error, UnicodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    if not (isinstance(key, list) and len(key) == 2 and all(isinstance(part, str) for part in key)):
+        raise ValueError("Invalid cursor")
+    return tuple(key)
+
+
+def page_request(data: Dict[str, Any]) -> Optional[Tuple[int, Optional[Tuple[str, str]]]]:
+    """(limit, after) when `data` carries "limit" and/or "cursor", otherwise None."""
+    limit = data.get('limit')
+    cursor = data.get('cursor')
+    if limit is None and cursor is None:
+        return None
+    if limit is None:
+        limit = DEFAULT_PAGE_SIZE
+    try:
+        limit = int(limit)
+    except (TypeError, ValueError):
+        raise ValueError("Limit must be an integer")
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        raise ValueError(f"Limit must be between 1 and {MAX_PAGE_SIZE}")
+    return limit, (decode_cursor(cursor) if cursor else None)
+
+
+def page_response(items: List[Any], next_key: Optional[Tuple[str, str]]) -> Dict[str, Any]:
+    return {
+        "items": items,
+        "next_cursor": encode_cursor(next_key) if next_key else None
+    }
@@ -1,171 +1,292 @@
+import hashlib
+import json
+
 from rest_framework.views import APIView
 from rest_framework.response import Response
 from rest_framework import status
-from django.http import JsonResponse
-import json
+from django.http import HttpResponse, StreamingHttpResponse
 
+from . import metrics
+from .cache import get_response_cache
+from .profiling import get_profiler
+from .storage import get_storage
 from .user import User
 from .team import Team
 from .board import ProjectBoard
 
-class UserCreateView(APIView):
+def _payload(request) -> dict:
+    if not isinstance(request.data, dict):
+        raise ValueError("Request must be a JSON object")
+    return request.data
+
+def _etag(storage, params: dict, *dependencies):
+    """
+    ETag of a read response, from the storage versions of the (entity type,
+    scope) pairs it is built from and the request parameters. None when the
+    backend does not report versions.
+    """
+    versions = []
+    for entity_type, scope in dependencies:
+        version = storage.version(entity_type, **scope)
+        if version is None:
+            return None
+        versions.append(version)
+    digest = hashlib.sha1(json.dumps([versions, params], sort_keys=True, default=str).encode()).hexdigest()
+    return f'"{digest}"'
+
+def _read_through(path: str, if_none_match: str, params: dict, etag, read):
+    """
+    (status, result) of a read endpoint: 304 without calling read() when the
+    client has this version, else the result, taken from the response cache
+    when it was computed under the same tag.
+    """
+    if not etag:
+        return status.HTTP_200_OK, read()
+    tags = [tag.strip() for tag in if_none_match.split(',')]
+    if etag in tags or f'W/{etag}' in tags or '*' in tags:
+        return status.HTTP_304_NOT_MODIFIED, None
+
+    cache = get_response_cache()
+    key = (path, json.dumps(params, sort_keys=True, default=str))
+    found, result = cache.get(key, etag)
+    if not found:
+        result = read()
+        cache.put(key, etag, result)
+    return status.HTTP_200_OK, result
+
+def _conditional(request, params: dict, etag, read) -> Response:
+    code, result = _read_through(request.path, request.headers.get('If-None-Match', ''), params, etag, read)
+    return Response(result, status=code, headers={'ETag': etag} if etag else None)
+
+class PlannerAPIView(APIView):
+    """APIView with the sampled profiling hook (profiling.Profiler) around dispatch."""
+
+    def dispatch(self, request, *args, **kwargs):
+        return get_profiler().run(request, super().dispatch, request, *args, **kwargs)
+
+class UserCreateView(PlannerAPIView):
     def post(self, request):
         try:
             user_impl = User()
-            result = user_impl.create_user(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
+            result = user_impl.create_user_dict(_payload(request))
+            return Response(result, status=status.HTTP_201_CREATED)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class UserListView(APIView):
+class UserListView(PlannerAPIView):
     def get(self, request):
         try:
             user_impl = User()
-            result = user_impl.list_users()
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            params = request.query_params.dict()
+            etag = _etag(user_impl.storage, params, ('users', {}))
+            return _conditional(request, params, etag, lambda: user_impl.list_users_dict(request.query_params))
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class UserDetailView(APIView):
+class UserDetailView(PlannerAPIView):
     def post(self, request):
         try:
             user_impl = User()
-            result = user_impl.describe_user(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            data = _payload(request)
+            etag = _etag(user_impl.storage, data, ('users', {}))
+            return _conditional(request, data, etag, lambda: user_impl.describe_user_dict(data))
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class UserUpdateView(APIView):
+class UserUpdateView(PlannerAPIView):
     def put(self, request):
         try:
             user_impl = User()
-            result = user_impl.update_user(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = user_impl.update_user_dict(_payload(request))
+            return Response(result, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class UserTeamsView(APIView):
+class UserTeamsView(PlannerAPIView):
     def post(self, request):
         try:
             user_impl = User()
-            result = user_impl.get_user_teams(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            data = _payload(request)
+            etag = _etag(user_impl.storage, data, ('user_teams', {'user_id': data.get('id')}), ('teams', {}))
+            return _conditional(request, data, etag, lambda: user_impl.get_user_teams_dict(data))
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamCreateView(APIView):
+class TeamCreateView(PlannerAPIView):
     def post(self, request):
         try:
             team_impl = Team()
-            result = team_impl.create_team(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
+            result = team_impl.create_team_dict(_payload(request))
+            return Response(result, status=status.HTTP_201_CREATED)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamListView(APIView):
+class TeamListView(PlannerAPIView):
     def get(self, request):
         try:
             team_impl = Team()
-            result = team_impl.list_teams()
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            params = request.query_params.dict()
+            etag = _etag(team_impl.storage, params, ('teams', {}))
+            return _conditional(request, params, etag, lambda: team_impl.list_teams_dict(request.query_params))
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamDetailView(APIView):
+class TeamDetailView(PlannerAPIView):
     def post(self, request):
         try:
             team_impl = Team()
-            result = team_impl.describe_team(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            data = _payload(request)
+            etag = _etag(team_impl.storage, data, ('teams', {}))
+            return _conditional(request, data, etag, lambda: team_impl.describe_team_dict(data))
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamUpdateView(APIView):
+class TeamUpdateView(PlannerAPIView):
     def put(self, request):
         try:
             team_impl = Team()
-            result = team_impl.update_team(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = team_impl.update_team_dict(_payload(request))
+            return Response(result, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamAddUsersView(APIView):
+class TeamAddUsersView(PlannerAPIView):
     def post(self, request):
         try:
             team_impl = Team()
-            result = team_impl.add_users_to_team(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = team_impl.add_users_to_team_dict(_payload(request))
+            return Response(result, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamRemoveUsersView(APIView):
+class TeamRemoveUsersView(PlannerAPIView):
     def post(self, request):
         try:
             team_impl = Team()
-            result = team_impl.remove_users_from_team(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = team_impl.remove_users_from_team_dict(_payload(request))
+            return Response(result, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TeamUsersView(APIView):
+class TeamUsersView(PlannerAPIView):
     def post(self, request):
         try:
             team_impl = Team()
-            result = team_impl.list_team_users(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            data = _payload(request)
+            etag = _etag(team_impl.storage, data, ('user_teams', {'team_id': data.get('id')}), ('users', {}))
+            return _conditional(request, data, etag, lambda: team_impl.list_team_users_dict(data))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class BoardCreateView(PlannerAPIView):
+    def post(self, request):
+        try:
+            board_impl = ProjectBoard()
+            result = board_impl.create_board_dict(_payload(request))
+            return Response(result, status=status.HTTP_201_CREATED)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class BoardCreateView(APIView):
+class BoardCloseView(PlannerAPIView):
     def post(self, request):
         try:
             board_impl = ProjectBoard()
-            result = board_impl.create_board(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
+            result = board_impl.close_board_dict(_payload(request))
+            return Response(result, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class BoardCloseView(APIView):
+class TaskCreateView(PlannerAPIView):
     def post(self, request):
         try:
             board_impl = ProjectBoard()
-            result = board_impl.close_board(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = board_impl.add_task_dict(_payload(request))
+            return Response(result, status=status.HTTP_201_CREATED)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class TaskUpdateView(PlannerAPIView):
+    def put(self, request):
+        try:
+            board_impl = ProjectBoard()
+            result = board_impl.update_task_status_dict(_payload(request))
+            return Response(result, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TaskCreateView(APIView):
+class TaskBulkCreateView(PlannerAPIView):
     def post(self, request):
         try:
             board_impl = ProjectBoard()
-            result = board_impl.add_task(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_201_CREATED)
+            result = board_impl.bulk_create_tasks_dict(_payload(request))
+            # Per-task errors are in the results; 400 when none of them was added.
+            return Response(result, status=status.HTTP_201_CREATED if result['created'] else status.HTTP_400_BAD_REQUEST)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class TaskUpdateView(APIView):
+class TaskBulkUpdateView(PlannerAPIView):
     def put(self, request):
         try:
             board_impl = ProjectBoard()
-            result = board_impl.update_task_status(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            result = board_impl.bulk_update_tasks_dict(_payload(request))
+            return Response(result, status=status.HTTP_200_OK)
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class BoardListView(APIView):
+class BoardListView(PlannerAPIView):
     def post(self, request):
         try:
             board_impl = ProjectBoard()
-            result = board_impl.list_boards(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            data = _payload(request)
+            etag = _etag(board_impl.storage, data, ('boards', {'team_id': data.get('id')}))
+            return _conditional(request, data, etag, lambda: board_impl.list_boards_dict(data))
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
 
-class BoardExportView(APIView):
+class BoardProgressView(PlannerAPIView):
     def post(self, request):
         try:
             board_impl = ProjectBoard()
-            result = board_impl.export_board(json.dumps(request.data))
-            return Response(json.loads(result), status=status.HTTP_200_OK)
+            data = _payload(request)
+            # A single board is looked up by id only; its counters are scoped by board.
+            if data.get('team_id') and not data.get('id'):
+                deps = [('boards', {'team_id': data['team_id']}), ('board_counters', {'team_id': data['team_id']})]
+            else:
+                deps = [('boards', {}), ('board_counters', {'board_id': data.get('id')})]
+            etag = _etag(board_impl.storage, data, *deps)
+            return _conditional(request, data, etag, lambda: board_impl.board_progress_dict(data))
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+class ResponseCacheStatsView(PlannerAPIView):
+    def get(self, request):
+        return Response(get_response_cache().stats(), status=status.HTTP_200_OK)
+
+class MetricsView(PlannerAPIView):
+    def get(self, request):
+        body = metrics.get_metrics().render(get_storage(), get_response_cache())
+        return HttpResponse(body, content_type=metrics.CONTENT_TYPE)
+
+EXPORT_CONTENT_TYPES = {
+    'txt': 'text/plain; charset=utf-8',
+    'csv': 'text/csv; charset=utf-8',
+    'jsonl': 'application/x-ndjson',
+}
+
+class BoardExportView(PlannerAPIView):
+    def post(self, request):
+        try:
+            board_impl = ProjectBoard()
+            data = _payload(request)
+            if not data.get('download'):
+                result = board_impl.export_board_dict(data)
+                return Response(result, status=status.HTTP_200_OK)
+
+            filename, chunks = board_impl.export_board_stream(data)
+            response = StreamingHttpResponse(
+                chunks, content_type=EXPORT_CONTENT_TYPES[filename.rsplit('.', 1)[1]]
+            )
+            response['Content-Disposition'] = f'attachment; filename="{filename}"'
+            return response
         except ValueError as e:
             return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
@@ -42,6 +42,8 @@ INSTALLED_APPS = [
 ]
 
 MIDDLEWARE = [
+    'planner_api.middleware.ServerTimingMiddleware',
+    'planner_api.middleware.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -123,3 +125,101 @@ STATIC_URL = 'static/'
 # https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+
+# Planner storage backend
+# Any class implementing planner_api.bases.storage_base.StorageBase, e.g.
+# planner_api.storage.FileStorage, planner_api.log_storage.LogStorage,
+# planner_api.sqlite_storage.SqliteStorage or planner_api.record_storage.RecordStorage.
+# OPTIONS are passed to its constructor.
+# FileStorage, LogStorage and RecordStorage accept a 'codec' option ('auto', 'orjson',
+# 'ujson', 'json'). FileStorage and LogStorage also accept 'partitions' ({entity type:
+# field}, default {'tasks': 'board_id'}); RecordStorage rejects a non-empty one.
+# LogStorage saves a table snapshot (db/<entity>.snap) once 'snapshot_bytes' of its
+# log (default 4 MiB, 0 for never) are not covered by one; a restart loads it and
+# replays only the newer log lines.
+# One instance is shared by the whole process. The entity types in PRELOAD, e.g.
+# ['users', 'teams', 'user_teams', 'boards', 'tasks'], are loaded with their
+# indexes when the server starts instead of on the first request that reads them.
+
+PLANNER_STORAGE = {
+    'BACKEND': 'planner_api.storage.FileStorage',
+    'OPTIONS': {'db_dir': 'db'},
+    'PRELOAD': [],
+}
+
+# Board export cache
+# Exports are kept in DIR as board_<id>_v<version>.<format> and reused while the
+# board is unchanged. Files unused for MAX_AGE seconds are removed, then the
+# least recently used ones while DIR holds more than MAX_BYTES.
+
+PLANNER_EXPORT_CACHE = {
+    'DIR': 'out',
+    'MAX_BYTES': 256 * 1024 * 1024,
+    'MAX_AGE': 7 * 24 * 3600,
+}
+
+# Response cache
+# Results of the read endpoints are kept in a per-process LRU of MAX_ENTRIES,
+# validated against the storage versions they were built from.
+# GET /api/_cache reports its hit rate.
+
+PLANNER_RESPONSE_CACHE = {
+    'MAX_ENTRIES': 1024,
+}
+
+# Async serving
+# With VIEWS on, /api/ is served by the async views (planner_api.async_views);
+# run under an ASGI server, e.g. `uvicorn project_planner.asgi:application`.
+# Storage calls run on a shared pool of MAX_WORKERS threads.
+
+PLANNER_ASYNC = {
+    'VIEWS': False,
+    'MAX_WORKERS': 16,
+}
+
+# Request timing
+# planner_api.middleware.ServerTimingMiddleware reports the storage work behind
+# each response (loads, parses, saves, scans, bytes, records scanned) in a
+# Server-Timing header (HEADER) and/or one JSON line per request on the
+# planner_api.timing logger (LOG).
+
+PLANNER_TIMING = {
+    'HEADER': True,
+    'LOG': False,
+}
+
+# Metrics
+# planner_api.middleware.MetricsMiddleware records request counts and latencies
+# per route and enables the storage counters; GET /api/_metrics serves them in
+# the Prometheus text format. BUCKETS are the histogram bounds in seconds.
+
+PLANNER_METRICS = {
+    'BUCKETS': (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0),
+}
+
+# Profiling
+# With ENABLED, a SAMPLE_RATE share of API requests runs under cProfile and those
+# taking THRESHOLD_MS or more are saved to DIR as .prof plus a .txt summary of
+# the TOP functions; the newest MAX_FILES are kept.
+# `python manage.py profiles [--aggregate]` lists or merges them.
+
+PLANNER_PROFILING = {
+    'ENABLED': False,
+    'SAMPLE_RATE': 0.01,
+    'THRESHOLD_MS': 500,
+    'DIR': 'profiles',
+    'TOP': 30,
+    'MAX_FILES': 500,
+}
+
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'handlers': {
+        'console': {'class': 'logging.StreamHandler'},
+    },
+    'loggers': {
+        'planner_api.timing': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+        'planner_api.storage': {'handlers': ['console'], 'level': 'INFO', 'propagate': False},
+    },
+}
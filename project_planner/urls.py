@@ -17,7 +17,9 @@ Including another URLconf
 from django.contrib import admin
 from django.urls import path, include
 
+from planner_api.async_storage import get_async_config
+
 urlpatterns = [
     path('admin/', admin.site.urls),
-    path('api/', include('planner_api.urls')),
+    path('api/', include('planner_api.async_urls' if get_async_config()['VIEWS'] else 'planner_api.urls')),
 ]
@@ -14,3 +14,9 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'project_planner.settings')
 
 application = get_wsgi_application()
+
+# Build the shared storage backend and load PLANNER_STORAGE['PRELOAD'] before
+# the first request; manage.py commands other than runserver skip this.
+from planner_api.storage import init_storage  # noqa: E402
+
+init_storage()